@@ -0,0 +1,279 @@
+"""Serving modes compared at 50, 200 and 1000 concurrent clients.
+
+Runs the same app under
+
+* wsgi_sync    - gunicorn sync workers (main:app), one request per worker
+* wsgi_gthread - gunicorn gthread workers (main:app)
+* asgi         - uvicorn (asgi:application): the event loop holds the
+                 connections and requests run on the ASGI_THREADS pool
+
+with the stub Slack webhook from scripts/stub_slack_server.py, and drives
+each --endpoints endpoint with --clients keep-alive clients from an asyncio
+load generator (threads do not scale to 1000 clients). Reports throughput,
+latency percentiles and error counts per mode, client count and endpoint.
+Modes whose server package is not installed are reported as skipped.
+
+Slack webhooks are posted by the outbox workers, off the request path. Pass
+--slack-queue-workers 0 to deliver inline instead and put the webhook
+latency back inside every check-in and report request.
+
+    python benchmarks/bench_asgi.py [--clients 50,200,1000] [--workers 2]
+        [--threads 16] [--modes wsgi_sync,asgi] [--endpoints checkin,slack]
+        [--duration 10] [--slack-latency-ms 50] [--output asgi.json]
+"""
+import argparse
+import asyncio
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from services import dealership_registry
+from stub_slack_server import start_stub_server
+
+from load_test import ENDPOINTS, PERCENTILES, Scenario, free_port, git_revision, percentile
+
+MODES = ('wsgi_sync', 'wsgi_gthread', 'asgi')
+SERVER_PACKAGES = {'wsgi_sync': 'gunicorn', 'wsgi_gthread': 'gunicorn', 'asgi': 'uvicorn'}
+
+
+def server_command(mode, port, workers, threads):
+    if mode == 'asgi':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:application', '--app-dir', SRC,
+                '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+                '--backlog', '4096', '--no-access-log', '--log-level', 'warning']
+    command = [sys.executable, '-m', 'gunicorn', '--chdir', SRC, '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--backlog', '4096', '--log-level', 'warning']
+    if mode == 'wsgi_gthread':
+        command += ['--worker-class', 'gthread', '--threads', str(threads)]
+    return command + ['main:app']
+
+
+def start_server(mode, args, slack_url, workdir):
+    """Start one serving mode in a child process and wait until it answers"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        SLACK_WEBHOOK_URL=slack_url,
+        SLACK_QUEUE_WORKERS=str(args.slack_queue_workers),
+        ACTIVITY_DB_PATH=os.path.join(workdir, 'activity.sqlite3'),
+        OUTBOX_DB_PATH=os.path.join(workdir, 'outbox.sqlite3'),
+        IDEMPOTENCY_DB_PATH=os.path.join(workdir, 'idempotency.sqlite3'),
+        ASGI_THREADS=str(args.threads),
+        LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING')
+    )
+    process = subprocess.Popen(server_command(mode, port, args.workers, args.threads), env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{mode} server exited with status {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            connection.getresponse().read()
+            connection.close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{mode} server did not start within 30s')
+
+
+def checkin_token(port, dealerships):
+    first = next(d for d in dealerships if d['latitude'] and d['longitude'])
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.request('POST', '/api/checkin', json.dumps({
+        'user_name': 'Load Rep', 'dealership_id': first['id'], 'dealership_name': first['name'],
+        'user_latitude': first['latitude'], 'user_longitude': first['longitude']
+    }), {'Content-Type': 'application/json'})
+    token = json.loads(connection.getresponse().read())['checkin_token']
+    connection.close()
+    return token
+
+
+async def read_response(reader):
+    """Status code and whether the server will close the connection (Content-Length or chunked bodies)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', '0')))
+    return status, headers.get('connection') == 'close'
+
+
+def encode_request(method, path, body, headers, port):
+    payload = b''
+    if body is not None:
+        payload = json.dumps(body).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    lines = [f'{method} {path} HTTP/1.1', f'Host: 127.0.0.1:{port}', f'Content-Length: {len(payload)}']
+    lines.extend(f'{name}: {value}' for name, value in headers.items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload
+
+
+async def drive(port, endpoint, scenario_factory, clients, duration, warmup):
+    """Run clients concurrent keep-alive connections against one endpoint for duration seconds"""
+    samples = []
+    statuses = {}
+    state = {'measuring': False, 'stop': False}
+
+    async def client(worker):
+        scenario = scenario_factory(worker)
+        reader = writer = None
+        while not state['stop']:
+            request = encode_request(*scenario.request(endpoint), port)
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(request)
+                status, closing = await asyncio.wait_for(read_response(reader), 60)
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                status, closing = type(e).__name__, True
+            elapsed = time.perf_counter() - started
+            if closing and writer is not None:
+                writer.close()
+                reader = writer = None
+            if state['measuring']:
+                samples.append(elapsed)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if writer is not None:
+            writer.close()
+
+    tasks = [asyncio.ensure_future(client(i)) for i in range(clients)]
+    await asyncio.sleep(warmup)
+    state['measuring'] = True
+    measured_from = time.perf_counter()
+    await asyncio.sleep(duration)
+    state['measuring'] = False
+    measured_seconds = time.perf_counter() - measured_from
+    state['stop'] = True
+    await asyncio.gather(*tasks)
+
+    samples.sort()
+    ok = sum(count for status, count in statuses.items() if status.isdigit() and int(status) < 400)
+    result = {
+        'requests': len(samples),
+        'ok': ok,
+        'errors': len(samples) - ok,
+        'statuses': statuses,
+        'throughput_rps': round(ok / measured_seconds, 1),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3) if samples else None,
+        'max_ms': round(samples[-1] * 1000, 3) if samples else None
+    }
+    for pct in PERCENTILES:
+        value = percentile(samples, pct)
+        result[f'p{pct}_ms'] = round(value * 1000, 3) if value is not None else None
+    return result
+
+
+def parse_list(parser, value, allowed, name):
+    items = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = set(items) - set(allowed)
+    if unknown:
+        parser.error(f"unknown {name}(s): {', '.join(sorted(unknown))}")
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default=','.join(MODES), help='comma-separated subset of ' + ','.join(MODES))
+    parser.add_argument('--clients', default='50,200,1000', help='comma-separated concurrent client counts')
+    parser.add_argument('--endpoints', default='checkin,slack', help='comma-separated subset of ' + ','.join(ENDPOINTS))
+    parser.add_argument('--workers', type=int, default=2, help='server processes per mode')
+    parser.add_argument('--threads', type=int, default=16, help='gthread threads per worker / ASGI_THREADS')
+    parser.add_argument('--duration', type=float, default=10, help='measured seconds per run')
+    parser.add_argument('--warmup', type=float, default=2, help='unmeasured seconds before each run')
+    parser.add_argument('--hours', type=int, default=8, help='hours per submitted report')
+    parser.add_argument('--slack-latency-ms', type=float, default=50, help='stub webhook response delay')
+    parser.add_argument('--slack-queue-workers', type=int, default=4, help='SLACK_QUEUE_WORKERS for the app (0 = inline)')
+    parser.add_argument('--output', help='also write the results JSON here')
+    args = parser.parse_args()
+
+    modes = parse_list(parser, args.modes, MODES, 'mode')
+    endpoints = parse_list(parser, args.endpoints, ENDPOINTS, 'endpoint')
+    try:
+        client_counts = [int(count) for count in args.clients.split(',') if count.strip()]
+    except ValueError:
+        parser.error('--clients must be comma-separated integers')
+
+    dealerships = dealership_registry.load_registry()[0]
+    stub = start_stub_server(latency_ms=args.slack_latency_ms)
+    results = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'settings': {
+            'clients': client_counts,
+            'workers': args.workers,
+            'threads': args.threads,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'hours_per_report': args.hours,
+            'slack_latency_ms': args.slack_latency_ms,
+            'slack_queue_workers': args.slack_queue_workers
+        },
+        'modes': {}
+    }
+    try:
+        for mode in modes:
+            if importlib.util.find_spec(SERVER_PACKAGES[mode]) is None:
+                results['modes'][mode] = {'skipped': f'{SERVER_PACKAGES[mode]} is not installed'}
+                continue
+            with tempfile.TemporaryDirectory(prefix=f'activity-logger-{mode}-') as workdir:
+                process, port = start_server(mode, args, stub.url, workdir)
+                try:
+                    token = checkin_token(port, dealerships)
+                    runs = results['modes'][mode] = {}
+                    for clients in client_counts:
+                        for endpoint in endpoints:
+                            result = asyncio.run(drive(
+                                port, endpoint,
+                                lambda worker: Scenario(dealerships, token, args.hours, seed=worker),
+                                clients, args.duration, args.warmup
+                            ))
+                            runs.setdefault(str(clients), {})[endpoint] = result
+                            print(f"{mode} clients={clients} {endpoint}: {json.dumps(result)}", file=sys.stderr)
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+        with stub.lock:
+            results['slack_stub'] = dict(stub.stats)
+    finally:
+        stub.shutdown()
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Issue/verify cost of signed check-in tokens vs. the Flask session cookie.
+
+* token          - services.checkin_token issue() and verify()
+* session_cookie - Flask's signed session serializer dumping/loading the same
+                   seven check-in keys (what every cookie round trip pays)
+
+    python benchmarks/bench_checkin_token.py [--iterations 50000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from flask import Flask
+
+from services import checkin_token
+
+SECRET = 'benchmark-secret-key'
+CHECKIN = {
+    'user_name': 'Jane Doe',
+    'dealership_id': 'markham_honda',
+    'dealership_name': 'Markham Honda',
+    'checkin_time': '2024-05-17 09:02:11',
+    'latitude': 43.8557957,
+    'longitude': -79.3061335
+}
+
+
+def ops_per_second(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - started
+    return {'ops_per_sec': round(iterations / elapsed), 'us_per_op': round(elapsed / iterations * 1e6, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50000)
+    args = parser.parse_args()
+
+    def issue():
+        return checkin_token.issue(SECRET, CHECKIN['user_name'], CHECKIN['dealership_id'], CHECKIN['dealership_name'],
+                                   CHECKIN['checkin_time'], CHECKIN['latitude'], CHECKIN['longitude'])
+
+    token = issue()
+    assert checkin_token.verify(SECRET, token)['dealership_id'] == CHECKIN['dealership_id']
+    tampered = token[:-2] + ('AA' if not token.endswith('AA') else 'BB')
+
+    app = Flask(__name__)
+    app.secret_key = SECRET
+    serializer = app.session_interface.get_signing_serializer(app)
+    session_data = {
+        'checked_in': True,
+        'user_name': CHECKIN['user_name'],
+        'dealership_id': CHECKIN['dealership_id'],
+        'dealership_name': CHECKIN['dealership_name'],
+        'checkin_latitude': CHECKIN['latitude'],
+        'checkin_longitude': CHECKIN['longitude'],
+        'checkin_time': CHECKIN['checkin_time']
+    }
+    cookie = serializer.dumps(session_data)
+
+    results = {
+        'token': {
+            'bytes': len(token),
+            'issue': ops_per_second(issue, args.iterations),
+            'verify': ops_per_second(lambda: checkin_token.verify(SECRET, token), args.iterations),
+            'verify_tampered': ops_per_second(lambda: checkin_token.verify(SECRET, tampered), args.iterations)
+        },
+        'session_cookie': {
+            'bytes': len(cookie),
+            'dumps': ops_per_second(lambda: serializer.dumps(session_data), args.iterations),
+            'loads': ops_per_second(lambda: serializer.loads(cookie), args.iterations)
+        }
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Cold-start benchmark for dealership loading.
+
+Compares three ways of getting from nothing to usable dealership lookups:
+
+* legacy   - the original per-line parser, which rebuilt the coordinate
+             table and printed once per dealership (no spatial index)
+* text     - the current fallback: parse the text file and build the index
+* snapshot - load the compiled JSON snapshot with the prebuilt index
+
+at the real 22 sites and at a synthetic --sites scale, then times fresh
+interpreters importing routes.checkin with and without the snapshot.
+
+    python benchmarks/bench_cold_start.py [--sites 5000] [--runs 10]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+sys.path.insert(0, SRC)
+
+from services import dealership_registry, geo
+
+
+def legacy_load(content):
+    """The original load_dealerships parsing loop, kept for comparison"""
+    dealerships = []
+    for line in content.strip().split('\n'):
+        line = line.strip()
+        if line and ':' in line and not line.startswith('Dealership Addresses'):
+            parts = line.split(':', 1)
+            name_part = parts[0].strip()
+            address = parts[1].strip()
+            name = name_part.split('. ', 1)[1] if '. ' in name_part else name_part
+            dealership_id = name.lower().replace(' ', '_').replace('(', '').replace(')', '')
+            # The coordinate table was rebuilt for every line
+            coordinate_table = {key: dict(value) for key, value in dealership_registry.DEALERSHIP_COORDINATES.items()}
+            coordinates = coordinate_table.get(dealership_id) or {'lat': 43.6532, 'lng': -79.3832}
+            dealerships.append({
+                'id': dealership_id,
+                'name': name,
+                'address': address,
+                'latitude': coordinates['lat'],
+                'longitude': coordinates['lng']
+            })
+            print(f"Loaded dealership: {name} (with coordinates)")
+    return dealerships
+
+
+def synthetic_source(sites):
+    """Address file with the given number of sites spread across southern Ontario"""
+    rng = random.Random(42)
+    lines = ['Dealership Addresses:', '']
+    coordinates = {}
+    for i in range(sites):
+        name = f"Site {i}"
+        lines.append(f"{i + 1}. {name}: {i} Main Street, Toronto, ON M1M 1M1")
+        coordinates[name.lower().replace(' ', '_')] = {'lat': rng.uniform(42.0, 46.0), 'lng': rng.uniform(-82.0, -76.0)}
+    return '\n'.join(lines), coordinates
+
+
+def median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 4)
+
+
+def in_process(content, repeat):
+    snapshot_text = json.dumps(dealership_registry.compile_snapshot(content), separators=(',', ':'))
+
+    def legacy():
+        with contextlib.redirect_stdout(io.StringIO()):
+            legacy_load(content)
+
+    def text():
+        dealerships = dealership_registry.parse_dealership_text(content)
+        dealership_registry.build_index(dealerships)
+
+    def snapshot():
+        data = json.loads(snapshot_text)
+        geo.SpatialIndex.from_arrays(data['dealerships'], data['index'])
+
+    return {
+        'legacy_ms': median_ms(legacy, repeat),
+        'text_with_index_ms': median_ms(text, repeat),
+        'snapshot_with_index_ms': median_ms(snapshot, repeat),
+        'snapshot_bytes': len(snapshot_text)
+    }
+
+
+def cold_import_ms(runs, env_overrides):
+    code = (
+        "import sys, time; sys.path.insert(0, %r); "
+        "t = time.perf_counter(); import routes.checkin; "
+        "sys.stderr.write(str(time.perf_counter() - t))" % SRC
+    )
+    env = dict(os.environ, **env_overrides)
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+        )
+        samples.append(float(result.stderr.strip().splitlines()[-1]) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=5000, help='synthetic registry size')
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per cold-import variant')
+    parser.add_argument('--repeat', type=int, default=50, help='in-process repetitions')
+    args = parser.parse_args()
+
+    results = {'real_registry': in_process(dealership_registry.read_source(), args.repeat)}
+
+    content, coordinates = synthetic_source(args.sites)
+    original = dealership_registry.DEALERSHIP_COORDINATES
+    dealership_registry.DEALERSHIP_COORDINATES = coordinates
+    try:
+        results[f'synthetic_{args.sites}_sites'] = in_process(content, max(3, args.repeat // 10))
+    finally:
+        dealership_registry.DEALERSHIP_COORDINATES = original
+
+    results['cold_import_routes_checkin_ms'] = {
+        'snapshot': cold_import_ms(args.runs, {}),
+        'text_fallback': cold_import_ms(args.runs, {'DEALERSHIP_REGISTRY_SNAPSHOT': 'off'})
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Render latency and memory for the /api/activities/pdf report.
+
+Renders a month of reports for one dealership (--reps reps x --days days,
+--hours hours each) and compares:
+
+* pdf           - the PDF writer with its compiled templates cached
+* pdf_uncached  - the PDF writer recompiling fonts/layout/grid every time
+* text          - the plain-text log (format=text fallback)
+
+reporting median/p95 latency, tracemalloc peak bytes per report and the
+total time for the whole month.
+
+    python benchmarks/bench_pdf.py [--reps 15] [--days 30] [--hours 8]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from routes.activity_slack import render_activity_log
+from services import pdf_report, scoring
+
+
+def synthetic_reports(reps, days, hours):
+    rng = random.Random(7)
+    start = datetime(2024, 5, 1, 17, 0)
+    reports = []
+    for day in range(days):
+        for rep in range(reps):
+            activities = [
+                {
+                    'description': rng.choice(['Follow-up calls', 'Walk-in customers', 'Delivery prep and paperwork',
+                                               'Posted inventory on marketplace sites and answered leads']),
+                    **{key: rng.randint(0, 4) for key in scoring.METRIC_KEYS}
+                }
+                for _ in range(hours)
+            ]
+            reports.append((f'Rep {rep}', activities, start + timedelta(days=day)))
+    return reports
+
+
+def render_pdf(report):
+    name, activities, local_time = report
+    scores = scoring.score_activities(activities)
+    return pdf_report.render_activity_pdf(name, activities, scores, 'Markham Honda', '2024-05-01 09:00:00', local_time)
+
+
+def render_pdf_uncached(report):
+    pdf_report._static_part.cache_clear()
+    return render_pdf(report)
+
+
+def render_text(report):
+    name, activities, local_time = report
+    scores = scoring.score_activities(activities)
+    lines = render_activity_log(name, activities, scores, 'Markham Honda', '2024-05-01 09:00:00', local_time)
+    return "\n".join(lines).encode('utf-8')
+
+
+def measure(render, reports):
+    render(reports[0])  # warm caches and imports
+
+    samples = []
+    size = 0
+    month_started = time.perf_counter()
+    for report in reports:
+        started = time.perf_counter()
+        size += len(render(report))
+        samples.append((time.perf_counter() - started) * 1000)
+    month_seconds = time.perf_counter() - month_started
+
+    peaks = []
+    for report in reports[:50]:
+        tracemalloc.start()
+        render(report)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 4),
+        'p95_ms': round(samples[int(len(samples) * 0.95) - 1], 4),
+        'peak_alloc_bytes': int(statistics.median(peaks)),
+        'avg_output_bytes': size // len(reports),
+        'month_total_s': round(month_seconds, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reps', type=int, default=15, help='reps at the dealership')
+    parser.add_argument('--days', type=int, default=30, help='days in the month')
+    parser.add_argument('--hours', type=int, default=8, help='hours per report')
+    args = parser.parse_args()
+
+    reports = synthetic_reports(args.reps, args.days, args.hours)
+    results = {'reports': len(reports), 'hours_per_report': args.hours}
+    for label, render in (('pdf', render_pdf), ('pdf_uncached', render_pdf_uncached), ('text', render_text)):
+        results[label] = measure(render, reports)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
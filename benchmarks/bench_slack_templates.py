@@ -0,0 +1,166 @@
+"""Slack payload construction: pre-serialized templates vs dict + json.dumps.
+
+For the daily report and the check-in notification, compares
+
+* dict_dumps - the original approach: build the nested Block Kit dict, then
+               json.dumps the whole tree
+* template   - services.slack_templates: escape only the slots and join the
+               pre-serialized chunks
+
+checks both produce identical bytes, and reports payloads/sec, bytes/sec
+and tracemalloc peak per payload.
+
+    python benchmarks/bench_slack_templates.py [--iterations 20000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from routes.activity_slack import build_report_message
+from routes.checkin import build_checkin_message, format_device_display, format_distance_text
+from services import scoring
+
+LOCAL_TIME = datetime(2024, 5, 17, 17, 0)
+
+
+def legacy_report_message(name, activities, total_metrics, scores, dealership_info, checkin_time, local_time):
+    """The original send_to_slack message construction, kept for comparison"""
+    context_parts = [f"*Date:* {local_time.strftime('%Y-%m-%d')}", f"*Total Score:* {scores.total_score} points"]
+    if dealership_info:
+        context_parts.append(f"*📍 Location:* {dealership_info}")
+    if checkin_time:
+        context_parts.append(f"*🕐 Check-in Time:* {checkin_time}")
+    message = {
+        "text": f"📊 Daily Activity Report - {name}",
+        "blocks": [
+            {"type": "header", "text": {"type": "plain_text", "text": f"📊 Daily Activity Report - {name}"}},
+            {"type": "context", "elements": [{"type": "mrkdwn", "text": " | ".join(context_parts)}]},
+            {"type": "section", "text": {"type": "mrkdwn", "text": "*📈 Daily Summary:*"}},
+            {
+                "type": "section",
+                "fields": [
+                    {"type": "mrkdwn", "text": f"*🚗 Cars Sold:* {total_metrics['cars_sold']}"},
+                    {"type": "mrkdwn", "text": f"*🚚 Cars Delivered:* {total_metrics['cars_delivered']}"},
+                    {"type": "mrkdwn", "text": f"*📞 Quote Calls:* {total_metrics['quote_calls']}"},
+                    {"type": "mrkdwn", "text": f"*📅 Appointments Generated:* {total_metrics['appointments_generated']}"},
+                    {"type": "mrkdwn", "text": f"*🤝 In-Person Appointments:* {total_metrics['in_person_appointments']}"},
+                    {"type": "mrkdwn", "text": f"*☎️ Phone Appointments:* {total_metrics['phone_appointments']}"}
+                ]
+            }
+        ]
+    }
+    hourly_details = []
+    for i, activity in enumerate(activities):
+        if activity.get('description', '').strip():
+            stars = "⭐" * scores.ratings[i]
+            hourly_details.append(f"*Hour {i + 1}:* {activity.get('description', '')} {stars}")
+    if hourly_details:
+        message["blocks"].append({
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": "*🕐 Hourly Activities:*\n" + "\n".join(hourly_details[:5])}
+        })
+    return json.dumps(message)
+
+
+def legacy_checkin_message(user_name, dealership_name, checkin_time, distance, device_type):
+    """The original send_checkin_slack_notification message construction"""
+    message = {
+        "blocks": [
+            {"type": "header", "text": {"type": "plain_text", "text": "🏢 Dealership Check-In"}},
+            {
+                "type": "section",
+                "fields": [
+                    {"type": "mrkdwn", "text": f"*Name:*\n{user_name}"},
+                    {"type": "mrkdwn", "text": f"*Location:*\n{dealership_name}"},
+                    {"type": "mrkdwn", "text": f"*Time:*\n{checkin_time} Eastern"},
+                    {"type": "mrkdwn", "text": f"*Device:*\n{format_device_display(device_type)}"},
+                    {"type": "mrkdwn", "text": f"*Accuracy:*\n{format_distance_text(distance)}"}
+                ]
+            },
+            {
+                "type": "context",
+                "elements": [{
+                    "type": "mrkdwn",
+                    "text": f"👤 {user_name} • 📍 Location verified • ✅ Check-in successful • 🕐 {checkin_time}"
+                }]
+            }
+        ]
+    }
+    return json.dumps(message)
+
+
+def synthetic_cases(count):
+    rng = random.Random(3)
+    names = ['Jane Doe', 'José "Pepe" Núñez', 'Li Wei', "O'Brien \\ Sons", 'Zoë\tTab']
+    reports, checkins = [], []
+    for _ in range(count):
+        activities = [
+            {
+                'description': rng.choice(['', 'Follow-up calls', 'Walk-in "VIP" customers', 'Posted on marketplace\nand answered leads']),
+                **{key: rng.randint(0, 4) for key in scoring.METRIC_KEYS}
+            }
+            for _ in range(8)
+        ]
+        scores = scoring.score_activities(activities)
+        reports.append((rng.choice(names), activities, scoring.totals_dict(scores), scores,
+                        rng.choice(['Markham Honda', None]), rng.choice(['2024-05-17 09:02:11', None]), LOCAL_TIME))
+        checkins.append((rng.choice(names), 'Markham Honda', '2024-05-17 09:02:11',
+                         rng.choice([None, 12.4, 87.0]), rng.choice(['mobile', 'pc'])))
+    return reports, checkins
+
+
+def measure(build, cases, iterations):
+    for case in cases[:100]:
+        build(*case)
+    total_bytes = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        total_bytes += len(build(*cases[i % len(cases)]).encode('utf-8'))
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    build(*cases[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'payloads_per_sec': round(iterations / elapsed),
+        'bytes_per_sec': round(total_bytes / elapsed),
+        'us_per_payload': round(elapsed / iterations * 1e6, 3),
+        'peak_alloc_bytes': peak
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    reports, checkins = synthetic_cases(500)
+    for case in reports:
+        assert build_report_message(*case) == legacy_report_message(*case)
+    for case in checkins:
+        assert build_checkin_message(*case) == legacy_checkin_message(*case)
+
+    results = {
+        'report': {
+            'dict_dumps': measure(legacy_report_message, reports, args.iterations),
+            'template': measure(build_report_message, reports, args.iterations)
+        },
+        'checkin': {
+            'dict_dumps': measure(legacy_checkin_message, checkins, args.iterations),
+            'template': measure(build_checkin_message, checkins, args.iterations)
+        }
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
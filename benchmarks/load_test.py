@@ -0,0 +1,357 @@
+"""End-to-end load test of the /api endpoints against a stub Slack webhook.
+
+Starts the app under werkzeug's threaded WSGI server in a child process (so
+the load generator does not share its GIL), points SLACK_WEBHOOK_URL at the
+stub from scripts/stub_slack_server.py, then drives each endpoint in turn with
+--concurrency keep-alive clients and reports throughput and latency
+percentiles per endpoint:
+
+* dealerships      GET  /api/dealerships
+* verify_location  POST /api/verify-location
+* checkin          POST /api/checkin
+* calculate_rating POST /api/activities/calculate-rating
+* pdf              POST /api/activities/pdf
+* slack            POST /api/activities/slack
+
+Results are written as JSON (--output) together with the run settings and
+the stub's delivery counts. Pass --baseline with an earlier results file to
+flag endpoints whose p95 or throughput regressed by more than --tolerance.
+
+    python benchmarks/load_test.py [--concurrency 16] [--duration 10]
+        [--slack-latency-ms 50] [--slack-error-rate 0.05] [--output results.json]
+    python benchmarks/load_test.py --url http://127.0.0.1:5000  # existing server
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from services import dealership_registry, scoring
+from stub_slack_server import start_stub_server
+
+ENDPOINTS = ('dealerships', 'verify_location', 'checkin', 'calculate_rating', 'pdf', 'slack')
+PERCENTILES = (50, 90, 95, 99)
+USER_AGENTS = (
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36'
+)
+
+
+def serve(port):
+    """Child process: run the app under werkzeug's threaded server until killed"""
+    sys.path.insert(0, SRC)
+    from werkzeug.serving import make_server
+
+    import main as app_module
+    server = make_server('127.0.0.1', port, app_module.app, threaded=True)
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(slack_url, workdir):
+    """Start the app in a child process with its databases in workdir and wait until it answers"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        SLACK_WEBHOOK_URL=slack_url,
+        ACTIVITY_DB_PATH=os.path.join(workdir, 'activity.sqlite3'),
+        OUTBOX_DB_PATH=os.path.join(workdir, 'outbox.sqlite3'),
+        IDEMPOTENCY_DB_PATH=os.path.join(workdir, 'idempotency.sqlite3'),
+        LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING')
+    )
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)], env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'app server exited with status {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/dealerships')
+            connection.getresponse().read()
+            connection.close()
+            return process, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('app server did not start within 30s')
+
+
+def synthetic_activities(rng, hours):
+    return [
+        {
+            'description': rng.choice(['Follow-up calls', 'Walk-in customers', 'Delivery prep and paperwork']),
+            **{key: rng.randint(0, 4) for key in scoring.METRIC_KEYS}
+        }
+        for _ in range(hours)
+    ]
+
+
+class Scenario:
+    """Builds requests for one endpoint; token is a check-in token shared by the report endpoints"""
+
+    def __init__(self, dealerships, token, hours, seed):
+        self.dealerships = [d for d in dealerships if d['latitude'] and d['longitude']]
+        self.token = token
+        self.hours = hours
+        self.rng = random.Random(seed)
+
+    def _fix_near(self, dealership):
+        # Within ~100 m of the site so verification succeeds
+        return (dealership['latitude'] + self.rng.uniform(-0.0008, 0.0008),
+                dealership['longitude'] + self.rng.uniform(-0.0008, 0.0008))
+
+    def request(self, endpoint):
+        """(method, path, body dict or None, headers)"""
+        headers = {'User-Agent': self.rng.choice(USER_AGENTS)}
+        if endpoint == 'dealerships':
+            return 'GET', '/api/dealerships', None, headers
+
+        dealership = self.rng.choice(self.dealerships)
+        if endpoint == 'verify_location':
+            lat, lng = self._fix_near(dealership)
+            return 'POST', '/api/verify-location', {
+                'dealership_id': dealership['id'], 'user_latitude': lat, 'user_longitude': lng
+            }, headers
+        if endpoint == 'checkin':
+            lat, lng = self._fix_near(dealership)
+            return 'POST', '/api/checkin', {
+                'user_name': f'Load Rep {self.rng.randrange(500)}',
+                'dealership_id': dealership['id'],
+                'dealership_name': dealership['name'],
+                'user_latitude': lat,
+                'user_longitude': lng
+            }, headers
+        if endpoint == 'calculate_rating':
+            return 'POST', '/api/activities/calculate-rating', synthetic_activities(self.rng, 1)[0], headers
+
+        headers['X-Checkin-Token'] = self.token
+        body = {'name': f'Load Rep {self.rng.randrange(500)}', 'activities': synthetic_activities(self.rng, self.hours)}
+        if endpoint == 'pdf':
+            return 'POST', '/api/activities/pdf', body, headers
+        if endpoint == 'slack':
+            return 'POST', '/api/activities/slack', body, headers
+        raise ValueError(f'unknown endpoint {endpoint}')
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def drive(base_url, endpoint, scenario_factory, concurrency, duration, warmup):
+    """Run concurrency keep-alive clients against one endpoint for duration seconds"""
+    target = urllib.parse.urlsplit(base_url)
+    samples = []
+    statuses = {}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency + 1)
+    state = {'measuring': False, 'stop': False}
+
+    def client(worker):
+        scenario = scenario_factory(worker)
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        local_samples = []
+        local_statuses = {}
+        start_barrier.wait()
+        while not state['stop']:
+            method, path, body, headers = scenario.request(endpoint)
+            payload = None
+            if body is not None:
+                payload = json.dumps(body).encode('utf-8')
+                headers['Content-Type'] = 'application/json'
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, payload, headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            if state['measuring']:
+                local_samples.append(elapsed)
+                local_statuses[status] = local_statuses.get(status, 0) + 1
+        connection.close()
+        with lock:
+            samples.extend(local_samples)
+            for status, count in local_statuses.items():
+                statuses[str(status)] = statuses.get(str(status), 0) + count
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    time.sleep(warmup)
+    state['measuring'] = True
+    measured_from = time.perf_counter()
+    time.sleep(duration)
+    state['measuring'] = False
+    measured_seconds = time.perf_counter() - measured_from
+    state['stop'] = True
+    for thread in threads:
+        thread.join()
+
+    samples.sort()
+    ok = sum(count for status, count in statuses.items() if status.isdigit() and int(status) < 400)
+    result = {
+        'requests': len(samples),
+        'ok': ok,
+        'statuses': statuses,
+        'throughput_rps': round(len(samples) / measured_seconds, 1),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3) if samples else None,
+        'max_ms': round(samples[-1] * 1000, 3) if samples else None
+    }
+    for pct in PERCENTILES:
+        value = percentile(samples, pct)
+        result[f'p{pct}_ms'] = round(value * 1000, 3) if value is not None else None
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Endpoints whose p95 grew or throughput fell by more than tolerance versus baseline"""
+    regressions = []
+    for endpoint, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(endpoint)
+        if not previous:
+            continue
+        if previous.get('p95_ms') and current.get('p95_ms') and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append({'endpoint': endpoint, 'metric': 'p95_ms', 'baseline': previous['p95_ms'], 'current': current['p95_ms']})
+        if previous.get('throughput_rps') and current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append({
+                'endpoint': endpoint, 'metric': 'throughput_rps',
+                'baseline': previous['throughput_rps'], 'current': current['throughput_rps']
+            })
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help='load an already running server instead of starting one')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='comma-separated subset of ' + ','.join(ENDPOINTS))
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=10, help='measured seconds per endpoint')
+    parser.add_argument('--warmup', type=float, default=1, help='unmeasured seconds before each endpoint')
+    parser.add_argument('--hours', type=int, default=8, help='hours per submitted report')
+    parser.add_argument('--slack-latency-ms', type=float, default=50, help='stub webhook response delay')
+    parser.add_argument('--slack-error-rate', type=float, default=0.0, help='fraction of webhook posts answered with 500')
+    parser.add_argument('--slack-rate-limit-rate', type=float, default=0.0, help='fraction of webhook posts answered with 429')
+    parser.add_argument('--output', help='write the results JSON here (default: stdout only)')
+    parser.add_argument('--baseline', help='earlier results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression versus --baseline')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(sorted(unknown))}")
+
+    stub = start_stub_server(
+        latency_ms=args.slack_latency_ms,
+        error_rate=args.slack_error_rate,
+        rate_limit_rate=args.slack_rate_limit_rate
+    )
+    process = None
+    workdir = tempfile.TemporaryDirectory(prefix='activity-logger-load-')
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            process, base_url = start_app(stub.url, workdir.name)
+
+        dealerships = dealership_registry.load_registry()[0]
+        target = urllib.parse.urlsplit(base_url)
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        first = next(d for d in dealerships if d['latitude'] and d['longitude'])
+        connection.request('POST', '/api/checkin', json.dumps({
+            'user_name': 'Load Rep', 'dealership_id': first['id'], 'dealership_name': first['name'],
+            'user_latitude': first['latitude'], 'user_longitude': first['longitude']
+        }), {'Content-Type': 'application/json'})
+        token = json.loads(connection.getresponse().read())['checkin_token']
+        connection.close()
+
+        results = {
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'settings': {
+                'concurrency': args.concurrency,
+                'duration_s': args.duration,
+                'warmup_s': args.warmup,
+                'hours_per_report': args.hours,
+                'slack_latency_ms': args.slack_latency_ms,
+                'slack_error_rate': args.slack_error_rate,
+                'slack_rate_limit_rate': args.slack_rate_limit_rate,
+                'external_server': bool(args.url)
+            },
+            'endpoints': {}
+        }
+        for endpoint in endpoints:
+            results['endpoints'][endpoint] = drive(
+                base_url, endpoint,
+                lambda worker: Scenario(dealerships, token, args.hours, seed=worker),
+                args.concurrency, args.duration, args.warmup
+            )
+            print(f"{endpoint}: {json.dumps(results['endpoints'][endpoint])}", file=sys.stderr)
+
+        with stub.lock:
+            results['slack_stub'] = dict(stub.stats)
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            results['baseline'] = {'file': args.baseline, 'git_revision': baseline.get('git_revision'), 'tolerance': args.tolerance}
+            results['regressions'] = compare(results, baseline, args.tolerance)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        stub.shutdown()
+        workdir.cleanup()
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    if results.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
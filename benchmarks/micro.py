@@ -0,0 +1,232 @@
+"""Micro-benchmarks of the pure hot functions, with alternative implementations.
+
+Each group times the current implementation next to alternatives on the same
+synthetic data and reports items/sec plus tracemalloc peak bytes for one
+pass:
+
+* distance      - 100k GPS fixes against 10k dealerships: calculate_distance
+                  per fix, geo.haversine_distance direct, geo.haversine_many
+* device        - detect_device_type over 100k user agents vs a precompiled
+                  regex and an lru_cache'd lookup
+* dealerships   - loading a 10k-dealership registry: text parse + index build
+                  vs the compiled snapshot
+* scoring       - a 10k-hour report: score_activities and the original
+                  per-hour dict loop; plus per-hour ratings
+* slack_message - serialized Block Kit payload for the 10k-hour report
+                  (build_report_message; see bench_slack_templates.py for
+                  the template vs dict + json.dumps comparison)
+
+    python benchmarks/micro.py [--groups distance,scoring] [--repeat 5]
+        [--dealerships 10000] [--fixes 100000] [--hours 10000] [--output micro.json]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from functools import lru_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from routes.activity_slack import build_report_message
+from routes.checkin import calculate_distance, detect_device_type
+from services import dealership_registry, geo, scoring
+
+from bench_cold_start import synthetic_source
+
+GROUPS = ('distance', 'device', 'dealerships', 'scoring', 'slack_message')
+USER_AGENTS = (
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 Chrome/124.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    ''
+)
+
+
+def measure(func, items, repeat):
+    """Median wall time over repeat runs, as items/sec, plus peak traced bytes of one run"""
+    func()  # warm imports and caches the alternative relies on
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    median = statistics.median(samples)
+    return {
+        'items': items,
+        'median_ms': round(median * 1000, 3),
+        'ops_per_sec': round(items / median) if median else None,
+        'peak_alloc_bytes': peak
+    }
+
+
+# Alternatives kept here so the current code can be compared against them
+
+_MOBILE_PATTERN = re.compile('mobile|android|iphone|ipad|ipod|blackberry|windows phone|opera mini')
+
+def detect_device_type_regex(user_agent):
+    if not user_agent:
+        return "unknown"
+    return "mobile" if _MOBILE_PATTERN.search(user_agent.lower()) else "pc"
+
+detect_device_type_cached = lru_cache(maxsize=1024)(detect_device_type)
+
+def score_per_hour_dicts(activities):
+    """The original scoring loop: weight dict per hour, then totals per metric"""
+    weights = dict(zip(scoring.METRIC_KEYS, scoring.WEIGHTS))
+    hour_scores = []
+    ratings = []
+    totals = {key: 0 for key in scoring.METRIC_KEYS}
+    for activity in activities:
+        score = 0
+        for key, weight in weights.items():
+            value = scoring.parse_metric(activity.get(key, 0))
+            score += value * weight
+            totals[key] += value
+        hour_scores.append(score)
+        ratings.append(scoring.rating_for_score(score))
+    return hour_scores, ratings, totals, sum(hour_scores)
+
+
+def bench_distance(args, rng):
+    dealerships = [(rng.uniform(42.0, 46.0), rng.uniform(-82.0, -76.0)) for _ in range(args.dealerships)]
+    sites = [rng.choice(dealerships) for _ in range(args.fixes)]
+    fixes = [(lat + rng.uniform(-0.01, 0.01), lng + rng.uniform(-0.01, 0.01)) for lat, lng in sites]
+    lats1, lngs1 = [f[0] for f in fixes], [f[1] for f in fixes]
+    lats2, lngs2 = [s[0] for s in sites], [s[1] for s in sites]
+
+    return {
+        'calculate_distance': measure(
+            lambda: [calculate_distance(a, b, c, d) for a, b, c, d in zip(lats1, lngs1, lats2, lngs2)], args.fixes, args.repeat),
+        'haversine_distance': measure(
+            lambda: [geo.haversine_distance(a, b, c, d) for a, b, c, d in zip(lats1, lngs1, lats2, lngs2)], args.fixes, args.repeat),
+        'haversine_many': measure(lambda: geo.haversine_many(lats1, lngs1, lats2, lngs2), args.fixes, args.repeat)
+    }
+
+
+def bench_device(args, rng):
+    agents = [rng.choice(USER_AGENTS) for _ in range(args.fixes)]
+
+    def cached():
+        detect_device_type_cached.cache_clear()
+        return [detect_device_type_cached(agent) for agent in agents]
+
+    assert [detect_device_type(a) for a in USER_AGENTS] == [detect_device_type_regex(a) for a in USER_AGENTS]
+    return {
+        'detect_device_type': measure(lambda: [detect_device_type(agent) for agent in agents], args.fixes, args.repeat),
+        'regex': measure(lambda: [detect_device_type_regex(agent) for agent in agents], args.fixes, args.repeat),
+        'lru_cache': measure(cached, args.fixes, args.repeat)
+    }
+
+
+def bench_dealerships(args, rng):
+    content, coordinates = synthetic_source(args.dealerships)
+    original = dealership_registry.DEALERSHIP_COORDINATES
+    dealership_registry.DEALERSHIP_COORDINATES = coordinates
+    try:
+        snapshot_text = json.dumps(dealership_registry.compile_snapshot(content), separators=(',', ':'))
+
+        def text():
+            dealership_registry.build_index(dealership_registry.parse_dealership_text(content))
+
+        def snapshot():
+            data = json.loads(snapshot_text)
+            geo.SpatialIndex.from_arrays(data['dealerships'], data['index'])
+
+        return {
+            'text_parse_and_index': measure(text, args.dealerships, args.repeat),
+            'snapshot': measure(snapshot, args.dealerships, args.repeat),
+            'snapshot_bytes': len(snapshot_text)
+        }
+    finally:
+        dealership_registry.DEALERSHIP_COORDINATES = original
+
+
+def synthetic_report(rng, hours):
+    return [
+        {
+            'description': rng.choice(['Follow-up calls', 'Walk-in customers', '', 'Delivery prep and paperwork']),
+            **{key: str(rng.randint(0, 4)) for key in scoring.METRIC_KEYS}
+        }
+        for _ in range(hours)
+    ]
+
+
+def bench_scoring(args, rng):
+    activities = synthetic_report(rng, args.hours)
+    vectors = [scoring.activity_vector(activity) for activity in activities]
+
+    expected = scoring.score_activities(activities)
+    assert score_per_hour_dicts(activities)[3] == expected.total_score
+    return {
+        'score_activities': measure(lambda: scoring.score_activities(activities), args.hours, args.repeat),
+        'per_hour_dicts': measure(lambda: score_per_hour_dicts(activities), args.hours, args.repeat),
+        'rating_per_hour': measure(
+            lambda: [scoring.rating_for_score(scoring.score_vector(vector)) for vector in vectors], args.hours, args.repeat)
+    }
+
+
+def bench_slack_message(args, rng):
+    activities = synthetic_report(rng, args.hours)
+    scores = scoring.score_activities(activities)
+    totals = scoring.totals_dict(scores)
+    local_time = datetime(2024, 5, 17, 17, 0)
+
+    def build():
+        return build_report_message('Jane Doe', activities, totals, scores, 'Markham Honda', '2024-05-17 09:02:11', local_time)
+
+    return {
+        'build_report_message': measure(build, args.hours, args.repeat),
+        'payload_bytes': len(build().encode('utf-8'))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', default=','.join(GROUPS), help='comma-separated subset of ' + ','.join(GROUPS))
+    parser.add_argument('--dealerships', type=int, default=10000)
+    parser.add_argument('--fixes', type=int, default=100000, help='GPS fixes / user agents')
+    parser.add_argument('--hours', type=int, default=10000, help='hours in the synthetic report')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='also write the results JSON here')
+    args = parser.parse_args()
+
+    groups = [name.strip() for name in args.groups.split(',') if name.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(sorted(unknown))}")
+
+    benches = {
+        'distance': bench_distance,
+        'device': bench_device,
+        'dealerships': bench_dealerships,
+        'scoring': bench_scoring,
+        'slack_message': bench_slack_message
+    }
+    results = {
+        'settings': {'dealerships': args.dealerships, 'fixes': args.fixes, 'hours': args.hours, 'repeat': args.repeat}
+    }
+    for group in groups:
+        results[group] = benches[group](args, random.Random(42))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
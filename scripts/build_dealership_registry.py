@@ -0,0 +1,49 @@
+"""Compile src/static/dealership_addresses.txt into the precomputed registry snapshot.
+
+The snapshot holds the parsed records plus the prebuilt spatial index, so a
+cold start loads one JSON file instead of parsing text and building the
+k-d tree. Run after editing the address file or the coordinate table and
+commit the result:
+
+    python scripts/build_dealership_registry.py          # write src/static/dealerships.json
+    python scripts/build_dealership_registry.py --check  # exit 1 if the snapshot is stale
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services import dealership_registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--check', action='store_true', help='verify the snapshot is up to date without writing it')
+    args = parser.parse_args()
+
+    path = dealership_registry.SNAPSHOT_PATH
+    snapshot = dealership_registry.compile_snapshot(dealership_registry.read_source())
+    rendered = json.dumps(snapshot, separators=(',', ':')) + '\n'
+
+    if args.check:
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                current = file.read()
+        except FileNotFoundError:
+            current = None
+        if current != rendered:
+            print(f"{path} is stale - run scripts/build_dealership_registry.py")
+            return 1
+        print(f"{path} is up to date (version {snapshot['version']})")
+        return 0
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(rendered)
+    print(f"Wrote {len(snapshot['dealerships'])} dealerships to {path} (version {snapshot['version']})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
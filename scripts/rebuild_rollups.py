@@ -0,0 +1,36 @@
+"""Recompute the leaderboard rollups from the stored reports and hourly rows.
+
+Rollups are maintained as each report is submitted; run this after
+restoring a database, deleting reports by hand or changing the scoring
+weights (every stored hour is rescored from its metrics with the current
+weights first, and report totals follow):
+
+    python scripts/rebuild_rollups.py                  # uses ACTIVITY_DB_PATH
+    python scripts/rebuild_rollups.py --db path/to/activity_logger.sqlite3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services import activity_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='activity database path (default: ACTIVITY_DB_PATH)')
+    args = parser.parse_args()
+
+    if args.db:
+        activity_store.ACTIVITY_DB_PATH = args.db
+
+    started = time.perf_counter()
+    rows = activity_store.rebuild_rollups()
+    print(f"Rebuilt {rows} rollup rows in {activity_store.ACTIVITY_DB_PATH} ({time.perf_counter() - started:.2f}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
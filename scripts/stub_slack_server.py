@@ -0,0 +1,130 @@
+"""Local stand-in for a Slack incoming webhook.
+
+Point SLACK_WEBHOOK_URL at it to exercise delivery, retries and dead-lettering
+without touching a real channel:
+
+    python scripts/stub_slack_server.py --port 8765 --error-rate 0.2 --rate-limit-rate 0.1
+    SLACK_WEBHOOK_URL=http://127.0.0.1:8765/hook python src/main.py
+
+GET /stats returns counts of received, accepted and rejected messages.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubSlackServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0, error_rate=0.0, rate_limit_rate=0.0, retry_after=1):
+        super().__init__(address, StubSlackHandler)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.stats = {'received': 0, 'accepted': 0, 'errors': 0, 'rate_limited': 0}
+        self.messages = []
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/hook"
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+class StubSlackHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != '/stats':
+            self._reply(404, 'not_found')
+            return
+        with self.server.lock:
+            body = json.dumps(self.server.stats)
+        self._reply(200, body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        self.server.count('received')
+
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000.0)
+
+        roll = random.random()
+        if roll < self.server.rate_limit_rate:
+            self.server.count('rate_limited')
+            self._reply(429, 'rate_limited', {'Retry-After': str(self.server.retry_after)})
+            return
+        if roll < self.server.rate_limit_rate + self.server.error_rate:
+            self.server.count('errors')
+            self._reply(500, 'internal_error')
+            return
+
+        try:
+            json.loads(body)
+        except ValueError:
+            self.server.count('errors')
+            self._reply(400, 'invalid_payload')
+            return
+
+        self.server.count('accepted')
+        with self.server.lock:
+            self.server.messages.append(body)
+        self._reply(200, 'ok')
+
+
+def start_stub_server(host='127.0.0.1', port=0, **options):
+    """Start a stub webhook server on a background thread and return it"""
+    server = StubSlackServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, name='stub-slack', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay before each response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429s')
+    args = parser.parse_args()
+
+    server = StubSlackServer(
+        (args.host, args.port),
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after
+    )
+    print(f"Stub Slack webhook listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
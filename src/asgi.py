@@ -0,0 +1,157 @@
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from main import app
+from services import metrics, slack_delivery
+
+# ASGI entry point: uvicorn asgi:application --app-dir src
+#
+# The event loop accepts connections and buffers request bodies, then the
+# Flask app runs on a bounded thread pool, so requests run side by side up
+# to ASGI_THREADS and the rest wait on the loop instead of holding a worker.
+# Response chunks are handed back to the loop as the app yields them, which
+# keeps streamed exports streaming. Vercel keeps using the WSGI app in main.py.
+#
+# With the outbox workers running (the default on a long-running host) Slack
+# webhooks are posted off the request path. With SLACK_QUEUE_WORKERS=0 (or a
+# serverless environment) check-ins and reports post them inline, holding a
+# pool thread for up to WEBHOOK_CONNECT_TIMEOUT + WEBHOOK_READ_TIMEOUT (13 s by
+# default) while a webhook hangs, so the default pool is four times larger to
+# keep a slow Slack from starving requests that only do local work.
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', '256' if slack_delivery.delivers_inline() else '64'))
+
+_executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix='asgi')
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+metrics.gauge('asgi_requests_in_flight', 'Requests running or waiting for an ASGI worker thread',
+              callback=lambda: {(): _in_flight})
+metrics.gauge('asgi_worker_threads', 'Size of the ASGI worker thread pool', callback=lambda: {(): ASGI_THREADS})
+
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope and its buffered body"""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'] = client[0]
+        environ['REMOTE_PORT'] = str(client[1])
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH' or name == 'CONTENT_TYPE':
+            key = name
+        else:
+            key = f'HTTP_{name}'
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+def run_wsgi(wsgi_app, environ, send, loop):
+    """Call the WSGI app on a pool thread, passing each response chunk to the loop"""
+    response = {}
+
+    def emit(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response.get('started'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+        ]
+
+    def start():
+        if not response.get('started'):
+            response['started'] = True
+            emit({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+
+    chunks = wsgi_app(environ, start_response)
+    try:
+        for chunk in chunks:
+            if chunk:
+                start()
+                emit({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        start()
+        emit({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+class PooledWsgiToAsgi:
+    """WSGI-to-ASGI adapter that runs requests concurrently and answers lifespan events"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"unsupported ASGI scope type {scope['type']!r}")
+
+        global _in_flight
+        with _in_flight_lock:
+            _in_flight += 1
+        try:
+            body = []
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+
+            loop = asyncio.get_running_loop()
+            environ = build_environ(scope, b''.join(body))
+            await loop.run_in_executor(_executor, run_wsgi, self.wsgi_app, environ, send, loop)
+        finally:
+            with _in_flight_lock:
+                _in_flight -= 1
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Connections are closed by now; the logging queue is flushed at exit
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = PooledWsgiToAsgi(app)
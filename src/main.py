@@ -3,22 +3,46 @@ import sys
 # Required for Vercel
 sys.path.insert(0, os.path.dirname(__file__))
 
-from flask import Flask, redirect, send_from_directory, jsonify
+from flask import Flask, Response, redirect, jsonify
 from flask_cors import CORS
 
+# Route logging through the JSON queue handler before any module logs
+from services import structured_logging
+structured_logging.configure()
+
 # Import blueprints
 from routes.checkin import checkin_bp
 from routes.activity_slack import activity_bp
+from routes.deliveries import delivery_bp
+from routes.history import history_bp
+from services import metrics, notification_router, scoring
+from services.http_cache import static_file_response
 
-app = Flask(__name__, static_folder='static', static_url_path='/static')
+# Static files are served by the cached route below instead of Flask's built-in one
+app = Flask(__name__, static_folder=None)
 CORS(app)
 
+STATIC_DIR = os.path.join(app.root_path, 'static')
+
+# Pages load /api/scoring.js by version, so browsers keep it as immutable until the weights change
+PAGE_SUBSTITUTIONS = {
+    'index.html': {b'src="/api/scoring.js"': f'src="/api/scoring.js?v={scoring.SCORING_VERSION}"'.encode('utf-8')}
+}
+
 # Configure Flask
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'fallback-secret-key-change-in-production')
 
+# Compile notification routes now so a bad NOTIFICATION_ROUTES fails at startup
+notification_router.get_router()
+
+# Time every request (route latency histograms for /metrics)
+metrics.instrument_app(app)
+
 # Register blueprints with /api prefix
 app.register_blueprint(checkin_bp, url_prefix='/api')
 app.register_blueprint(activity_bp, url_prefix='/api')
+app.register_blueprint(delivery_bp, url_prefix='/api')
+app.register_blueprint(history_bp, url_prefix='/api')
 
 # Root route - redirect to check-in
 @app.route('/')
@@ -28,18 +52,28 @@ def index():
 # Serve check-in page
 @app.route('/checkin.html')
 def checkin():
-    return send_from_directory('static', 'checkin.html')
+    return static_file_response(STATIC_DIR, 'checkin.html')
 
 # Serve activity logging page
 @app.route('/index.html')
 def activity_page():
-    return send_from_directory('static', 'index.html')
+    return static_file_response(STATIC_DIR, 'index.html', substitutions=PAGE_SUBSTITUTIONS['index.html'])
+
+# Serve static assets (precompressed, ETag revalidation)
+@app.route('/static/<path:filename>')
+def static_files(filename):
+    return static_file_response(STATIC_DIR, filename, substitutions=PAGE_SUBSTITUTIONS.get(filename))
 
 # Health check endpoint
 @app.route('/health')
 def health():
     return jsonify({"status": "healthy", "message": "Activity Logger is running"})
 
+# Prometheus metrics: route latency, Slack webhook latency/outcomes, queue depths, dealership loading
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 # For local development
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
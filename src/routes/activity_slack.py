@@ -1,396 +1,597 @@
-from flask import Blueprint, jsonify, request, send_file, session
+from flask import Blueprint, Response, jsonify, request, send_file
 from datetime import datetime
 import io
 import json
-import urllib.request
-import urllib.parse
-import urllib.error
-import os
+import logging
+
+from services import activity_store, http_cache, idempotency, metrics, notification_router, pdf_report, scoring, slack_delivery, slack_templates
+from routes.checkin import clear_checkin_session, current_checkin
 
 activity_bp = Blueprint('activity', __name__, url_prefix='/api')
 
-def send_to_slack(name, activities, total_metrics, dealership_info=None, checkin_time=None, webhook_url=None):
-    """Send activity log to Slack channel."""
-    # Get webhook URL from environment variable
-    slack_webhook_url = os.environ.get('SLACK_WEBHOOK_URL')
+logger = logging.getLogger(__name__)
+
+# Largest number of reports accepted by the batch endpoints
+MAX_BATCH_REPORTS = 5000
+# Described hours listed in a Slack report
+HOURLY_DETAILS_IN_SLACK = 5
+# Largest number of hours rated in one /activities/calculate-ratings call
+MAX_RATING_HOURS = 24
+# Reps listed in a Slack leaderboard summary
+LEADERBOARD_SIZE = 10
+# /api/scoring.js?v=<version> never changes; the bare URL revalidates with its ETag
+SCORING_JS_CACHE_CONTROL = 'public, no-cache'
+SCORING_JS_VERSIONED_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_scoring_js_entry = None
+
+def _rating_cache_lookups():
+    info = scoring.rate_vector.cache_info()
+    return {('hit',): info.hits, ('miss',): info.misses}
+
+metrics.counter('rating_cache_lookups_total', 'Hourly rating cache lookups by result', ('result',), callback=_rating_cache_lookups)
+
+def eastern_now():
+    """Current time in Eastern Time (Toronto)"""
+    import pytz
+    eastern = pytz.timezone('America/Toronto')
+    utc_now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+    return utc_now.astimezone(eastern)
+
+def render_activity_log(name, activities, scores, dealership_name, checkin_time, local_time):
+    """Render a day's activity log as a list of text lines"""
+    content = []
+    content.append(f"Daily Activity Log - {name}")
+    content.append(f"Date: {local_time.strftime('%Y-%m-%d')}")
+    content.append(f"Time: {local_time.strftime('%H:%M:%S')} Eastern")
+    content.append(f"Location: {dealership_name}")
+    if checkin_time:
+        content.append(f"Check-in Time: {checkin_time} Eastern")
+    content.append("-" * 50)
     
-    if not slack_webhook_url:
-        return False, "Slack webhook URL not configured. Please set SLACK_WEBHOOK_URL environment variable."
+    for i, activity in enumerate(activities):
+        hour_num = i + 1
+        content.append(f"\nHour {hour_num}:")
+        content.append(f"Activity Description: {activity.get('description', '')}")
+        content.append(f"Quote Calls: {activity.get('quote_calls', 0)}")
+        content.append(f"Appointments Generated: {activity.get('appointments_generated', 0)}")
+        content.append(f"In Person Appointments: {activity.get('in_person_appointments', 0)}")
+        content.append(f"Phone Appointments: {activity.get('phone_appointments', 0)}")
+        content.append(f"Cars Sold: {activity.get('cars_sold', 0)}")
+        content.append(f"Cars Delivered: {activity.get('cars_delivered', 0)}")
+        content.append(f"Advertisements Posted: {activity.get('advertisements_posted', 0)}")
+        content.append(f"Productivity Rating: {scores.ratings[i]} stars")
     
-    try:
-        # Calculate total productivity score
-        total_score = 0
-        for activity in activities:
-            score = (
-                int(activity.get('quote_calls', 0)) * 1 +
-                int(activity.get('appointments_generated', 0)) * 2 +
-                int(activity.get('in_person_appointments', 0)) * 4 +
-                int(activity.get('phone_appointments', 0)) * 3 +
-                int(activity.get('cars_sold', 0)) * 10 +
-                int(activity.get('cars_delivered', 0)) * 8 +
-                int(activity.get('advertisements_posted', 0)) * 1
-            )
-            total_score += score
-        
-        # Create location and check-in context
-        from datetime import datetime
-        import pytz
-        
-        # Use Eastern Time for date display
-        eastern = pytz.timezone('America/Toronto')
-        utc_now = datetime.utcnow().replace(tzinfo=pytz.UTC)
-        local_time = utc_now.astimezone(eastern)
-        
-        context_parts = [f"*Date:* {local_time.strftime('%Y-%m-%d')}", f"*Total Score:* {total_score} points"]
-        
-        if dealership_info:
-            context_parts.append(f"*📍 Location:* {dealership_info}")
-        
-        if checkin_time:
-            context_parts.append(f"*🕐 Check-in Time:* {checkin_time}")
-        
-        context_text = " | ".join(context_parts)
-        
-        # Create Slack message
-        message = {
-            "text": f"📊 Daily Activity Report - {name}",
-            "blocks": [
-                {
-                    "type": "header",
-                    "text": {
-                        "type": "plain_text",
-                        "text": f"📊 Daily Activity Report - {name}"
-                    }
-                },
-                {
-                    "type": "context",
-                    "elements": [
-                        {
-                            "type": "mrkdwn",
-                            "text": context_text
-                        }
-                    ]
-                },
-                {
-                    "type": "section",
-                    "text": {
+    # Add summary section
+    content.append("\n" + "=" * 50)
+    content.append("DAILY SUMMARY")
+    content.append("=" * 50)
+    for key, value in scoring.totals_dict(scores).items():
+        content.append(f"Total {key.replace('_', ' ').title()}: {value}")
+    
+    return content
+
+def _score_reports(reports):
+    """Validate and score a list of {name, activities} reports.
+
+    Returns (score_cards, None) or (None, error_response).
+    """
+    if not isinstance(reports, list) or len(reports) > MAX_BATCH_REPORTS:
+        return None, (jsonify({
+            'success': False,
+            'message': f'reports must be a list of at most {MAX_BATCH_REPORTS} reports'
+        }), 400)
+    
+    matrices = []
+    for index, report in enumerate(reports):
+        try:
+            activities = report.get('activities', [])
+            if not isinstance(activities, list):
+                raise TypeError('activities must be a list')
+            matrices.append(scoring.activity_matrix(activities))
+        except (AttributeError, TypeError, ValueError) as e:
+            return None, (jsonify({
+                'success': False,
+                'message': f'Invalid activity data in report {index}: {e}'
+            }), 400)
+    
+    return [scoring.score_matrix(matrix) for matrix in matrices], None
+
+SLACK_NOT_CONFIGURED = "Slack webhook URL not configured. Please set SLACK_WEBHOOK_URL environment variable."
+
+def _accepted(delivery):
+    """A destination counts once queued, or once actually posted when delivery is inline"""
+    if slack_delivery.delivers_inline():
+        return delivery.get('delivered', False)
+    return delivery['queued']
+
+def _delivery_result(deliveries):
+    """(success, message, deliveries) for a fan-out; success if any destination accepted it"""
+    accepted = sum(1 for delivery in deliveries if _accepted(delivery))
+    if slack_delivery.delivers_inline():
+        if not accepted:
+            return False, "Slack delivery failed, please try again shortly", deliveries
+        if accepted < len(deliveries):
+            return True, f"Sent to {accepted} of {len(deliveries)} Slack destinations", deliveries
+        return True, "Successfully sent to Slack", deliveries
+
+    if not accepted:
+        return False, "Unable to queue Slack delivery, please try again shortly", deliveries
+    if accepted < len(deliveries):
+        return True, f"Queued for {accepted} of {len(deliveries)} Slack destinations", deliveries
+    return True, "Queued for Slack delivery", deliveries
+
+def slack_status(success):
+    """X-Slack-Status value: success when posted inline, queued when handed to the workers"""
+    if not success:
+        return 'error'
+    return 'success' if slack_delivery.delivers_inline() else 'queued'
+
+def deliveries_header(deliveries):
+    """Per-destination status as "name=<delivery id or error>, ..." for response headers"""
+    return ', '.join(f"{delivery['destination']}={delivery['delivery_id'] or 'error'}" for delivery in deliveries)
+
+def send_leaderboard_to_slack(entries, local_time, title="Team Leaderboard"):
+    """Queue a leaderboard summary of scored reports for Slack.
+
+    entries is a list of (name, score_card) pairs. Returns (success, message, deliveries).
+    """
+    if not notification_router.is_configured('leaderboard'):
+        return False, SLACK_NOT_CONFIGURED, []
+    
+    ranked = sorted(entries, key=lambda entry: entry[1].total_score, reverse=True)
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    lines = []
+    for rank, (name, scores) in enumerate(ranked[:LEADERBOARD_SIZE], start=1):
+        totals = scoring.totals_dict(scores)
+        lines.append(
+            f"{medals.get(rank, f'{rank}.')} *{name}* — {scores.total_score} points "
+            f"(🚗 {totals['cars_sold']} • 🚚 {totals['cars_delivered']} • 📅 {totals['appointments_generated']})"
+        )
+    
+    team_totals = [0] * len(scoring.METRIC_KEYS)
+    for _, scores in ranked:
+        team_totals = [a + b for a, b in zip(team_totals, scores.totals)]
+    team_totals = dict(zip(scoring.METRIC_KEYS, team_totals))
+    team_score = sum(scores.total_score for _, scores in ranked)
+    
+    message = {
+        "text": f"🏆 {title} - {local_time.strftime('%Y-%m-%d')}",
+        "blocks": [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": f"🏆 {title} - {local_time.strftime('%Y-%m-%d')}"
+                }
+            },
+            {
+                "type": "context",
+                "elements": [
+                    {
                         "type": "mrkdwn",
-                        "text": "*📈 Daily Summary:*"
+                        "text": f"*Reps:* {len(ranked)} | *Team Score:* {team_score} points | "
+                                f"*🚗 Cars Sold:* {team_totals['cars_sold']} | *🚚 Cars Delivered:* {team_totals['cars_delivered']}"
                     }
-                },
-                {
-                    "type": "section",
-                    "fields": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*🚗 Cars Sold:* {total_metrics['cars_sold']}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*🚚 Cars Delivered:* {total_metrics['cars_delivered']}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*📞 Quote Calls:* {total_metrics['quote_calls']}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*📅 Appointments Generated:* {total_metrics['appointments_generated']}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*🤝 In-Person Appointments:* {total_metrics['in_person_appointments']}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*☎️ Phone Appointments:* {total_metrics['phone_appointments']}"
-                        }
-                    ]
-                }
-            ]
-        }
-        
-        # Add hourly breakdown if there are activities with descriptions
-        hourly_details = []
-        for i, activity in enumerate(activities):
-            if activity.get('description', '').strip():
-                hour_num = i + 1
-                score = (
-                    int(activity.get('quote_calls', 0)) * 2 +
-                    int(activity.get('appointments_generated', 0)) * 4 +
-                    int(activity.get('in_person_appointments', 0)) * 6 +
-                    int(activity.get('phone_appointments', 0)) * 3 +
-                    int(activity.get('cars_sold', 0)) * 10 +
-                    int(activity.get('cars_delivered', 0)) * 8 +
-                    int(activity.get('advertisements_posted', 0)) * 1
-                )
-                
-                # Calculate rating (1-5 stars)
-                if score >= 20:
-                    rating = 5
-                elif score >= 15:
-                    rating = 4
-                elif score >= 10:
-                    rating = 3
-                elif score >= 5:
-                    rating = 2
-                else:
-                    rating = 1
-                
-                stars = "⭐" * rating
-                hourly_details.append(f"*Hour {hour_num}:* {activity.get('description', '')} {stars}")
-        
-        if hourly_details:
-            message["blocks"].append({
+                ]
+            },
+            {
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": "*🕐 Hourly Activities:*\n" + "\n".join(hourly_details[:5])  # Limit to first 5 to avoid message length issues
+                    "text": "\n".join(lines) if lines else "_No reports submitted_"
                 }
-            })
-        
-        # Send to Slack
-        data = json.dumps(message).encode('utf-8')
-        req = urllib.request.Request(
-            slack_webhook_url,
-            data=data,
-            headers={'Content-Type': 'application/json'}
+            }
+        ]
+    }
+    
+    deliveries = notification_router.fan_out('leaderboard', message, description=f"{title} - {len(ranked)} reps")
+    return _delivery_result(deliveries)
+
+def store_report(name, activities, scores, dealership_id, dealership_name, checkin_time, local_time, idempotency_key=None):
+    """Persist a submitted report (once per idempotency key); storage problems never block the submission"""
+    try:
+        return idempotency.once(
+            'report',
+            idempotency_key,
+            lambda: activity_store.record_report(name, activities, scores, dealership_id, dealership_name, checkin_time, local_time),
+            keep=lambda report_id: report_id is not None
         )
+    except Exception as e:
+        logger.exception("Activity store error")
+        return None
+
+def build_report_message(name, activities, total_metrics, scores, dealership_info=None, checkin_time=None, local_time=None):
+    """Serialized Slack Block Kit payload for a daily activity report"""
+    total_score = scores.total_score
+    
+    # Use Eastern Time for date display
+    if local_time is None:
+        local_time = eastern_now()
+    
+    context_parts = [f"*Date:* {local_time.strftime('%Y-%m-%d')}", f"*Total Score:* {total_score} points"]
+    
+    if dealership_info:
+        context_parts.append(f"*📍 Location:* {dealership_info}")
+    
+    if checkin_time:
+        context_parts.append(f"*🕐 Check-in Time:* {checkin_time}")
+    
+    # Hourly breakdown of the first 5 described hours (to avoid message length issues)
+    hourly_details = []
+    for i, activity in enumerate(activities):
+        if activity.get('description', '').strip():
+            stars = "⭐" * scores.ratings[i]
+            hourly_details.append(f"*Hour {i + 1}:* {activity.get('description', '')} {stars}")
+            if len(hourly_details) == HOURLY_DETAILS_IN_SLACK:
+                break
+    
+    extra_blocks = []
+    if hourly_details:
+        extra_blocks.append({
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": "*🕐 Hourly Activities:*\n" + "\n".join(hourly_details)
+            }
+        })
+    
+    # Only the slots are escaped - the rest of the message is pre-serialized
+    return slack_templates.REPORT.render(
+        name=name,
+        context=" | ".join(context_parts),
+        cars_sold=total_metrics['cars_sold'],
+        cars_delivered=total_metrics['cars_delivered'],
+        quote_calls=total_metrics['quote_calls'],
+        appointments_generated=total_metrics['appointments_generated'],
+        in_person_appointments=total_metrics['in_person_appointments'],
+        phone_appointments=total_metrics['phone_appointments'],
+        extra_blocks=extra_blocks
+    )
+
+def send_to_slack(name, activities, total_metrics, dealership_info=None, checkin_time=None, webhook_url=None, scores=None, idempotency_key=None, dealership_id=None):
+    """Queue activity log for delivery to every Slack channel routed for the dealership.
+
+    Reports sharing an idempotency key are queued once, whichever endpoint
+    they came through. Returns (success, message, deliveries).
+    """
+    if not notification_router.is_configured('report', dealership_id):
+        return False, SLACK_NOT_CONFIGURED, []
+    
+    try:
+        # Reuse the report's scores when the caller already computed them
+        if scores is None:
+            scores = scoring.score_activities(activities)
         
-        response = urllib.request.urlopen(req, timeout=10)
+        message = build_report_message(name, activities, total_metrics, scores, dealership_info, checkin_time)
         
-        if response.getcode() == 200:
-            return True, "Successfully sent to Slack"
-        else:
-            return False, f"Slack API error: {response.getcode()}"
+        # Queue one background delivery per routed destination
+        deliveries = idempotency.once(
+            'slack-report',
+            idempotency_key,
+            lambda: notification_router.fan_out(
+                'report',
+                message,
+                dealership_id,
+                description=f"Daily Activity Report - {name}"
+            ),
+            keep=lambda deliveries: any(_accepted(delivery) for delivery in deliveries)
+        )
+        return _delivery_result(deliveries or [])
             
     except Exception as e:
-        return False, f"Error sending to Slack: {str(e)}"
+        return False, f"Error sending to Slack: {str(e)}", []
+
+def scoring_version_conflict(data):
+    """409 response if the client scored the report under other weights, else None.
+
+    Reports without a scoring_version (integrations, older pages) are accepted;
+    the server recomputes every score either way.
+    """
+    client_version = data.get('scoring_version')
+    if client_version is None or client_version == scoring.SCORING_VERSION:
+        return None
+    return jsonify({
+        'success': False,
+        'message': 'Scoring rules have changed since this page was loaded. Please reload and submit again.',
+        'scoring_version': scoring.SCORING_VERSION
+    }), 409
+
+@activity_bp.route("/scoring.js")
+def scoring_js():
+    """Client-side scoring module generated from the server's weight table."""
+    global _scoring_js_entry
+    if _scoring_js_entry is None:
+        _scoring_js_entry = http_cache.build_entry(scoring.client_module().encode('utf-8'), 'application/javascript; charset=utf-8')
+    
+    versioned = request.args.get('v') == scoring.SCORING_VERSION
+    response = http_cache.cached_response(
+        _scoring_js_entry,
+        SCORING_JS_VERSIONED_CACHE_CONTROL if versioned else SCORING_JS_CACHE_CONTROL
+    )
+    response.headers['X-Scoring-Version'] = scoring.SCORING_VERSION
+    return response
 
 @activity_bp.route("/activities/calculate-rating", methods=["POST"])
 def calculate_rating():
     """Calculate productivity rating based on activity metrics."""
     data = request.json
     
-    # Extract metrics
-    quote_calls = int(data.get('quote_calls', 0))
-    appointments_generated = int(data.get('appointments_generated', 0))
-    in_person_appointments = int(data.get('in_person_appointments', 0))
-    phone_appointments = int(data.get('phone_appointments', 0))
-    cars_sold = int(data.get('cars_sold', 0))
-    cars_delivered = int(data.get('cars_delivered', 0))
-    advertisements_posted = int(data.get('advertisements_posted', 0))
-    
-    # Calculate weighted score
-    # Weights: Cars Sold (10), Cars Delivered (8), In-Person Appointments (4),
-    # Appointments Generated (2), Phone Appointments (3), Quote Calls (1), Advertisements Posted (1)
-    score = (
-        quote_calls * 1 +
-        appointments_generated * 2 +
-        in_person_appointments * 4 +
-        phone_appointments * 3 +
-        cars_sold * 10 +
-        cars_delivered * 8 +
-        advertisements_posted * 1
-    )
-    
-    # Calculate rating (1-5 stars)
-    if score >= 20:
-        rating = 5
-    elif score >= 15:
-        rating = 4
-    elif score >= 10:
-        rating = 3
-    elif score >= 5:
-        rating = 2
-    else:
-        rating = 1
+    score, rating = scoring.rate_vector(scoring.activity_vector(data))
     
     return jsonify({"rating": rating})
 
+@activity_bp.route("/activities/calculate-ratings", methods=["POST"])
+def calculate_ratings():
+    """Rate several hours in one call.
+
+    Takes {"hours": {"<hour index>": {metrics}}} for any subset of hours, or
+    {"activities": [{metrics}, ...]} for a whole day, and returns the star
+    rating and score of every hour plus their sum as the daily score.
+    """
+    data = request.json or {}
+    hours = data.get('hours')
+    if hours is None and isinstance(data.get('activities'), list):
+        hours = {str(index): activity for index, activity in enumerate(data['activities'])}
+    
+    if not isinstance(hours, dict) or len(hours) > MAX_RATING_HOURS:
+        return jsonify({
+            'success': False,
+            'message': f'Send hours as an object of at most {MAX_RATING_HOURS} hours, or activities as a list'
+        }), 400
+    
+    ratings = {}
+    hour_scores = {}
+    for hour, hour_metrics in hours.items():
+        try:
+            score, rating = scoring.rate_vector(scoring.activity_vector(hour_metrics))
+        except (AttributeError, TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'message': f'Invalid activity data for hour {hour}: {e}'
+            }), 400
+        ratings[hour] = rating
+        hour_scores[hour] = score
+    
+    return jsonify({
+        'success': True,
+        'ratings': ratings,
+        'hour_scores': hour_scores,
+        'daily_score': sum(hour_scores.values()),
+        'scoring_version': scoring.SCORING_VERSION
+    })
+
+@activity_bp.route("/activities/score-batch", methods=["POST"])
+def score_batch():
+    """Score many reports in one call."""
+    data = request.json or {}
+    reports = data.get('reports', [])
+    
+    score_cards, error = _score_reports(reports)
+    if error:
+        return error
+    
+    results = []
+    for report, scores in zip(reports, score_cards):
+        results.append({
+            'name': report.get('name', 'User'),
+            'total_score': scores.total_score,
+            'hour_scores': list(scores.hour_scores),
+            'ratings': list(scores.ratings),
+            'totals': scoring.totals_dict(scores)
+        })
+    
+    return jsonify({
+        'success': True,
+        'results': results
+    })
+
 @activity_bp.route("/activities/pdf", methods=["POST"])
+@idempotency.idempotent(
+    'activity-pdf',
+    replayable=lambda response: response.headers.get('X-Slack-Status') != 'error',
+    on_replay=clear_checkin_session
+)
 def generate_pdf():
     """Generate a PDF file from activity data and optionally send to Slack."""
     data = request.json
     name = data.get('name', 'User')
     activities = data.get('activities', [])
     send_slack = data.get('send_slack', False)
+    # 'pdf' (default) or 'text' for the plain-text log
+    export_format = data.get('format', 'pdf')
     
-    # Get check-in information from session (with fallback)
-    try:
-        dealership_name = session.get('dealership_name', 'Unknown Location')
-        checkin_time = session.get('checkin_time', None)
-    except:
-        dealership_name = 'Unknown Location'
-        checkin_time = None
+    conflict = scoring_version_conflict(data)
+    if conflict:
+        return conflict
     
-    # Create a simple text representation instead of PDF
-    content = []
+    if export_format not in ('pdf', 'text'):
+        return jsonify({
+            'success': False,
+            'message': "format must be 'pdf' or 'text'"
+        }), 400
     
-    # Use Eastern Time for all timestamps
-    import pytz
-    eastern = pytz.timezone('America/Toronto')
-    utc_now = datetime.utcnow().replace(tzinfo=pytz.UTC)
-    local_time = utc_now.astimezone(eastern)
+    # Get check-in information from the check-in token or session (with fallback)
+    checkin = current_checkin() or {}
+    dealership_id = checkin.get('dealership_id')
+    dealership_name = checkin.get('dealership_name') or 'Unknown Location'
+    checkin_time = checkin.get('checkin_time')
     
-    content.append(f"Daily Activity Log - {name}")
-    content.append(f"Date: {local_time.strftime('%Y-%m-%d')}")
-    content.append(f"Time: {local_time.strftime('%H:%M:%S')} Eastern")
-    content.append(f"Location: {dealership_name}")
-    if checkin_time:
-        content.append(f"Check-in Time: {checkin_time} Eastern")
-    content.append("-" * 50)
+    # Use Eastern Time for all timestamps
+    local_time = eastern_now()
     
-    total_metrics = {
-        'quote_calls': 0,
-        'appointments_generated': 0,
-        'in_person_appointments': 0,
-        'phone_appointments': 0,
-        'cars_sold': 0,
-        'cars_delivered': 0,
-        'advertisements_posted': 0
-    }
+    # Score the whole day once - the Slack message reuses the same result
+    scores = scoring.score_activities(activities)
+    total_metrics = scoring.totals_dict(scores)
     
-    for i, activity in enumerate(activities):
-        hour_num = i + 1
-        content.append(f"\nHour {hour_num}:")
-        content.append(f"Activity Description: {activity.get('description', '')}")
-        content.append(f"Quote Calls: {activity.get('quote_calls', 0)}")
-        content.append(f"Appointments Generated: {activity.get('appointments_generated', 0)}")
-        content.append(f"In Person Appointments: {activity.get('in_person_appointments', 0)}")
-        content.append(f"Phone Appointments: {activity.get('phone_appointments', 0)}")
-        content.append(f"Cars Sold: {activity.get('cars_sold', 0)}")
-        content.append(f"Cars Delivered: {activity.get('cars_delivered', 0)}")
-        content.append(f"Advertisements Posted: {activity.get('advertisements_posted', 0)}")
-        
-        # Calculate productivity rating
-        score = (
-            int(activity.get('quote_calls', 0)) * 1 +
-            int(activity.get('appointments_generated', 0)) * 2 +
-            int(activity.get('in_person_appointments', 0)) * 4 +
-            int(activity.get('phone_appointments', 0)) * 3 +
-            int(activity.get('cars_sold', 0)) * 10 +
-            int(activity.get('cars_delivered', 0)) * 8 +
-            int(activity.get('advertisements_posted', 0)) * 1
-        )
-        
-        # Calculate rating (1-5 stars)
-        if score >= 20:
-            rating = 5
-        elif score >= 15:
-            rating = 4
-        elif score >= 10:
-            rating = 3
-        elif score >= 5:
-            rating = 2
-        else:
-            rating = 1
-            
-        content.append(f"Productivity Rating: {rating} stars")
-        
-        # Update totals
-        for key in total_metrics:
-            total_metrics[key] += int(activity.get(key, 0))
-    
-    # Add summary section
-    content.append("\n" + "=" * 50)
-    content.append("DAILY SUMMARY")
-    content.append("=" * 50)
-    for key, value in total_metrics.items():
-        content.append(f"Total {key.replace('_', ' ').title()}: {value}")
+    idempotency_key = idempotency.request_key()
+    report_id = store_report(name, activities, scores, dealership_id, dealership_name, checkin_time, local_time, idempotency_key)
     
     # Send to Slack automatically (always enabled)
     slack_success = False
     slack_message = ""
-    slack_success, slack_message = send_to_slack(name, activities, total_metrics, dealership_name, checkin_time)
+    slack_success, slack_message, deliveries = send_to_slack(
+        name, activities, total_metrics, dealership_name, checkin_time,
+        scores=scores, idempotency_key=idempotency_key, dealership_id=dealership_id
+    )
+    delivery_id = notification_router.first_delivery_id(deliveries)
     
-    # Automatic checkout after successful Slack submission
+    # Automatic checkout once the report is queued for Slack
     if slack_success:
         try:
             # Clear check-in information from session
-            session.pop('checked_in', None)
-            session.pop('dealership_id', None)
-            session.pop('dealership_name', None)
-            session.pop('checkin_latitude', None)
-            session.pop('checkin_longitude', None)
-            session.pop('checkin_time', None)
-            print(f"Auto-checkout completed for {name} after successful Slack submission")
+            clear_checkin_session()
+            logger.info("Auto-checkout completed after Slack submission was queued", extra={'user_name': name})
         except Exception as e:
-            print(f"Auto-checkout error: {e}")
+            logger.exception("Auto-checkout error")
     
-    # Create a text file in memory
-    text_content = "\n".join(content)
-    buffer = io.BytesIO(text_content.encode('utf-8'))
-    buffer.seek(0)
+    # Render the log - static page parts are compiled once per process
+    if export_format == 'pdf':
+        body = pdf_report.render_activity_pdf(name, activities, scores, dealership_name, checkin_time, local_time)
+        mimetype, extension = 'application/pdf', 'pdf'
+    else:
+        content = render_activity_log(name, activities, scores, dealership_name, checkin_time, local_time)
+        body = "\n".join(content).encode('utf-8')
+        mimetype, extension = 'text/plain', 'txt'
     
     # Prepare response with Slack status
     response = send_file(
-        buffer,
-        mimetype='text/plain',
+        io.BytesIO(body),
+        mimetype=mimetype,
         as_attachment=True,
-        download_name=f"Daily_Activity_Log_{name}_{local_time.strftime('%Y-%m-%d')}.txt"
+        download_name=f"Daily_Activity_Log_{name}_{local_time.strftime('%Y-%m-%d')}.{extension}"
     )
     
     # Add Slack status to response headers (always sent now)
-    response.headers['X-Slack-Status'] = 'success' if slack_success else 'error'
+    response.headers['X-Slack-Status'] = slack_status(slack_success)
     response.headers['X-Slack-Message'] = slack_message
+    if delivery_id:
+        response.headers['X-Slack-Delivery-Id'] = delivery_id
+    if deliveries:
+        response.headers['X-Slack-Deliveries'] = deliveries_header(deliveries)
+    if report_id:
+        response.headers['X-Report-Id'] = str(report_id)
     
     return response
 
 @activity_bp.route("/send-to-slack", methods=["POST"])
 def send_to_slack_endpoint():
-    """Send activity data to Slack - alternative endpoint for frontend compatibility."""
+    """Send activity data to Slack - alternative endpoint for frontend compatibility (shares its idempotency keys)."""
     return send_slack_only()
 
 @activity_bp.route("/activities/slack", methods=["POST"])
+@idempotency.idempotent(
+    'activity-slack',
+    replayable=lambda response: response.get_json().get('success'),
+    on_replay=clear_checkin_session
+)
 def send_slack_only():
     """Send activity data to Slack without generating a file."""
     data = request.json
     name = data.get('name', 'User')
     activities = data.get('activities', [])
     
-    # Get check-in information from session (with fallback)
-    try:
-        dealership_name = session.get('dealership_name', 'Unknown Location')
-        checkin_time = session.get('checkin_time', None)
-    except:
-        dealership_name = 'Unknown Location'
-        checkin_time = None
+    conflict = scoring_version_conflict(data)
+    if conflict:
+        return conflict
+    
+    # Get check-in information from the check-in token or session (with fallback)
+    checkin = current_checkin() or {}
+    dealership_id = checkin.get('dealership_id')
+    dealership_name = checkin.get('dealership_name') or 'Unknown Location'
+    checkin_time = checkin.get('checkin_time')
     
     # Calculate totals
-    total_metrics = {
-        'quote_calls': 0,
-        'appointments_generated': 0,
-        'in_person_appointments': 0,
-        'phone_appointments': 0,
-        'cars_sold': 0,
-        'cars_delivered': 0,
-        'advertisements_posted': 0
-    }
+    scores = scoring.score_activities(activities)
+    total_metrics = scoring.totals_dict(scores)
     
-    for activity in activities:
-        for key in total_metrics:
-            total_metrics[key] += int(activity.get(key, 0))
+    idempotency_key = idempotency.request_key()
+    report_id = store_report(name, activities, scores, dealership_id, dealership_name, checkin_time, eastern_now(), idempotency_key)
     
     # Send to Slack (uses environment variable for webhook URL)
-    success, message = send_to_slack(name, activities, total_metrics, dealership_name, checkin_time)
+    success, message, deliveries = send_to_slack(
+        name, activities, total_metrics, dealership_name, checkin_time,
+        scores=scores, idempotency_key=idempotency_key, dealership_id=dealership_id
+    )
     
-    # Automatic checkout after successful Slack submission
+    # Automatic checkout once the report is queued for Slack
     if success:
         try:
             # Clear check-in information from session
-            session.pop('checked_in', None)
-            session.pop('dealership_id', None)
-            session.pop('dealership_name', None)
-            session.pop('checkin_latitude', None)
-            session.pop('checkin_longitude', None)
-            session.pop('checkin_time', None)
-            print(f"Auto-checkout completed for {name} after successful Slack-only submission")
+            clear_checkin_session()
+            logger.info("Auto-checkout completed after Slack-only submission was queued", extra={'user_name': name})
         except Exception as e:
-            print(f"Auto-checkout error: {e}")
+            logger.exception("Auto-checkout error")
     
     return jsonify({
         'success': success,
-        'message': message
+        'message': message,
+        'delivery_id': notification_router.first_delivery_id(deliveries),
+        'deliveries': deliveries,
+        'report_id': report_id
     })
 
+@activity_bp.route("/activities/team-report", methods=["POST"])
+def team_report():
+    """Score many reps' days in one request and stream back a combined export."""
+    data = request.json or {}
+    reports = data.get('reports', [])
+    export_format = data.get('format', 'text')
+    
+    if export_format not in ('text', 'ndjson'):
+        return jsonify({
+            'success': False,
+            'message': "format must be 'text' or 'ndjson'"
+        }), 400
+    
+    score_cards, error = _score_reports(reports)
+    if error:
+        return error
+    
+    local_time = eastern_now()
+    names = [report.get('name', 'User') for report in reports]
+    
+    headers = {}
+    if data.get('send_slack', False):
+        slack_success, slack_message, deliveries = send_leaderboard_to_slack(
+            list(zip(names, score_cards)), local_time
+        )
+        headers['X-Slack-Status'] = slack_status(slack_success)
+        headers['X-Slack-Message'] = slack_message
+        delivery_id = notification_router.first_delivery_id(deliveries)
+        if delivery_id:
+            headers['X-Slack-Delivery-Id'] = delivery_id
+        if deliveries:
+            headers['X-Slack-Deliveries'] = deliveries_header(deliveries)
+    
+    def generate_text():
+        for report, name, scores in zip(reports, names, score_cards):
+            lines = render_activity_log(
+                name,
+                report.get('activities', []),
+                scores,
+                report.get('dealership', 'Unknown Location'),
+                report.get('checkin_time'),
+                local_time
+            )
+            yield "\n".join(lines) + "\n\n" + "#" * 50 + "\n\n"
+    
+    def generate_ndjson():
+        for report, name, scores in zip(reports, names, score_cards):
+            yield json.dumps({
+                'name': name,
+                'dealership': report.get('dealership'),
+                'total_score': scores.total_score,
+                'hour_scores': list(scores.hour_scores),
+                'ratings': list(scores.ratings),
+                'totals': scoring.totals_dict(scores)
+            }) + "\n"
+    
+    date_str = local_time.strftime('%Y-%m-%d')
+    if export_format == 'ndjson':
+        body, mimetype, filename = generate_ndjson(), 'application/x-ndjson', f"Team_Activity_Report_{date_str}.ndjson"
+    else:
+        body, mimetype, filename = generate_text(), 'text/plain', f"Team_Activity_Report_{date_str}.txt"
+    
+    headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return Response(body, mimetype=mimetype, headers=headers)
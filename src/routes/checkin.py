@@ -1,177 +1,269 @@
-from flask import Blueprint, jsonify, request, session, redirect, url_for
+from flask import Blueprint, current_app, jsonify, request, session, redirect, url_for
 import json
-import math
-import urllib.request
-import urllib.parse
-import urllib.error
+import logging
 import os
+import time
+
+from services import activity_store, checkin_token, dealership_registry, geo, http_cache, metrics, notification_router, slack_templates
+from services.digest import DigestBuffer
 
 checkin_bp = Blueprint('checkin', __name__)
 
-# Dealership data loaded from file
+logger = logging.getLogger(__name__)
+
+# Optional digest mode - coalesce check-ins into one Slack message per window
+CHECKIN_DIGEST_ENABLED = os.environ.get('SLACK_CHECKIN_DIGEST', '').lower() in ('1', 'true', 'yes', 'on')
+CHECKIN_DIGEST_WINDOW_SECONDS = float(os.environ.get('SLACK_DIGEST_WINDOW_SECONDS', '30'))
+CHECKIN_DIGEST_MAX_EVENTS = int(os.environ.get('SLACK_DIGEST_MAX_EVENTS', '50'))
+
+# Dealership data loaded from the registry
 dealerships_data = []
+dealerships_version = None
+# Lookup structures rebuilt whenever dealerships_data is loaded
+dealerships_by_id = {}
+dealership_index = geo.SpatialIndex([], None, None)
+# Serialized /dealerships body: (version, dealerships_data, cache entry)
+_dealerships_response_cache = None
+# Browsers revalidate after 5 minutes; the edge may keep it for a day
+DEALERSHIPS_CACHE_CONTROL = 'public, max-age=300, s-maxage=86400, stale-while-revalidate=86400'
+# A failed load is retried at most this often instead of on every request
+DEALERSHIP_RELOAD_SECONDS = 60
+_dealerships_load_attempted_at = float('-inf')
+
+# Geofence radius in meters by device type
+MOBILE_MAX_DISTANCE = 500  # Strict for mobile (accurate GPS)
+PC_MAX_DISTANCE = 3500  # Generous for PC (WiFi location inaccuracy)
+TEST_SITE_ID = 'test_site'
+TEST_SITE_MAX_DISTANCE = 5000  # Very generous for test site
+
+# Largest number of fixes accepted by /verify-location/batch
+MAX_BATCH_FIXES = 100000
+
+# Results returned by /nearest-dealerships
+DEFAULT_NEAREST_COUNT = 3
+MAX_NEAREST_COUNT = 50
+
+dealership_load_duration = metrics.histogram(
+    'dealership_load_duration_seconds',
+    'Time to load the dealership registry and spatial index',
+    ('source',)
+)
+dealership_load_failures = metrics.counter('dealership_load_failures_total', 'Failed dealership registry loads')
+metrics.gauge('dealerships_loaded', 'Dealerships currently loaded', callback=lambda: {(): len(dealerships_data)})
 
 def load_dealerships():
-    """Load dealership data from the text file with simplified processing"""
-    global dealerships_data
+    """Load dealership data from the compiled registry (or the text file if it has not been built)"""
+    global dealerships_data, dealerships_version, _dealerships_load_attempted_at
+    _dealerships_load_attempted_at = time.monotonic()
+    started = time.perf_counter()
     try:
-        with open('src/static/dealership_addresses.txt', 'r') as file:
-            content = file.read()
-            
-        dealerships_data = []
-        lines = content.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if line and ':' in line and not line.startswith('Dealership Addresses'):
-                try:
-                    # Parse format: "1. 401 Infiniti: 5500 Dixie Road, Unit D, Mississauga, Ontario, L4W 4N3"
-                    parts = line.split(':', 1)
-                    if len(parts) == 2:
-                        name_part = parts[0].strip()
-                        address = parts[1].strip()
-                        
-                        # Extract name (remove number prefix)
-                        if '. ' in name_part:
-                            name = name_part.split('. ', 1)[1]
-                        else:
-                            name = name_part
-                        
-                        # Generate ID from name
-                        dealership_id = name.lower().replace(' ', '_').replace('(', '').replace(')', '')
-                        
-                        # Add coordinates for all dealerships (using real geocoded addresses)
-                        dealership_coordinates = {
-                            '401_infiniti': {'lat': 43.646769, 'lng': -79.6359934},
-                            '401_kia': {'lat': 43.646769, 'lng': -79.6359934},
-                            '401_mazda': {'lat': 43.646769, 'lng': -79.6359934},
-                            '401_mitsubishi_dixie_mitsubishi': {'lat': 43.6444388, 'lng': -79.6442699},
-                            '401_nissan': {'lat': 43.646769, 'lng': -79.6359934},
-                            '401_volkswagen': {'lat': 43.646769, 'lng': -79.6359934},
-                            'agincourt_mazda': {'lat': 43.8128735, 'lng': -79.2444342},
-                            'audi_barrie': {'lat': 44.3017312, 'lng': -79.6823509},
-                            'audi_queensway': {'lat': 43.6154775, 'lng': -79.5466424},
-                            'audi_thornhill': {'lat': 43.7994946, 'lng': -79.4212594},
-                            'barrie_volkswagen': {'lat': 44.3592463, 'lng': -79.692863},
-                            'bmw_aurora': {'lat': 44.0065, 'lng': -79.4504},
-                            'bolton_toyota': {'lat': 43.8497373, 'lng': -79.6957908},
-                            'frost_gm': {'lat': 43.7038815, 'lng': -79.7892515},
-                            'markham_acura': {'lat': 43.8658623, 'lng': -79.2867289},
-                            'markham_honda': {'lat': 43.8557957, 'lng': -79.3061335},
-                            'markham_kia': {'lat': 43.8556092, 'lng': -79.3074614},
-                            'meadowvale_honda': {'lat': 43.5802831, 'lng': -79.757078},
-                            'oakville_honda': {'lat': 43.4692995, 'lng': -79.6800906},
-                            'thorncrest_ford': {'lat': 43.61664, 'lng': -79.5403798},
-                            'vaughan_chrysler': {'lat': 43.8361, 'lng': -79.5083},
-                            'test_site': {'lat': 43.8850691, 'lng': -79.4190847}
-                        }
-                        
-                        coordinates = dealership_coordinates.get(dealership_id)
-                        if not coordinates:
-                            # Default coordinates for any missing dealerships
-                            coordinates = {'lat': 43.6532, 'lng': -79.3832}  # Toronto area
-                        
-                        dealership = {
-                            'id': dealership_id,
-                            'name': name,
-                            'address': address,
-                            'latitude': coordinates['lat'] if coordinates else None,
-                            'longitude': coordinates['lng'] if coordinates else None
-                        }
-                        dealerships_data.append(dealership)
-                        print(f"Loaded dealership: {name} ({'with coordinates' if coordinates else 'no coordinates'})")
-                        
-                except Exception as e:
-                    print(f"Error processing dealership line '{line}': {e}")
-                    continue
-                    
-        print(f"Successfully loaded {len(dealerships_data)} dealerships")
+        dealerships_data, index, dealerships_version, source = dealership_registry.load_registry()
+        _rebuild_dealership_indexes(index)
+        dealership_load_duration.observe(time.perf_counter() - started, (source,))
+        logger.info("Loaded dealerships", extra={'count': len(dealerships_data), 'source': source})
         return True
     except Exception as e:
-        print(f"Error loading dealerships: {e}")
+        dealership_load_failures.inc()
+        logger.exception("Error loading dealerships")
         dealerships_data = []
+        dealerships_version = None
+        _rebuild_dealership_indexes()
         return False
 
-def send_checkin_slack_notification(user_name, dealership_name, checkin_time, user_lat, user_lng, distance, device_type):
-    """Send a Slack notification when user checks in"""
-    try:
-        webhook_url = os.environ.get('SLACK_WEBHOOK_URL')
-        if not webhook_url:
-            print("SLACK_WEBHOOK_URL not configured - skipping Slack notification")
-            return False
-        
-        # Determine device type for display
-        device_display = "📱 Mobile Device" if device_type == "mobile" else "🖥️ PC"
-        
-        # Format distance for display
-        if distance is not None:
-            distance_text = f"{distance:.0f}m from dealership"
-        else:
-            distance_text = "Location verified"
-        
-        # Create rich Slack message using blocks
-        slack_message = {
-            "blocks": [
-                {
-                    "type": "header",
-                    "text": {
-                        "type": "plain_text",
-                        "text": "🏢 Dealership Check-In"
-                    }
-                },
-                {
-                    "type": "section",
-                    "fields": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Name:*\n{user_name}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Location:*\n{dealership_name}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Time:*\n{checkin_time} Eastern"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Device:*\n{device_display}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Accuracy:*\n{distance_text}"
-                        }
-                    ]
-                },
+def ensure_dealerships_loaded():
+    """Load dealerships if needed, retrying a failed load at most once per DEALERSHIP_RELOAD_SECONDS"""
+    if dealerships_data:
+        return True
+    if time.monotonic() - _dealerships_load_attempted_at < DEALERSHIP_RELOAD_SECONDS:
+        return False
+    return load_dealerships()
+
+def _rebuild_dealership_indexes(index=None):
+    """Rebuild the id lookup and spatial index over dealerships_data"""
+    global dealerships_by_id, dealership_index
+    dealerships_by_id = {d['id']: d for d in dealerships_data}
+    if index is None:
+        index = dealership_registry.build_index(dealerships_data)
+    dealership_index = index
+
+def format_device_display(device_type):
+    """Device type as shown in Slack check-in messages"""
+    return "📱 Mobile Device" if device_type == "mobile" else "🖥️ PC"
+
+def format_distance_text(distance):
+    """Check-in accuracy as shown in Slack check-in messages"""
+    if distance is not None:
+        return f"{distance:.0f}m from dealership"
+    return "Location verified"
+
+def build_checkin_message(user_name, dealership_name, checkin_time, distance, device_type):
+    """Serialized Slack Block Kit payload for a single check-in"""
+    return slack_templates.CHECKIN.render(
+        user_name=user_name,
+        dealership_name=dealership_name,
+        checkin_time=checkin_time,
+        device=format_device_display(device_type),
+        accuracy=format_distance_text(distance)
+    )
+
+def build_checkin_digest_message(events):
+    """Build one Slack message for a batch of check-ins, grouped by dealership"""
+    by_dealership = {}
+    for event in events:
+        by_dealership.setdefault(event['dealership_name'], []).append(event)
+    
+    times = sorted(event['checkin_time'] for event in events)
+    blocks = [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f"🏢 Dealership Check-Ins ({len(events)})"
+            }
+        },
+        {
+            "type": "context",
+            "elements": [
                 {
-                    "type": "context",
-                    "elements": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"👤 {user_name} • 📍 Location verified • ✅ Check-in successful • 🕐 {checkin_time}"
-                        }
-                    ]
+                    "type": "mrkdwn",
+                    "text": f"🕐 {times[0]} – {times[-1]} Eastern • 📍 {len(by_dealership)} location(s) • ✅ All check-ins successful"
                 }
             ]
         }
-        
-        # Send to Slack
-        data = json.dumps(slack_message).encode('utf-8')
-        req = urllib.request.Request(webhook_url, data=data)
-        req.add_header('Content-Type', 'application/json')
-        
-        with urllib.request.urlopen(req) as response:
-            if response.getcode() == 200:
-                print(f"Check-in Slack notification sent successfully for {user_name} at {dealership_name}")
-                return True
-            else:
-                print(f"Slack notification failed with status: {response.getcode()}")
-                return False
+    ]
+    
+    # Slack allows 50 blocks per message and 3000 characters per text block
+    max_sections = 50 - len(blocks) - 1
+    dealership_names = sorted(by_dealership)
+    for dealership_name in dealership_names[:max_sections]:
+        checkins = by_dealership[dealership_name]
+        lines = [f"*{dealership_name}* — {len(checkins)} check-in(s)"]
+        for event in checkins:
+            lines.append(
+                f"• *{event['user_name']}* — {event['checkin_time']} Eastern — "
+                f"{format_device_display(event['device_type'])} — {format_distance_text(event['distance'])}"
+            )
+        text = "\n".join(lines)
+        if len(text) > 3000:
+            text = text[:2990].rsplit("\n", 1)[0] + "\n…"
+        blocks.append({
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": text
+            }
+        })
+    
+    remaining = dealership_names[max_sections:]
+    if remaining:
+        blocks.append({
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"…and {sum(len(by_dealership[n]) for n in remaining)} more check-in(s) at {len(remaining)} other location(s)"
+                }
+            ]
+        })
+    
+    return {
+        "text": f"🏢 {len(events)} dealership check-in(s)",
+        "blocks": blocks
+    }
+
+def _send_checkin_digest(events):
+    """Queue a digest of buffered check-ins for Slack delivery"""
+    if not notification_router.is_configured('checkin_digest'):
+        logger.warning("SLACK_WEBHOOK_URL not configured - dropping check-in digest")
+        return []
+    
+    # A digest spans dealerships, so only routes without a dealership filter apply
+    deliveries = notification_router.fan_out(
+        'checkin_digest',
+        build_checkin_digest_message(events),
+        description=f"{len(events)} check-in(s)"
+    )
+    logger.info("Check-in digest queued for Slack", extra={'checkins': len(events), 'deliveries': deliveries})
+    return deliveries
+
+checkin_digest = DigestBuffer(
+    CHECKIN_DIGEST_WINDOW_SECONDS,
+    CHECKIN_DIGEST_MAX_EVENTS,
+    _send_checkin_digest,
+    name='checkin-digest'
+)
+if CHECKIN_DIGEST_ENABLED:
+    # Send check-ins a previous process buffered but never flushed
+    checkin_digest.start()
+
+def send_checkin_slack_notification(user_name, dealership_name, checkin_time, user_lat, user_lng, distance, device_type, dealership_id=None):
+    """Queue a Slack notification to every channel routed for the dealership; returns per-destination deliveries"""
+    try:
+        if not notification_router.is_configured('checkin', dealership_id):
+            logger.warning("SLACK_WEBHOOK_URL not configured - skipping Slack notification")
+            return []
+        
+        slack_message = build_checkin_message(user_name, dealership_name, checkin_time, distance, device_type)
+        
+        # Queue one background delivery per destination
+        deliveries = notification_router.fan_out(
+            'checkin',
+            slack_message,
+            dealership_id,
+            description=f"{user_name} at {dealership_name}"
+        )
+        logger.info("Check-in Slack notification queued", extra={'user_name': user_name, 'dealership_name': dealership_name, 'deliveries': deliveries})
+        return deliveries
                 
     except Exception as e:
-        print(f"Error sending check-in Slack notification: {e}")
-        return False
+        logger.exception("Error queueing check-in Slack notification")
+        return []
+
+# Cookie session keys that make up a check-in
+CHECKIN_SESSION_KEYS = (
+    'checked_in',
+    'user_name',
+    'dealership_id',
+    'dealership_name',
+    'checkin_latitude',
+    'checkin_longitude',
+    'checkin_time'
+)
+
+def clear_checkin_session():
+    """Remove the check-in from the cookie session"""
+    for key in CHECKIN_SESSION_KEYS:
+        session.pop(key, None)
+
+def request_checkin_token():
+    """Signed check-in token sent with the request (X-Checkin-Token header or checkin_token field)"""
+    token = request.headers.get('X-Checkin-Token')
+    if not token:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            token = data.get('checkin_token')
+    return token
+
+def current_checkin():
+    """The caller's check-in from a signed token, falling back to the cookie session; None if not checked in"""
+    token = request_checkin_token()
+    if token:
+        checkin = checkin_token.verify(current_app.config['SECRET_KEY'], token)
+        if checkin:
+            checkin['source'] = 'token'
+            return checkin
+
+    if not session.get('checked_in'):
+        return None
+    return {
+        'user_name': session.get('user_name'),
+        'dealership_id': session.get('dealership_id'),
+        'dealership_name': session.get('dealership_name'),
+        'checkin_time': session.get('checkin_time'),
+        'latitude': session.get('checkin_latitude'),
+        'longitude': session.get('checkin_longitude'),
+        'source': 'session'
+    }
 
 def detect_device_type(user_agent):
     """Detect if the user is on a mobile device or PC"""
@@ -194,53 +286,135 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     """Calculate distance between two points using Haversine formula"""
     if None in [lat1, lon1, lat2, lon2]:
         return None
+    
+    return geo.haversine_distance(lat1, lon1, lat2, lon2)
+
+def max_distance_for_device(device_type):
+    """Geofence radius in meters for a device type"""
+    if device_type == "mobile":
+        return MOBILE_MAX_DISTANCE
+    return PC_MAX_DISTANCE
+
+def verify_locations_batch(fixes):
+    """Verify many GPS fixes against their dealerships in one pass.
+
+    fixes is a sequence of (dealership_id, lat, lng, device_type). Returns one
+    result per fix with the same success/distance/max_distance rules as
+    /verify-location; fixes that cannot be checked get success False and a message.
+    """
+    ensure_dealerships_loaded()
+    
+    results = [None] * len(fixes)
+    pending = []
+    for index, (dealership_id, user_lat, user_lng, device_type) in enumerate(fixes):
+        if not all([dealership_id, user_lat, user_lng]):
+            results[index] = {'success': False, 'message': 'Missing required location data'}
+            continue
+        
+        dealership = dealerships_by_id.get(dealership_id)
+        if not dealership:
+            results[index] = {'success': False, 'message': 'Dealership not found'}
+            continue
+        
+        if dealership_id == TEST_SITE_ID:
+            results[index] = {
+                'success': True,
+                'distance': 0,
+                'max_distance': TEST_SITE_MAX_DISTANCE,
+                'device_type': device_type
+            }
+            continue
+        
+        if dealership['latitude'] is None or dealership['longitude'] is None:
+            results[index] = {'success': False, 'message': 'Dealership location not available'}
+            continue
         
-    # Convert latitude and longitude from degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+        pending.append((index, float(user_lat), float(user_lng), dealership, device_type))
     
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
+    distances = geo.haversine_many(
+        [fix[1] for fix in pending],
+        [fix[2] for fix in pending],
+        [fix[3]['latitude'] for fix in pending],
+        [fix[3]['longitude'] for fix in pending]
+    )
     
-    # Radius of earth in meters
-    r = 6371000
+    for (index, _, _, _, device_type), distance in zip(pending, distances):
+        max_distance = max_distance_for_device(device_type)
+        results[index] = {
+            'success': distance <= max_distance,
+            'distance': distance,
+            'max_distance': max_distance,
+            'device_type': device_type
+        }
     
-    return c * r
+    return results
 
 @checkin_bp.route('/dealerships')
 def get_dealerships():
     """Get list of all dealerships"""
-    if not dealerships_data:
-        load_dealerships()
+    global _dealerships_response_cache
+    ensure_dealerships_loaded()
+    
+    # Serialize once per registry version - the list only changes between deploys
+    cached = _dealerships_response_cache
+    if cached is None or cached[0] != dealerships_version or cached[1] is not dealerships_data:
+        # Return simplified data for frontend
+        simplified_data = []
+        for d in dealerships_data:
+            simplified_data.append({
+                'id': d['id'],
+                'name': d['name'],
+                'address': d['address']
+            })
+        body = json.dumps(simplified_data, separators=(',', ':')).encode('utf-8')
+        cached = (dealerships_version, dealerships_data, http_cache.build_entry(body, 'application/json'))
+        _dealerships_response_cache = cached
+    
+    return http_cache.cached_response(cached[2], DEALERSHIPS_CACHE_CONTROL)
+
+@checkin_bp.route('/nearest-dealerships')
+def nearest_dealerships():
+    """Get the dealerships closest to a location, nearest first"""
+    ensure_dealerships_loaded()
+    
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    k = request.args.get('k', DEFAULT_NEAREST_COUNT, type=int)
+    
+    if lat is None or lng is None or not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+        return jsonify({
+            'success': False,
+            'message': 'Valid lat and lng query parameters are required'
+        }), 400
     
-    # Return simplified data for frontend
-    simplified_data = []
-    for d in dealerships_data:
-        simplified_data.append({
+    k = max(1, min(k, MAX_NEAREST_COUNT))
+    
+    results = []
+    for d in dealership_index.nearest(lat, lng, k):
+        results.append({
             'id': d['id'],
             'name': d['name'],
-            'address': d['address']
+            'address': d['address'],
+            'distance': calculate_distance(lat, lng, d['latitude'], d['longitude'])
         })
     
-    return jsonify(simplified_data)
+    return jsonify(results)
 
 @checkin_bp.route('/verify-location', methods=['POST'])
 def verify_location():
     """Verify user location against selected dealership"""
     try:
         # Ensure dealerships are loaded
-        if not dealerships_data:
-            load_dealerships()
+        ensure_dealerships_loaded()
             
         data = request.get_json()
         dealership_id = data.get('dealership_id')
         user_lat = data.get('user_latitude')
         user_lng = data.get('user_longitude')
         
-        print(f"Verify-location request: dealership_id={dealership_id}, user_lat={user_lat}, user_lng={user_lng}")
-        print(f"Dealerships loaded: {len(dealerships_data)}")
+        logger.debug("Verify-location request", extra={
+            'dealership_id': dealership_id, 'user_lat': user_lat, 'user_lng': user_lng, 'dealerships_loaded': len(dealerships_data)
+        })
         
         if not all([dealership_id, user_lat, user_lng]):
             return jsonify({
@@ -249,7 +423,7 @@ def verify_location():
             }), 400
         
         # Find dealership
-        dealership = next((d for d in dealerships_data if d['id'] == dealership_id), None)
+        dealership = dealerships_by_id.get(dealership_id)
         if not dealership:
             return jsonify({
                 'success': False,
@@ -267,14 +441,11 @@ def verify_location():
         device_type = detect_device_type(user_agent)
         
         # Set radius based on device type
-        if device_type == "mobile":
-            max_distance = 500  # Strict for mobile (accurate GPS)
-        else:
-            max_distance = 3500  # Generous for PC (WiFi location inaccuracy)
+        max_distance = max_distance_for_device(device_type)
         
         # Special handling for Test Site - always allow check-in
-        if dealership_id == 'test_site':
-            max_distance = 5000  # Very generous for test site
+        if dealership_id == TEST_SITE_ID:
+            max_distance = TEST_SITE_MAX_DISTANCE
             return jsonify({
                 'success': True,
                 'distance': 0,
@@ -309,19 +480,56 @@ def verify_location():
         })
         
     except Exception as e:
-        print(f"Location verification error: {e}")
+        logger.exception("Location verification error")
         return jsonify({
             'success': False,
             'message': 'Location verification failed'
         }), 500
 
+@checkin_bp.route('/verify-location/batch', methods=['POST'])
+def verify_location_batch():
+    """Verify many recorded GPS fixes at once (for after-the-fact audits)"""
+    data = request.get_json(silent=True) or {}
+    raw_fixes = data.get('fixes')
+    
+    if not isinstance(raw_fixes, list) or len(raw_fixes) > MAX_BATCH_FIXES:
+        return jsonify({
+            'success': False,
+            'message': f'fixes must be a list of at most {MAX_BATCH_FIXES} entries'
+        }), 400
+    
+    # Each fix is [dealership_id, lat, lng, device_type] or an object with the /verify-location field names
+    fixes = []
+    try:
+        for fix in raw_fixes:
+            if isinstance(fix, dict):
+                fixes.append((
+                    fix.get('dealership_id'),
+                    fix.get('user_latitude'),
+                    fix.get('user_longitude'),
+                    fix.get('device_type', 'pc')
+                ))
+            else:
+                dealership_id, user_lat, user_lng, device_type = fix
+                fixes.append((dealership_id, user_lat, user_lng, device_type))
+        results = verify_locations_batch(fixes)
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid fix data: {e}'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'results': results
+    })
+
 @checkin_bp.route('/checkin', methods=['POST'])
 def checkin():
     """Check in user to dealership with Slack notification including user name"""
     try:
         # Ensure dealerships are loaded
-        if not dealerships_data:
-            load_dealerships()
+        ensure_dealerships_loaded()
             
         from datetime import datetime
         import pytz
@@ -333,8 +541,10 @@ def checkin():
         user_lat = data.get('user_latitude')
         user_lng = data.get('user_longitude')
         
-        print(f"Check-in request: user_name={user_name}, dealership_id={dealership_id}, dealership_name={dealership_name}, user_lat={user_lat}, user_lng={user_lng}")
-        print(f"Dealerships loaded: {len(dealerships_data)}")
+        logger.debug("Check-in request", extra={
+            'user_name': user_name, 'dealership_id': dealership_id, 'dealership_name': dealership_name,
+            'user_lat': user_lat, 'user_lng': user_lng, 'dealerships_loaded': len(dealerships_data)
+        })
         
         if not all([user_name, dealership_id, dealership_name]):
             return jsonify({
@@ -356,7 +566,7 @@ def checkin():
         distance = None
         if user_lat and user_lng:
             # Find dealership for coordinates
-            dealership = next((d for d in dealerships_data if d['id'] == dealership_id), None)
+            dealership = dealerships_by_id.get(dealership_id)
             if dealership and dealership['latitude'] and dealership['longitude']:
                 distance = calculate_distance(
                     user_lat, user_lng,
@@ -372,27 +582,59 @@ def checkin():
         session['checkin_longitude'] = user_lng
         session['checkin_time'] = checkin_time_str
         
-        # Send Slack notification (non-blocking - check-in succeeds even if Slack fails)
+        # Stateless copy of the same check-in for clients that can't rely on the cookie
+        token = checkin_token.issue(
+            current_app.config['SECRET_KEY'], user_name, dealership_id, dealership_name,
+            checkin_time_str, user_lat, user_lng
+        )
+        
+        # Record the check-in server-side (history survives even if Slack is down)
+        checkin_id = None
         try:
-            send_checkin_slack_notification(
-                user_name,
-                dealership_name, 
-                checkin_time_str, 
-                user_lat, 
-                user_lng, 
-                distance,
-                device_type
+            checkin_id = activity_store.record_checkin(
+                user_name, dealership_id, dealership_name, checkin_time_str,
+                user_lat, user_lng, distance, device_type
             )
+        except Exception as store_error:
+            logger.exception("Activity store error but check-in continues")
+        
+        # Queue Slack notification (non-blocking - check-in succeeds even if Slack fails)
+        deliveries = []
+        try:
+            if CHECKIN_DIGEST_ENABLED:
+                checkin_digest.add({
+                    'user_name': user_name,
+                    'dealership_name': dealership_name,
+                    'checkin_time': checkin_time_str,
+                    'distance': distance,
+                    'device_type': device_type
+                })
+            else:
+                deliveries = send_checkin_slack_notification(
+                    user_name,
+                    dealership_name, 
+                    checkin_time_str, 
+                    user_lat, 
+                    user_lng, 
+                    distance,
+                    device_type,
+                    dealership_id
+                )
         except Exception as slack_error:
-            print(f"Slack notification failed but check-in continues: {slack_error}")
+            logger.exception("Slack notification failed but check-in continues")
         
         return jsonify({
             'success': True,
-            'message': f'Successfully checked in {user_name} to {dealership_name} at {checkin_time_str}'
+            'message': f'Successfully checked in {user_name} to {dealership_name} at {checkin_time_str}',
+            'checkin_id': checkin_id,
+            'checkin_token': token,
+            'slack_delivery_id': notification_router.first_delivery_id(deliveries),
+            'slack_deliveries': deliveries,
+            'slack_digest': CHECKIN_DIGEST_ENABLED
         })
         
     except Exception as e:
-        print(f"Check-in error: {e}")
+        logger.exception("Check-in error")
         return jsonify({
             'success': False,
             'message': 'Check-in failed'
@@ -402,14 +644,8 @@ def checkin():
 def checkout():
     """Check out user from dealership"""
     try:
-        # Clear check-in information from session
-        session.pop('checked_in', None)
-        session.pop('user_name', None)
-        session.pop('dealership_id', None)
-        session.pop('dealership_name', None)
-        session.pop('checkin_latitude', None)
-        session.pop('checkin_longitude', None)
-        session.pop('checkin_time', None)
+        # Clear check-in information from session (token holders just discard the token)
+        clear_checkin_session()
         
         return jsonify({
             'success': True,
@@ -417,7 +653,7 @@ def checkout():
         })
         
     except Exception as e:
-        print(f"Check-out error: {e}")
+        logger.exception("Check-out error")
         return jsonify({
             'success': False,
             'message': 'Check-out failed'
@@ -425,13 +661,15 @@ def checkout():
 
 @checkin_bp.route('/checkin-status')
 def checkin_status():
-    """Get current check-in status"""
+    """Get current check-in status (from X-Checkin-Token or the session)"""
+    checkin = current_checkin() or {}
     return jsonify({
-        'checked_in': session.get('checked_in', False),
-        'user_name': session.get('user_name'),
-        'dealership_id': session.get('dealership_id'),
-        'dealership_name': session.get('dealership_name'),
-        'checkin_time': session.get('checkin_time')
+        'checked_in': bool(checkin),
+        'user_name': checkin.get('user_name'),
+        'dealership_id': checkin.get('dealership_id'),
+        'dealership_name': checkin.get('dealership_name'),
+        'checkin_time': checkin.get('checkin_time'),
+        'source': checkin.get('source')
     })
 
 # Initialize dealerships when module loads
@@ -0,0 +1,101 @@
+from flask import Blueprint, jsonify, request
+import hmac
+import os
+
+from services import outbox, slack_delivery
+
+delivery_bp = Blueprint('deliveries', __name__)
+
+def _admin_denied():
+    """Check the admin token when OUTBOX_ADMIN_TOKEN is configured"""
+    admin_token = os.environ.get('OUTBOX_ADMIN_TOKEN')
+    if not admin_token:
+        return None
+    supplied = request.headers.get('X-Admin-Token', '')
+    if hmac.compare_digest(supplied.encode('utf-8'), admin_token.encode('utf-8')):
+        return None
+    return jsonify({
+        'success': False,
+        'message': 'Admin token required'
+    }), 401
+
+def _mask_webhook(url):
+    """Hide the secret part of a webhook URL"""
+    if not url:
+        return url
+    return url.rsplit('/', 1)[0] + '/…'
+
+@delivery_bp.route('/deliveries/stats')
+def delivery_stats():
+    """Get Slack delivery queue depth and backpressure counters"""
+    return jsonify(slack_delivery.get_stats())
+
+@delivery_bp.route('/deliveries/<delivery_id>')
+def delivery_status(delivery_id):
+    """Get the status of a queued Slack delivery"""
+    delivery = slack_delivery.get_delivery(delivery_id)
+    if not delivery:
+        return jsonify({
+            'success': False,
+            'message': 'Delivery not found'
+        }), 404
+
+    return jsonify(delivery)
+
+@delivery_bp.route('/outbox')
+def list_outbox():
+    """Inspect outbox messages (?status=pending|retrying|sending|delivered|dead)"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    status = request.args.get('status')
+    limit = min(request.args.get('limit', 50, type=int), 500)
+
+    messages = outbox.list_messages(status, limit)
+    for message in messages:
+        message['webhook_url'] = _mask_webhook(message['webhook_url'])
+
+    return jsonify({
+        'counts': outbox.counts(),
+        'messages': messages
+    })
+
+@delivery_bp.route('/outbox/<message_id>/replay', methods=['POST'])
+def replay_message(message_id):
+    """Move a dead-lettered message back into the outbox and resend it"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    if not slack_delivery.replay(message_id):
+        return jsonify({
+            'success': False,
+            'message': 'Dead-lettered message not found'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'message': f'Message {message_id} queued for replay'
+    })
+
+@delivery_bp.route('/outbox/replay', methods=['POST'])
+def replay_outbox():
+    """Replay all dead letters (or the given ids) and dispatch every due message"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if ids is None:
+        ids = [m['id'] for m in outbox.list_messages('dead', limit=500)]
+
+    replayed = [message_id for message_id in ids if slack_delivery.replay(message_id)]
+    dispatched = slack_delivery.replay_due()
+
+    return jsonify({
+        'success': True,
+        'replayed': replayed,
+        'dispatched': dispatched
+    })
@@ -0,0 +1,217 @@
+from flask import Blueprint, Response, jsonify, request
+from datetime import datetime
+import csv
+import hmac
+import io
+import json
+import os
+import time
+
+from services import activity_store
+from routes.activity_slack import eastern_now
+
+history_bp = Blueprint('history', __name__)
+
+MAX_HISTORY_REPORTS = 1000
+MAX_LEADERBOARD_SIZE = 500
+
+# Stop streaming an export before the serverless response timeout; clients resume with ?after=
+EXPORT_TIME_BUDGET_SECONDS = float(os.environ.get('EXPORT_TIME_BUDGET_SECONDS', '25'))
+EXPORT_BATCH_ROWS = 1000
+
+EXPORT_DATASETS = {
+    'activity': (activity_store.iter_activity_export, activity_store.ACTIVITY_EXPORT_COLUMNS),
+    'checkins': (activity_store.iter_checkin_export, activity_store.CHECKIN_EXPORT_COLUMNS)
+}
+
+def _admin_denied():
+    """Require the admin token - reps' history, exports and GPS data are closed until one is configured"""
+    admin_token = os.environ.get('HISTORY_ADMIN_TOKEN') or os.environ.get('OUTBOX_ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({
+            'success': False,
+            'message': 'History API disabled; set HISTORY_ADMIN_TOKEN to enable it'
+        }), 403
+    supplied = request.headers.get('X-Admin-Token', '')
+    if hmac.compare_digest(supplied.encode('utf-8'), admin_token.encode('utf-8')):
+        return None
+    return jsonify({
+        'success': False,
+        'message': 'Admin token required'
+    }), 401
+
+def _date_args():
+    """Read ?start=&end= (YYYY-MM-DD, inclusive); returns (start, end, error_response)"""
+    dates = []
+    for arg in ('start', 'end'):
+        value = request.args.get(arg)
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return None, None, (jsonify({
+                    'success': False,
+                    'message': f'{arg} must be a date in YYYY-MM-DD format'
+                }), 400)
+        dates.append(value or None)
+    return dates[0], dates[1], None
+
+@history_bp.route('/history/reps/<path:rep>')
+def rep_history(rep):
+    """Get a rep's submitted reports and check-ins, newest first"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    start, end, error = _date_args()
+    if error:
+        return error
+
+    limit = max(1, min(request.args.get('limit', 100, type=int), MAX_HISTORY_REPORTS))
+    include_hours = request.args.get('include_hours', '').lower() in ('1', 'true', 'yes')
+
+    history = activity_store.rep_history(rep, start, end, limit, include_hours)
+    return jsonify({
+        'success': True,
+        'rep': rep,
+        'start': start,
+        'end': end,
+        **history
+    })
+
+@history_bp.route('/history/dealerships/<dealership>/totals')
+def dealership_totals(dealership):
+    """Get activity totals for a dealership (by id) overall and per day"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    start, end, error = _date_args()
+    if error:
+        return error
+
+    totals = activity_store.dealership_totals(dealership, start, end)
+    return jsonify({
+        'success': True,
+        'dealership': dealership,
+        'start': start,
+        'end': end,
+        **totals
+    })
+
+@history_bp.route('/leaderboards/<scope>')
+def leaderboard(scope):
+    """Get the top reps or dealerships for a day, ISO week or month (?period=&bucket=&limit=)"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    if scope not in ('reps', 'dealerships'):
+        return jsonify({
+            'success': False,
+            'message': 'Leaderboard scope must be reps or dealerships'
+        }), 404
+
+    period = request.args.get('period', 'day')
+    if period not in activity_store.PERIODS:
+        return jsonify({
+            'success': False,
+            'message': f"period must be one of {', '.join(activity_store.PERIODS)}"
+        }), 400
+
+    # Default to the current bucket in Eastern Time
+    bucket = request.args.get('bucket') or activity_store.period_buckets(eastern_now().date())[period]
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_LEADERBOARD_SIZE))
+
+    entries = activity_store.leaderboard(scope[:-1], period, bucket, limit)
+    return jsonify({
+        'success': True,
+        'scope': scope,
+        'period': period,
+        'bucket': bucket,
+        'entries': entries
+    })
+
+@history_bp.route('/exports/<dataset>')
+def export(dataset):
+    """Stream hourly activity or check-ins as CSV/NDJSON (?format=&start=&end=&dealership=&after=&limit=)"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({
+            'success': False,
+            'message': f"Unknown export; use one of {', '.join(EXPORT_DATASETS)}"
+        }), 404
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({
+            'success': False,
+            'message': "format must be 'csv' or 'ndjson'"
+        }), 400
+
+    start, end, error = _date_args()
+    if error:
+        return error
+
+    after = request.args.get('after')
+    if after:
+        try:
+            after = activity_store.parse_cursor(after, dataset)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'after must be the cursor value of the last row received'
+            }), 400
+    else:
+        after = None
+
+    limit = request.args.get('limit', type=int)
+    dealership = request.args.get('dealership') or None
+    iterate, columns = EXPORT_DATASETS[dataset]
+    rows = iterate(start, end, dealership, after, EXPORT_BATCH_ROWS)
+
+    def bounded_rows():
+        # Rows stop at the limit or the time budget; the last row's cursor resumes the export
+        deadline = time.monotonic() + EXPORT_TIME_BUDGET_SECONDS
+        for count, row in enumerate(rows, 1):
+            yield row
+            if (limit and count >= limit) or time.monotonic() > deadline:
+                return
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for count, row in enumerate(bounded_rows(), 1):
+            writer.writerow(row)
+            if count % EXPORT_BATCH_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def generate_ndjson():
+        lines = []
+        for row in bounded_rows():
+            lines.append(json.dumps({column: row[column] for column in columns}))
+            if len(lines) == EXPORT_BATCH_ROWS:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    name_parts = [dataset] + [part for part in (dealership, start, end) if part]
+    if export_format == 'ndjson':
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    else:
+        body, mimetype = generate_csv(), 'text/csv'
+
+    # No Content-Length, so the body goes out with chunked transfer encoding
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{"_".join(name_parts)}.{export_format}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,387 @@
+import os
+
+from services import scoring, sqlite_db
+
+# Server-side record of every submitted report and check-in
+ACTIVITY_DB_PATH = os.environ.get('ACTIVITY_DB_PATH') or sqlite_db.default_path('activity_logger.sqlite3')
+
+_METRIC_COLUMNS = ', '.join(scoring.METRIC_KEYS)
+_METRIC_DEFS = ',\n    '.join(f'{key} INTEGER NOT NULL DEFAULT 0' for key in scoring.METRIC_KEYS)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    rep TEXT NOT NULL,
+    rep_key TEXT NOT NULL,
+    dealership TEXT NOT NULL,
+    dealership_name TEXT,
+    report_date TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    checkin_time TEXT,
+    hours INTEGER NOT NULL,
+    total_score INTEGER NOT NULL,
+    {_METRIC_DEFS}
+);
+CREATE INDEX IF NOT EXISTS idx_reports_rep_date ON reports (rep_key, report_date);
+CREATE INDEX IF NOT EXISTS idx_reports_dealership_date ON reports (dealership, report_date);
+CREATE INDEX IF NOT EXISTS idx_reports_date ON reports (report_date);
+
+CREATE TABLE IF NOT EXISTS activity_hours (
+    report_id INTEGER NOT NULL REFERENCES reports (id),
+    hour INTEGER NOT NULL,
+    rep_key TEXT NOT NULL,
+    dealership TEXT NOT NULL,
+    report_date TEXT NOT NULL,
+    description TEXT,
+    {_METRIC_DEFS},
+    score INTEGER NOT NULL,
+    rating INTEGER NOT NULL,
+    PRIMARY KEY (report_id, hour)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_hours_rep_date ON activity_hours (rep_key, report_date);
+CREATE INDEX IF NOT EXISTS idx_hours_dealership_date ON activity_hours (dealership, report_date);
+CREATE INDEX IF NOT EXISTS idx_hours_date ON activity_hours (report_date);
+
+CREATE TABLE IF NOT EXISTS checkins (
+    id INTEGER PRIMARY KEY,
+    rep TEXT NOT NULL,
+    rep_key TEXT NOT NULL,
+    dealership TEXT NOT NULL,
+    dealership_name TEXT,
+    checkin_date TEXT NOT NULL,
+    checkin_time TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    distance REAL,
+    device_type TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_checkins_rep_date ON checkins (rep_key, checkin_date);
+CREATE INDEX IF NOT EXISTS idx_checkins_dealership_date ON checkins (dealership, checkin_date);
+CREATE INDEX IF NOT EXISTS idx_checkins_date ON checkins (checkin_date);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT,
+    reports INTEGER NOT NULL DEFAULT 0,
+    hours INTEGER NOT NULL DEFAULT 0,
+    total_score INTEGER NOT NULL DEFAULT 0,
+    {_METRIC_DEFS},
+    PRIMARY KEY (period, bucket, scope, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollups_leaderboard ON rollups (period, bucket, scope, total_score DESC);
+"""
+
+# Leaderboard buckets: day "2024-05-17", ISO week "2024-W20", month "2024-05"
+PERIODS = ('day', 'week', 'month')
+SCOPES = ('rep', 'dealership')
+
+_ROLLUP_COUNTERS = ('reports', 'hours', 'total_score') + tuple(scoring.METRIC_KEYS)
+_ROLLUP_UPSERT = f"""
+    INSERT INTO rollups (period, bucket, scope, key, name, {', '.join(_ROLLUP_COUNTERS)})
+    VALUES (?, ?, ?, ?, ?, {', '.join('?' * len(_ROLLUP_COUNTERS))})
+    ON CONFLICT (period, bucket, scope, key) DO UPDATE SET
+        name = excluded.name,
+        {', '.join(f'{column} = {column} + excluded.{column}' for column in _ROLLUP_COUNTERS)}
+"""
+
+def _db():
+    return sqlite_db.get_connection(ACTIVITY_DB_PATH, _SCHEMA)
+
+def rep_key(name):
+    """Normalized rep name used for lookups ("  Jane  Doe" and "jane doe" match)"""
+    return ' '.join((name or '').split()).lower()
+
+def dealership_key(dealership_id, dealership_name):
+    """Dealership column value - the id when known, otherwise the display name"""
+    return dealership_id or dealership_name or 'unknown'
+
+def period_buckets(day):
+    """Bucket labels a date falls in, keyed by period"""
+    iso_year, iso_week, _ = day.isocalendar()
+    return {
+        'day': day.strftime('%Y-%m-%d'),
+        'week': f'{iso_year}-W{iso_week:02d}',
+        'month': day.strftime('%Y-%m')
+    }
+
+def _rollup_rows(day, rep, rep_name, dealership, dealership_name, counters):
+    """Rollup upsert parameters for every period and scope a report contributes to"""
+    rows = []
+    for period, bucket in period_buckets(day).items():
+        rows.append((period, bucket, 'rep', rep, rep_name, *counters))
+        rows.append((period, bucket, 'dealership', dealership, dealership_name, *counters))
+    return rows
+
+def _date_range(column, start, end):
+    """SQL condition and parameters for an inclusive YYYY-MM-DD range"""
+    conditions, params = [], []
+    if start:
+        conditions.append(f'{column} >= ?')
+        params.append(start)
+    if end:
+        conditions.append(f'{column} <= ?')
+        params.append(end)
+    return conditions, params
+
+def record_report(name, activities, scores, dealership_id, dealership_name, checkin_time, submitted_at):
+    """Store a submitted report and its hourly rows in one transaction; returns the report id"""
+    key = rep_key(name)
+    dealership = dealership_key(dealership_id, dealership_name)
+    report_date = submitted_at.strftime('%Y-%m-%d')
+
+    db = _db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        cursor = db.execute(
+            f"""INSERT INTO reports (rep, rep_key, dealership, dealership_name, report_date, submitted_at,
+                                     checkin_time, hours, total_score, {_METRIC_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {', '.join('?' * len(scoring.METRIC_KEYS))})""",
+            (name, key, dealership, dealership_name, report_date, submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
+             checkin_time, len(activities), scores.total_score, *scores.totals)
+        )
+        report_id = cursor.lastrowid
+
+        matrix = scoring.activity_matrix(activities)
+        db.executemany(
+            f"""INSERT INTO activity_hours (report_id, hour, rep_key, dealership, report_date, description,
+                                            {_METRIC_COLUMNS}, score, rating)
+                VALUES (?, ?, ?, ?, ?, ?, {', '.join('?' * len(scoring.METRIC_KEYS))}, ?, ?)""",
+            [
+                (report_id, hour + 1, key, dealership, report_date, activity.get('description', ''),
+                 *matrix[hour], scores.hour_scores[hour], scores.ratings[hour])
+                for hour, activity in enumerate(activities)
+            ]
+        )
+
+        # Keep the leaderboard rollups in step with the raw rows
+        counters = (1, len(activities), scores.total_score, *scores.totals)
+        db.executemany(_ROLLUP_UPSERT, _rollup_rows(submitted_at.date(), key, name, dealership, dealership_name, counters))
+        db.execute('COMMIT')
+    except Exception:
+        db.execute('ROLLBACK')
+        raise
+    return report_id
+
+def record_checkin(name, dealership_id, dealership_name, checkin_time, latitude, longitude, distance, device_type):
+    """Store a check-in; checkin_time is the 'YYYY-MM-DD HH:MM:SS' Eastern string"""
+    cursor = _db().execute(
+        """INSERT INTO checkins (rep, rep_key, dealership, dealership_name, checkin_date, checkin_time,
+                                 latitude, longitude, distance, device_type)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (name, rep_key(name), dealership_key(dealership_id, dealership_name), dealership_name,
+         checkin_time[:10], checkin_time, latitude, longitude, distance, device_type)
+    )
+    return cursor.lastrowid
+
+def _keyset_rows(select, order_columns, conditions, params, after, batch_size):
+    """Yield rows in index order, one bounded batch per query.
+
+    Each batch resumes after the previous batch's last key, so memory stays
+    flat and no read transaction is held open while the caller streams.
+    """
+    key_list = ', '.join(order_columns)
+    while True:
+        where = list(conditions)
+        batch_params = list(params)
+        if after is not None:
+            where.append(f"({key_list}) > ({', '.join('?' * len(order_columns))})")
+            batch_params.extend(after)
+        sql = select + (' WHERE ' + ' AND '.join(where) if where else '') + f' ORDER BY {key_list} LIMIT ?'
+        rows = _db().execute(sql, batch_params + [batch_size]).fetchall()
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            return
+        after = tuple(rows[-1][column.split('.')[-1]] for column in order_columns)
+
+def parse_cursor(value, dataset):
+    """Decode an export resume cursor ("date:id" or "date:id:hour"); raises ValueError"""
+    parts = value.split(':')
+    if dataset == 'activity' and len(parts) == 3:
+        return (parts[0], int(parts[1]), int(parts[2]))
+    if dataset == 'checkins' and len(parts) == 2:
+        return (parts[0], int(parts[1]))
+    raise ValueError(f'Invalid {dataset} cursor: {value}')
+
+ACTIVITY_EXPORT_COLUMNS = (
+    ('cursor', 'report_id', 'report_date', 'hour', 'rep', 'dealership', 'dealership_name', 'submitted_at', 'checkin_time',
+     'description') + tuple(scoring.METRIC_KEYS) + ('score', 'rating')
+)
+CHECKIN_EXPORT_COLUMNS = ('cursor', 'checkin_id', 'checkin_date', 'checkin_time', 'rep', 'dealership', 'dealership_name',
+                          'distance', 'device_type')
+
+def iter_activity_export(start=None, end=None, dealership=None, after=None, batch_size=1000):
+    """Hourly rows joined with their report, ordered by (date, report, hour)"""
+    conditions, params = _date_range('h.report_date', start, end)
+    if dealership:
+        conditions.insert(0, 'h.dealership = ?')
+        params.insert(0, dealership)
+    select = (
+        f"""SELECT h.report_date, h.report_id, h.hour, r.rep, h.dealership, r.dealership_name, r.submitted_at,
+                   r.checkin_time, h.description, {', '.join(f'h.{key}' for key in scoring.METRIC_KEYS)}, h.score, h.rating
+            FROM activity_hours h JOIN reports r ON r.id = h.report_id"""
+    )
+    for row in _keyset_rows(select, ('h.report_date', 'h.report_id', 'h.hour'), conditions, params, after, batch_size):
+        record = dict(row)
+        record['cursor'] = f"{row['report_date']}:{row['report_id']}:{row['hour']}"
+        yield record
+
+def iter_checkin_export(start=None, end=None, dealership=None, after=None, batch_size=1000):
+    """Check-ins ordered by (date, id)"""
+    conditions, params = _date_range('checkin_date', start, end)
+    if dealership:
+        conditions.insert(0, 'dealership = ?')
+        params.insert(0, dealership)
+    select = (
+        """SELECT checkin_date, id, checkin_time, rep, dealership, dealership_name, distance, device_type
+           FROM checkins"""
+    )
+    for row in _keyset_rows(select, ('checkin_date', 'id'), conditions, params, after, batch_size):
+        record = dict(row)
+        record['checkin_id'] = record.pop('id')
+        record['cursor'] = f"{row['checkin_date']}:{row['id']}"
+        yield record
+
+def rep_history(name, start=None, end=None, limit=100, include_hours=False):
+    """Reports and check-ins for one rep, newest first"""
+    db = _db()
+    key = rep_key(name)
+
+    conditions, params = _date_range('report_date', start, end)
+    where = ' AND '.join(['rep_key = ?'] + conditions)
+    reports = [dict(row) for row in db.execute(
+        f"""SELECT id, rep, dealership, dealership_name, report_date, submitted_at, checkin_time,
+                   hours, total_score, {_METRIC_COLUMNS}
+            FROM reports WHERE {where} ORDER BY report_date DESC, id DESC LIMIT ?""",
+        [key, *params, limit]
+    )]
+
+    if include_hours and reports:
+        by_id = {report['id']: report for report in reports}
+        for report in reports:
+            report['activities'] = []
+        placeholders = ', '.join('?' * len(by_id))
+        for row in db.execute(
+            f"""SELECT report_id, hour, description, {_METRIC_COLUMNS}, score, rating
+                FROM activity_hours WHERE report_id IN ({placeholders}) ORDER BY report_id, hour""",
+            list(by_id)
+        ):
+            hour = dict(row)
+            by_id[hour.pop('report_id')]['activities'].append(hour)
+
+    conditions, params = _date_range('checkin_date', start, end)
+    where = ' AND '.join(['rep_key = ?'] + conditions)
+    checkins = [dict(row) for row in db.execute(
+        f"""SELECT id, rep, dealership, dealership_name, checkin_time, distance, device_type
+            FROM checkins WHERE {where} ORDER BY checkin_date DESC, id DESC LIMIT ?""",
+        [key, *params, limit]
+    )]
+
+    return {'reports': reports, 'checkins': checkins}
+
+def dealership_totals(dealership, start=None, end=None):
+    """Metric totals for one dealership over a date range, overall and per day"""
+    db = _db()
+    sums = ', '.join(f'SUM({key}) AS {key}' for key in scoring.METRIC_KEYS)
+
+    conditions, params = _date_range('report_date', start, end)
+    where = ' AND '.join(['dealership = ?'] + conditions)
+    overall = dict(db.execute(
+        f"""SELECT COUNT(*) AS reports, COUNT(DISTINCT rep_key) AS reps,
+                   COALESCE(SUM(total_score), 0) AS total_score, {sums}
+            FROM reports WHERE {where}""",
+        [dealership, *params]
+    ).fetchone())
+    for key in scoring.METRIC_KEYS:
+        overall[key] = overall[key] or 0
+
+    days = [dict(row) for row in db.execute(
+        f"""SELECT report_date, COUNT(*) AS reports, SUM(total_score) AS total_score, {sums}
+            FROM reports WHERE {where} GROUP BY report_date ORDER BY report_date""",
+        [dealership, *params]
+    )]
+
+    conditions, params = _date_range('checkin_date', start, end)
+    where = ' AND '.join(['dealership = ?'] + conditions)
+    overall['checkins'] = db.execute(
+        f"SELECT COUNT(*) FROM checkins WHERE {where}",
+        [dealership, *params]
+    ).fetchone()[0]
+
+    return {'totals': overall, 'days': days}
+
+def leaderboard(scope, period, bucket, limit=10):
+    """Top reps or dealerships for one period bucket, read straight from the rollups"""
+    rows = _db().execute(
+        f"""SELECT key, name, {', '.join(_ROLLUP_COUNTERS)}
+            FROM rollups WHERE period = ? AND bucket = ? AND scope = ?
+            ORDER BY total_score DESC, key LIMIT ?""",
+        (period, bucket, scope, limit)
+    )
+    entries = []
+    for rank, row in enumerate(rows, 1):
+        entry = dict(row)
+        entry['rank'] = rank
+        entry['average_hour_score'] = round(entry['total_score'] / entry['hours'], 2) if entry['hours'] else 0
+        entries.append(entry)
+    return entries
+
+def rebuild_rollups():
+    """Rescore the stored hours with the current weights and recompute every rollup.
+
+    Returns the number of rollup rows written.
+    """
+    from datetime import date
+
+    db = _db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        # Hour scores and ratings were stored under the weights of the day - recompute them from the metrics
+        rescored = []
+        for row in db.execute(
+            f"SELECT report_id, hour, score, rating, {', '.join(scoring.METRIC_KEYS)} FROM activity_hours"
+        ):
+            score, rating = scoring.rate_vector(tuple(row[4:]))
+            if (score, rating) != (row['score'], row['rating']):
+                rescored.append((score, rating, row['report_id'], row['hour']))
+        if rescored:
+            db.executemany("UPDATE activity_hours SET score = ?, rating = ? WHERE report_id = ? AND hour = ?", rescored)
+            db.execute(
+                """UPDATE reports SET total_score = (
+                       SELECT COALESCE(SUM(h.score), 0) FROM activity_hours h WHERE h.report_id = reports.id
+                   )"""
+            )
+
+        # One aggregate per (day, rep, dealership), folded into weeks and months here
+        day_rows = db.execute(
+            f"""SELECT r.report_date, r.rep_key, r.dealership, MAX(r.rep) AS rep, MAX(r.dealership_name) AS dealership_name,
+                       COUNT(DISTINCT r.id) AS reports, COUNT(h.hour) AS hours, COALESCE(SUM(h.score), 0) AS total_score,
+                       {', '.join(f'COALESCE(SUM(h.{key}), 0)' for key in scoring.METRIC_KEYS)}
+                FROM reports r LEFT JOIN activity_hours h ON h.report_id = r.id
+                GROUP BY r.report_date, r.rep_key, r.dealership"""
+        ).fetchall()
+
+        rollups = {}
+        for row in day_rows:
+            counters = tuple(row[5:])
+            for rollup in _rollup_rows(date.fromisoformat(row['report_date']), row['rep_key'], row['rep'],
+                                       row['dealership'], row['dealership_name'], counters):
+                rollup_key, name = rollup[:4], rollup[4]
+                current = rollups.get(rollup_key)
+                if current is None:
+                    rollups[rollup_key] = [name, *counters]
+                else:
+                    current[0] = name or current[0]
+                    for i, value in enumerate(counters, 1):
+                        current[i] += value
+
+        db.execute('DELETE FROM rollups')
+        db.executemany(_ROLLUP_UPSERT, [(*rollup_key, *values) for rollup_key, values in rollups.items()])
+        db.execute('COMMIT')
+    except Exception:
+        db.execute('ROLLBACK')
+        raise
+    return len(rollups)
@@ -0,0 +1,83 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from functools import lru_cache
+
+# Signed, self-contained check-in state: "<payload>.<signature>", both base64url.
+# Verification is one HMAC plus a constant-time compare - no server-side lookup.
+
+TOKEN_VERSION = 1
+# Tokens outlive a working day but not the next one
+CHECKIN_TOKEN_TTL_SECONDS = int(os.environ.get('CHECKIN_TOKEN_TTL_SECONDS', str(16 * 3600)))
+SIGNATURE_BYTES = 16
+COORDINATE_DECIMALS = 6
+
+# Claim names in the token -> check-in fields
+_CLAIMS = {
+    'u': 'user_name',
+    'd': 'dealership_id',
+    'n': 'dealership_name',
+    't': 'checkin_time',
+    'a': 'latitude',
+    'o': 'longitude'
+}
+
+@lru_cache(maxsize=4)
+def _signing_key(secret):
+    """Key derived from the app secret so tokens can't be confused with session cookies"""
+    if isinstance(secret, str):
+        secret = secret.encode('utf-8')
+    return hashlib.sha256(b'activity-logger.checkin-token.v1:' + secret).digest()
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _sign(secret, payload):
+    return hmac.new(_signing_key(secret), payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+def issue(secret, user_name, dealership_id, dealership_name, checkin_time, latitude=None, longitude=None, issued_at=None):
+    """Create a token for a check-in; checkin_time is the 'YYYY-MM-DD HH:MM:SS' Eastern string"""
+    issued_at = int(time.time() if issued_at is None else issued_at)
+    claims = {
+        'v': TOKEN_VERSION,
+        'u': user_name,
+        'd': dealership_id,
+        'n': dealership_name,
+        't': checkin_time,
+        'i': issued_at,
+        'e': issued_at + CHECKIN_TOKEN_TTL_SECONDS
+    }
+    if latitude is not None and longitude is not None:
+        claims['a'] = round(float(latitude), COORDINATE_DECIMALS)
+        claims['o'] = round(float(longitude), COORDINATE_DECIMALS)
+
+    payload = _b64encode(json.dumps(claims, separators=(',', ':'), ensure_ascii=False).encode('utf-8')).encode('ascii')
+    return payload.decode('ascii') + '.' + _b64encode(_sign(secret, payload))
+
+def verify(secret, token, now=None):
+    """Check-in fields from a valid, unexpired token, or None"""
+    if not token or not isinstance(token, str) or token.count('.') != 1:
+        return None
+    payload, signature = token.split('.')
+    try:
+        expected = _sign(secret, payload.encode('ascii'))
+        if not hmac.compare_digest(_b64decode(signature), expected):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, UnicodeError):
+        return None
+
+    if claims.get('v') != TOKEN_VERSION:
+        return None
+    if (time.time() if now is None else now) >= claims.get('e', 0):
+        return None
+
+    checkin = {field: claims.get(claim) for claim, field in _CLAIMS.items()}
+    checkin['expires_at'] = claims['e']
+    return checkin
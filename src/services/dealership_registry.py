@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+
+from services import geo
+
+logger = logging.getLogger(__name__)
+
+# Source data, and the snapshot scripts/build_dealership_registry.py compiles from it
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+ADDRESSES_PATH = os.path.join(STATIC_DIR, 'dealership_addresses.txt')
+SNAPSHOT_PATH = os.path.join(STATIC_DIR, 'dealerships.json')
+
+SNAPSHOT_FORMAT = 1
+# Set DEALERSHIP_REGISTRY_SNAPSHOT=off to always parse the text file
+USE_SNAPSHOT = os.environ.get('DEALERSHIP_REGISTRY_SNAPSHOT', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# Coordinates for all dealerships (using real geocoded addresses)
+DEALERSHIP_COORDINATES = {
+    '401_infiniti': {'lat': 43.646769, 'lng': -79.6359934},
+    '401_kia': {'lat': 43.646769, 'lng': -79.6359934},
+    '401_mazda': {'lat': 43.646769, 'lng': -79.6359934},
+    '401_mitsubishi_dixie_mitsubishi': {'lat': 43.6444388, 'lng': -79.6442699},
+    '401_nissan': {'lat': 43.646769, 'lng': -79.6359934},
+    '401_volkswagen': {'lat': 43.646769, 'lng': -79.6359934},
+    'agincourt_mazda': {'lat': 43.8128735, 'lng': -79.2444342},
+    'audi_barrie': {'lat': 44.3017312, 'lng': -79.6823509},
+    'audi_queensway': {'lat': 43.6154775, 'lng': -79.5466424},
+    'audi_thornhill': {'lat': 43.7994946, 'lng': -79.4212594},
+    'barrie_volkswagen': {'lat': 44.3592463, 'lng': -79.692863},
+    'bmw_aurora': {'lat': 44.0065, 'lng': -79.4504},
+    'bolton_toyota': {'lat': 43.8497373, 'lng': -79.6957908},
+    'frost_gm': {'lat': 43.7038815, 'lng': -79.7892515},
+    'markham_acura': {'lat': 43.8658623, 'lng': -79.2867289},
+    'markham_honda': {'lat': 43.8557957, 'lng': -79.3061335},
+    'markham_kia': {'lat': 43.8556092, 'lng': -79.3074614},
+    'meadowvale_honda': {'lat': 43.5802831, 'lng': -79.757078},
+    'oakville_honda': {'lat': 43.4692995, 'lng': -79.6800906},
+    'thorncrest_ford': {'lat': 43.61664, 'lng': -79.5403798},
+    'vaughan_chrysler': {'lat': 43.8361, 'lng': -79.5083},
+    'test_site': {'lat': 43.8850691, 'lng': -79.4190847}
+}
+
+# Default coordinates for any missing dealerships (Toronto area)
+DEFAULT_COORDINATES = {'lat': 43.6532, 'lng': -79.3832}
+
+def parse_dealership_text(content):
+    """Parse the dealership address file into dealership records"""
+    dealerships = []
+    for line in content.strip().split('\n'):
+        line = line.strip()
+        if not line or ':' not in line or line.startswith('Dealership Addresses'):
+            continue
+
+        # Parse format: "1. 401 Infiniti: 5500 Dixie Road, Unit D, Mississauga, Ontario, L4W 4N3"
+        name_part, address = line.split(':', 1)
+        name_part = name_part.strip()
+        address = address.strip()
+
+        # Extract name (remove number prefix)
+        if '. ' in name_part:
+            name = name_part.split('. ', 1)[1]
+        else:
+            name = name_part
+
+        # Generate ID from name
+        dealership_id = name.lower().replace(' ', '_').replace('(', '').replace(')', '')
+
+        coordinates = DEALERSHIP_COORDINATES.get(dealership_id, DEFAULT_COORDINATES)
+        dealerships.append({
+            'id': dealership_id,
+            'name': name,
+            'address': address,
+            'latitude': coordinates['lat'],
+            'longitude': coordinates['lng']
+        })
+    return dealerships
+
+def source_version(content):
+    """Content hash of the address file and coordinate table"""
+    digest = hashlib.sha256()
+    digest.update(str(SNAPSHOT_FORMAT).encode('utf-8'))
+    digest.update(content.encode('utf-8'))
+    digest.update(json.dumps(DEALERSHIP_COORDINATES, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def read_source():
+    with open(ADDRESSES_PATH, 'r', encoding='utf-8') as file:
+        return file.read()
+
+def build_index(dealerships):
+    """Build the spatial index over dealership coordinates"""
+    return geo.SpatialIndex(dealerships, lambda d: d['latitude'], lambda d: d['longitude'])
+
+def compile_snapshot(content):
+    """Build the precomputed snapshot: parsed records plus the prebuilt spatial index"""
+    dealerships = parse_dealership_text(content)
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'version': source_version(content),
+        'dealerships': dealerships,
+        'index': build_index(dealerships).to_arrays()
+    }
+
+def load_registry():
+    """Load dealerships and their spatial index, preferring the compiled snapshot.
+
+    Returns (dealerships, index, version, source) where source is 'snapshot' or 'text'.
+    The snapshot is only used while its version matches the current address
+    file and coordinate table, so an edit without a rebuild can't serve stale data.
+    A missing, truncated or corrupt snapshot falls back to the address file, and
+    a missing address file falls back to the snapshot as built; only when
+    neither can be read does loading fail.
+    """
+    # Hashing the small text file is cheap; parsing and indexing it is what the snapshot saves
+    try:
+        content = read_source()
+    except FileNotFoundError:
+        content = None
+        logger.warning("Dealership address file is missing - using the snapshot as built", extra={'path': ADDRESSES_PATH})
+    version = source_version(content) if content is not None else None
+
+    if USE_SNAPSHOT or content is None:
+        try:
+            with open(SNAPSHOT_PATH, 'r', encoding='utf-8') as file:
+                snapshot = json.load(file)
+            if not isinstance(snapshot, dict):
+                raise ValueError('snapshot is not a JSON object')
+            if snapshot.get('format') == SNAPSHOT_FORMAT and (content is None or snapshot.get('version') == version):
+                dealerships = snapshot['dealerships']
+                index = geo.SpatialIndex.from_arrays(dealerships, snapshot['index'])
+                return dealerships, index, snapshot.get('version'), 'snapshot'
+            logger.warning(
+                "Dealership snapshot is out of date - parsing the address file; rerun scripts/build_dealership_registry.py",
+                extra={'snapshot_version': snapshot.get('version'), 'source_version': version}
+            )
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            logger.warning(
+                "Dealership snapshot is unreadable - parsing the address file; rerun scripts/build_dealership_registry.py",
+                extra={'path': SNAPSHOT_PATH, 'error': str(e)}
+            )
+
+    if content is None:
+        raise FileNotFoundError(f'No dealership data: {ADDRESSES_PATH} is missing and {SNAPSHOT_PATH} is not usable')
+
+    # No usable snapshot (e.g. local development before a build) - parse the text file
+    dealerships = parse_dealership_text(content)
+    return dealerships, build_index(dealerships), version, 'text'
@@ -0,0 +1,82 @@
+import atexit
+import json
+import logging
+import threading
+import time
+
+from services import outbox
+
+logger = logging.getLogger(__name__)
+
+
+class DigestBuffer:
+    """Collect events and flush them as one batch per time window.
+
+    The batch is flushed when the window elapses or when it reaches
+    max_events, whichever comes first. Events are stored in the outbox
+    database as they are added, so a restart, deploy or frozen instance
+    doesn't drop them: leftovers go out on start(), with the next event
+    once their window has passed, or at exit.
+    """
+
+    def __init__(self, window_seconds, max_events, flush_callback, name='digest'):
+        self.window_seconds = window_seconds
+        self.max_events = max_events
+        self.flush_callback = flush_callback
+        self.name = name
+        self._timer = None
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """Schedule events left by an earlier process and flush at exit"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        atexit.register(self.flush)
+        count, oldest = outbox.digest_backlog(self.name)
+        if count:
+            self._schedule(oldest)
+
+    def add(self, event):
+        """Store an event, flushing immediately if the batch is full or overdue"""
+        count, oldest = outbox.add_digest_event(self.name, json.dumps(event))
+        if count >= self.max_events or oldest + self.window_seconds <= time.time():
+            self.flush()
+        else:
+            self._schedule(oldest)
+
+    def flush(self):
+        """Send whatever is buffered now"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        batch = [json.loads(event) for event in outbox.take_digest_events(self.name)]
+        if batch:
+            self._send(batch)
+
+    def pending(self):
+        """Number of buffered events"""
+        return outbox.digest_backlog(self.name)[0]
+
+    def _schedule(self, oldest):
+        """Start the window timer (measured from the oldest buffered event) unless one is running"""
+        with self._lock:
+            if self._timer is not None:
+                return
+            delay = max(0.0, oldest + self.window_seconds - time.time())
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.name = f"{self.name}-flush"
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _send(self, batch):
+        try:
+            self.flush_callback(batch)
+        except Exception as e:
+            logger.exception("Error flushing digest", extra={'digest': self.name, 'events': len(batch)})
+            # Keep the events for the next window rather than dropping them
+            for event in batch:
+                outbox.add_digest_event(self.name, json.dumps(event))
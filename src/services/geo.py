@@ -0,0 +1,162 @@
+import heapq
+import math
+
+# Radius of earth in meters
+EARTH_RADIUS_M = 6371000
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Distance in meters between two points using the Haversine formula"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+
+    return c * EARTH_RADIUS_M
+
+def haversine_many(lats1, lngs1, lats2, lngs2):
+    """Haversine distances in meters for parallel sequences of points.
+
+    Same arithmetic as haversine_distance, so results match it exactly. The
+    second point is usually one of a few sites, so its radians and cosine
+    are computed once per distinct site.
+    """
+    radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+    site_cache = {}
+    distances = []
+    for lat1, lon1, lat2, lon2 in zip(lats1, lngs1, lats2, lngs2):
+        site = site_cache.get((lat2, lon2))
+        if site is None:
+            lat2_rad = radians(lat2)
+            site = site_cache[(lat2, lon2)] = (lat2_rad, radians(lon2), cos(lat2_rad))
+        lat2_rad, lon2_rad, cos_lat2 = site
+
+        lat1 = radians(lat1)
+        dlat = lat2_rad - lat1
+        dlon = lon2_rad - radians(lon1)
+        a = sin(dlat/2)**2 + cos(lat1) * cos_lat2 * sin(dlon/2)**2
+        distances.append(2 * asin(sqrt(a)) * EARTH_RADIUS_M)
+    return distances
+
+def unit_vector(lat, lng):
+    """Point on the unit sphere for a latitude/longitude in degrees"""
+    lat, lng = math.radians(lat), math.radians(lng)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lng), cos_lat * math.sin(lng), math.sin(lat))
+
+
+class SpatialIndex:
+    """k-d tree over unit-sphere vectors for nearest-neighbour lookups.
+
+    Straight-line (chord) distance between unit vectors grows with
+    great-circle distance, so the nearest vectors are the nearest sites.
+    """
+
+    def __init__(self, items, get_lat, get_lng):
+        self._items = []
+        self._item_positions = []
+        self._vectors = []
+        for position, item in enumerate(items):
+            lat, lng = get_lat(item), get_lng(item)
+            if lat is None or lng is None:
+                continue
+            self._items.append(item)
+            self._item_positions.append(position)
+            self._vectors.append(unit_vector(lat, lng))
+
+        # Flat node arrays: point index, split axis, left child, right child (-1 = none)
+        self._point = []
+        self._axis = []
+        self._left = []
+        self._right = []
+        self._root = self._build(list(range(len(self._vectors))))
+
+    def to_arrays(self):
+        """Export the built tree as plain lists (for precompiled snapshots)"""
+        return {
+            'positions': self._item_positions,
+            'vectors': [list(vector) for vector in self._vectors],
+            'point': self._point,
+            'axis': self._axis,
+            'left': self._left,
+            'right': self._right,
+            'root': self._root
+        }
+
+    @classmethod
+    def from_arrays(cls, items, arrays):
+        """Restore a tree exported by to_arrays without rebuilding it"""
+        index = cls.__new__(cls)
+        index._item_positions = arrays['positions']
+        index._items = [items[position] for position in index._item_positions]
+        index._vectors = [tuple(vector) for vector in arrays['vectors']]
+        index._point = arrays['point']
+        index._axis = arrays['axis']
+        index._left = arrays['left']
+        index._right = arrays['right']
+        index._root = arrays['root']
+        return index
+
+    def __len__(self):
+        return len(self._items)
+
+    def _build(self, indices):
+        if not indices:
+            return -1
+
+        # Split on the axis with the widest spread
+        spreads = []
+        for axis in range(3):
+            values = [self._vectors[i][axis] for i in indices]
+            spreads.append(max(values) - min(values))
+        axis = spreads.index(max(spreads))
+
+        indices.sort(key=lambda i: self._vectors[i][axis])
+        middle = len(indices) // 2
+
+        node = len(self._point)
+        self._point.append(indices[middle])
+        self._axis.append(axis)
+        self._left.append(-1)
+        self._right.append(-1)
+
+        self._left[node] = self._build(indices[:middle])
+        self._right[node] = self._build(indices[middle + 1:])
+        return node
+
+    def nearest(self, lat, lng, k=1):
+        """Get the k items closest to a point, nearest first"""
+        if k <= 0 or self._root == -1:
+            return []
+
+        target = unit_vector(lat, lng)
+        # Max-heap of (-squared chord distance, point index) holding the best k so far
+        best = []
+        # Stack of (node, lower bound on squared distance to anything below it)
+        stack = [(self._root, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if node == -1 or (len(best) == k and bound >= -best[0][0]):
+                continue
+
+            point = self._point[node]
+            vector = self._vectors[point]
+            dist_sq = ((vector[0] - target[0]) ** 2 +
+                       (vector[1] - target[1]) ** 2 +
+                       (vector[2] - target[2]) ** 2)
+            if len(best) < k:
+                heapq.heappush(best, (-dist_sq, point))
+            elif dist_sq < -best[0][0]:
+                heapq.heapreplace(best, (-dist_sq, point))
+
+            axis = self._axis[node]
+            diff = target[axis] - vector[axis]
+            near, far = (self._left[node], self._right[node]) if diff < 0 else (self._right[node], self._left[node])
+
+            # The far side is only worth visiting if the splitting plane is closer than the kth best
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+
+        best.sort(key=lambda entry: (-entry[0], entry[1]))
+        return [self._items[point] for _, point in best]
@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional - gzip is always available
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+# Files larger than this are streamed from disk instead of cached in memory
+MAX_CACHED_FILE_BYTES = 5 * 1024 * 1024
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+_static_cache = {}
+_static_lock = threading.Lock()
+
+def build_entry(body, content_type):
+    """Precompute the ETag and compressed variants of a response body"""
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    entry = {
+        'etag': etag,
+        'content_type': content_type,
+        'identity': body,
+        'gzip': None,
+        'br': None
+    }
+    if len(body) >= MIN_COMPRESS_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+        gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gzipped) < len(body):
+            entry['gzip'] = gzipped
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                entry['br'] = compressed
+    return entry
+
+def _accepted_encodings():
+    """Content codings the client accepts (ignoring those with q=0)"""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if coding:
+            accepted.add(coding.lower())
+    return accepted
+
+def _not_modified(etag):
+    """Check If-None-Match against every representation of the body"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        # Encoded variants carry a "-br"/"-gzip" suffix on the same content hash
+        if tag.strip('"').split('-', 1)[0] == etag:
+            return True
+    return False
+
+def cached_response(entry, cache_control):
+    """Serve a cached body with ETag revalidation and the best precompressed variant"""
+    headers = {
+        'Cache-Control': cache_control,
+        'Vary': 'Accept-Encoding'
+    }
+
+    accepted = _accepted_encodings()
+    encoding = None
+    if entry['br'] is not None and 'br' in accepted:
+        encoding = 'br'
+    elif entry['gzip'] is not None and ('gzip' in accepted or '*' in accepted):
+        encoding = 'gzip'
+    headers['ETag'] = f'"{entry["etag"]}-{encoding}"' if encoding else f'"{entry["etag"]}"'
+
+    if _not_modified(entry['etag']):
+        return Response(status=304, headers=headers)
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        body = entry[encoding]
+    else:
+        body = entry['identity']
+    return Response(body, status=200, headers=headers, content_type=entry['content_type'])
+
+def static_file_response(directory, filename, cache_control='public, no-cache', substitutions=None):
+    """Serve a static file from an in-memory cache keyed on its mtime and size.
+
+    substitutions maps byte strings to replacements applied once when the
+    file is cached (e.g. to stamp asset versions into a page).
+    """
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        return Response('Not Found', status=404, content_type='text/plain')
+
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _static_lock:
+        cached = _static_cache.get(path)
+    if cached is None or cached[0] != key:
+        if stat.st_size > MAX_CACHED_FILE_BYTES:
+            from flask import send_from_directory
+            return send_from_directory(directory, filename)
+
+        with open(path, 'rb') as file:
+            body = file.read()
+        for old, new in (substitutions or {}).items():
+            body = body.replace(old, new)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        cached = (key, build_entry(body, content_type))
+        with _static_lock:
+            _static_cache[path] = cached
+
+    return cached_response(cached[1], cache_control)
@@ -0,0 +1,265 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, jsonify, make_response, request
+
+from services import sqlite_db
+
+# Idempotency-Key support: a retried request with the same key gets the stored
+# result instead of running (and posting to Slack) again.
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 60 * 60)))
+IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+# 'memory' (per process) or 'sqlite' (shared by every worker using IDEMPOTENCY_DB_PATH)
+IDEMPOTENCY_BACKEND = os.environ.get('IDEMPOTENCY_BACKEND', 'memory').lower()
+IDEMPOTENCY_DB_PATH = os.environ.get('IDEMPOTENCY_DB_PATH') or sqlite_db.default_path('activity_logger_idempotency.sqlite3')
+# How long a duplicate waits for the original request to finish before getting a 409
+IN_FLIGHT_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '10'))
+IN_FLIGHT_POLL_SECONDS = 0.05
+MAX_KEY_LENGTH = 255
+
+# Responses replay with everything but these headers
+_SKIPPED_HEADERS = ('Content-Length', 'Set-Cookie')
+
+
+class MemoryBackend:
+    """Bounded LRU of key -> (expires_at, pending, value) with per-entry expiry"""
+
+    def __init__(self, max_entries=IDEMPOTENCY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def add(self, key, ttl):
+        """Reserve a key as in flight; False if it already exists"""
+        now = time.time()
+        with self._lock:
+            if self._live(key, now) is not None:
+                return False
+            self._entries[key] = (now + ttl, True, None)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, False, value)
+            self._entries.move_to_end(key)
+
+    def get(self, key):
+        """{'pending': bool, 'value': ...} or None"""
+        with self._lock:
+            entry = self._live(key, time.time())
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return {'pending': entry[1], 'value': entry[2]}
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteBackend:
+    """Same interface as MemoryBackend, stored in SQLite so workers share keys"""
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key TEXT PRIMARY KEY,
+        value TEXT,
+        pending INTEGER NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at);
+    """
+    # Expired rows are swept on every Nth write
+    PRUNE_EVERY = 500
+
+    def __init__(self, path=IDEMPOTENCY_DB_PATH, max_entries=IDEMPOTENCY_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._writes = 0
+
+    def _db(self):
+        return sqlite_db.get_connection(self.path, self._SCHEMA)
+
+    def _maybe_prune(self, db, now):
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY:
+            return
+        db.execute('DELETE FROM idempotency_keys WHERE expires_at <= ?', (now,))
+        db.execute(
+            """DELETE FROM idempotency_keys WHERE key IN (
+                   SELECT key FROM idempotency_keys ORDER BY expires_at DESC LIMIT -1 OFFSET ?)""",
+            (self.max_entries,)
+        )
+
+    def add(self, key, ttl):
+        now = time.time()
+        db = self._db()
+        db.execute('DELETE FROM idempotency_keys WHERE key = ? AND expires_at <= ?', (key, now))
+        cursor = db.execute(
+            'INSERT INTO idempotency_keys (key, value, pending, expires_at) VALUES (?, NULL, 1, ?) ON CONFLICT (key) DO NOTHING',
+            (key, now + ttl)
+        )
+        self._maybe_prune(db, now)
+        return cursor.rowcount == 1
+
+    def set(self, key, value, ttl):
+        self._db().execute(
+            """INSERT INTO idempotency_keys (key, value, pending, expires_at) VALUES (?, ?, 0, ?)
+               ON CONFLICT (key) DO UPDATE SET value = excluded.value, pending = 0, expires_at = excluded.expires_at""",
+            (key, json.dumps(value), time.time() + ttl)
+        )
+
+    def get(self, key):
+        row = self._db().execute(
+            'SELECT value, pending FROM idempotency_keys WHERE key = ? AND expires_at > ?',
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return {'pending': bool(row['pending']), 'value': None if row['value'] is None else json.loads(row['value'])}
+
+    def delete(self, key):
+        self._db().execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+
+
+_backend = SQLiteBackend() if IDEMPOTENCY_BACKEND == 'sqlite' else MemoryBackend()
+
+def set_backend(backend):
+    """Swap the key store (anything with add/set/get/delete, e.g. a Redis adapter)"""
+    global _backend
+    _backend = backend
+
+def request_key():
+    """The Idempotency-Key header of the current request, or None"""
+    key = request.headers.get('Idempotency-Key', '').strip()
+    return key or None
+
+_TIMED_OUT = object()
+
+def _wait(slot):
+    """Wait for an in-flight entry to finish; returns it, None if it was released, or _TIMED_OUT"""
+    deadline = time.monotonic() + IN_FLIGHT_WAIT_SECONDS
+    while True:
+        entry = _backend.get(slot)
+        if entry is None or not entry['pending']:
+            return entry
+        if time.monotonic() >= deadline:
+            return _TIMED_OUT
+        time.sleep(IN_FLIGHT_POLL_SECONDS)
+
+def once(namespace, key, func, keep=None):
+    """Run func once per key; later calls get the first result.
+
+    Results must be JSON-serializable. keep(result) returning False (e.g. a
+    failed Slack send) releases the key so a retry runs again. A call that
+    arrives while the first is still running waits for it and returns None
+    if it does not finish in time.
+    """
+    if not key:
+        return func()
+
+    slot = f'{namespace}:{key}'
+    while not _backend.add(slot, IDEMPOTENCY_TTL_SECONDS):
+        entry = _wait(slot)
+        if entry is _TIMED_OUT:
+            return None
+        if entry is not None:
+            return entry['value']
+        # The first call released its key - try to take it over
+
+    try:
+        result = func()
+    except Exception:
+        _backend.delete(slot)
+        raise
+
+    if keep is not None and not keep(result):
+        _backend.delete(slot)
+    else:
+        _backend.set(slot, result, IDEMPOTENCY_TTL_SECONDS)
+    return result
+
+def _fingerprint():
+    return hashlib.sha256(request.get_data()).hexdigest()
+
+def _serialize(response, fingerprint):
+    response.direct_passthrough = False
+    return {
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'headers': [[name, value] for name, value in response.headers.items() if name not in _SKIPPED_HEADERS],
+        'body': base64.b64encode(response.get_data()).decode('ascii')
+    }
+
+def _restore(stored, replayed):
+    response = Response(base64.b64decode(stored['body']), status=stored['status'], headers=stored['headers'])
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(scope, replayable=None, on_replay=None):
+    """Decorate a view so requests carrying an Idempotency-Key run once per key.
+
+    The stored response is replayed for the same key and body; the same key
+    with a different body gets a 422. replayable(response) returning False
+    (or any 4xx/5xx status) stores nothing, so a retry runs the view again.
+    Stored responses never carry Set-Cookie, so on_replay() is called before
+    a replay to re-apply any session changes the original request made.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request_key()
+            if key is None:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({
+                    'success': False,
+                    'message': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'
+                }), 400
+
+            fingerprint = _fingerprint()
+            ran = []
+
+            def run():
+                ran.append(True)
+                return _serialize(make_response(view(*args, **kwargs)), fingerprint)
+
+            def keep(stored):
+                if stored['status'] >= 400:
+                    return False
+                return replayable is None or bool(replayable(_restore(stored, False)))
+
+            stored = once(f'response:{scope}', key, run, keep)
+            if stored is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'A request with this Idempotency-Key is still in progress'
+                }), 409
+            if stored['fingerprint'] != fingerprint:
+                return jsonify({
+                    'success': False,
+                    'message': 'Idempotency-Key was already used with a different request body'
+                }), 422
+
+            if not ran and on_replay is not None:
+                on_replay()
+            return _restore(stored, replayed=not ran)
+        return wrapper
+    return decorator
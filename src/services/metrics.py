@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+
+from flask import g, request
+
+# In-process metrics in the Prometheus text format.
+#
+# Counters and histograms are plain dicts behind one lock per metric, so
+# recording costs a dict lookup and an add. Counters and gauges can also be
+# callbacks that read existing state (queue depth, outbox counts) only when
+# scraped.
+
+# Latency bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Quantiles estimated from histogram buckets and exposed as <name>_quantile
+QUANTILES = (0.5, 0.95, 0.99)
+
+PROCESS_START_TIME = time.time()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination, or a callback returning {labels: value} at scrape time"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        if self.callback is not None:
+            try:
+                values = list(self.callback().items())
+            except Exception as e:
+                return [f'# {self.name} unavailable: {_escape(e)}']
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in values]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = 'gauge'
+
+    def set(self, value, labels=()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """Bucketed observations per label combination, with quantile estimates"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (last is +Inf)..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, labels=()):
+        """Context manager that observes the elapsed seconds"""
+        return _Timer(self, labels)
+
+    def quantile(self, q, labels=()):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        with self._lock:
+            series = list(self._series.get(labels, ()))
+        return self._quantile(q, series)
+
+    def _quantile(self, q, series):
+        if not series or not series[-1]:
+            return None
+        rank = q * series[-1]
+        cumulative = 0
+        for index, count in enumerate(series[:len(self.buckets) + 1]):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    # Beyond the last bound - the best estimate is that bound
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self):
+        with self._lock:
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+        lines = []
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", _number(float(bound)))])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}')
+
+        quantile_lines = []
+        for labels, series in snapshot:
+            for q in QUANTILES:
+                estimate = self._quantile(q, series)
+                if estimate is not None:
+                    quantile_lines.append(f'{self.name}_quantile{_labels(self.labelnames, labels, [("quantile", q)])} {_number(float(estimate))}')
+        if quantile_lines:
+            lines.append(f'# HELP {self.name}_quantile {self.help} (estimated p50/p95/p99)')
+            lines.append(f'# TYPE {self.name}_quantile gauge')
+            lines.extend(quantile_lines)
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, self.labels)
+        return False
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+def _register(metric):
+    with _registry_lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            return existing
+        _registry[metric.name] = metric
+        return metric
+
+def counter(name, help_text, labelnames=(), callback=None):
+    return _register(Counter(name, help_text, labelnames, callback))
+
+def gauge(name, help_text, labelnames=(), callback=None):
+    return _register(Gauge(name, help_text, labelnames, callback))
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help_text, labelnames, buckets))
+
+def render():
+    """All registered metrics in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Request instrumentation shared by every blueprint
+http_request_duration = histogram(
+    'http_request_duration_seconds',
+    'Time to build the response, by route',
+    ('endpoint', 'method')
+)
+http_requests = counter('http_requests_total', 'Responses by route and status', ('endpoint', 'method', 'status'))
+first_request_duration = gauge(
+    'http_first_request_duration_seconds',
+    'Duration of the first request this process served (cold start)',
+    ('endpoint',)
+)
+gauge('process_start_time_seconds', 'Start time of the process since the Unix epoch', callback=lambda: {(): PROCESS_START_TIME})
+
+_first_request_seen = False
+
+def _before_request():
+    g._metrics_started = time.perf_counter()
+
+def _after_request(response):
+    global _first_request_seen
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or 'unmatched'
+    http_request_duration.observe(elapsed, (endpoint, request.method))
+    http_requests.inc((endpoint, request.method, str(response.status_code)))
+    if not _first_request_seen:
+        _first_request_seen = True
+        first_request_duration.set(elapsed, (endpoint,))
+    return response
+
+def instrument_app(app):
+    """Time every request the app serves (streamed bodies are timed until the response starts)"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
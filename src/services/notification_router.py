@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from services import slack_delivery
+
+logger = logging.getLogger(__name__)
+
+# Routes Slack notifications to one or more webhooks by event and dealership.
+#
+# Rules come from NOTIFICATION_ROUTES (JSON) or the file at
+# NOTIFICATION_ROUTES_PATH, e.g.
+#
+#   {
+#     "destinations": {"ops": "env:SLACK_OPS_WEBHOOK", "gta": "https://hooks.slack.com/..."},
+#     "regions": {"gta": ["markham_honda", "scarborough_toyota"]},
+#     "routes": [
+#       {"events": ["checkin"], "destinations": ["ops"]},
+#       {"events": ["report"], "regions": ["gta"], "destinations": ["gta"]},
+#       {"events": "*", "dealerships": ["markham_honda"], "destinations": ["ops", "gta"]}
+#     ]
+#   }
+#
+# Rules are compiled once into an event -> dealership -> destinations table.
+# Every matching rule contributes its destinations; anything that matches no
+# rule goes to SLACK_WEBHOOK_URL. Each destination gets its own outbox
+# message, so one slow or failing webhook is retried and dead-lettered on its
+# own without delaying the others. With inline delivery the destinations are
+# posted side by side on a small shared pool (NOTIFICATION_FANOUT_THREADS), so
+# a webhook that hangs until its read timeout doesn't hold back the rest.
+
+FANOUT_THREADS = max(1, int(os.environ.get('NOTIFICATION_FANOUT_THREADS', '4')))
+
+EVENTS = ('checkin', 'checkin_digest', 'report', 'leaderboard')
+WILDCARD = '*'
+DEFAULT_DESTINATION = 'default'
+
+Destination = namedtuple('Destination', ['name', 'url'])
+
+
+class RoutingError(ValueError):
+    """Invalid routing configuration"""
+
+
+def _resolve_url(name, value):
+    """Destination URLs may be given directly or as env:VARIABLE to keep secrets out of the rules"""
+    if not isinstance(value, str) or not value:
+        raise RoutingError(f'destination {name!r} needs a webhook URL')
+    if value.startswith('env:'):
+        return os.environ.get(value[4:]) or None
+    return value
+
+def _as_list(value, field):
+    if value is None:
+        return []
+    if value == WILDCARD:
+        return [WILDCARD]
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list):
+        raise RoutingError(f'{field} must be a list')
+    return value
+
+
+class Router:
+    """Precompiled lookup from (event, dealership id) to webhook destinations"""
+
+    def __init__(self, config=None, default_url=None):
+        config = config or {}
+        self.default = (Destination(DEFAULT_DESTINATION, default_url),) if default_url else ()
+
+        destinations = {}
+        for name, value in (config.get('destinations') or {}).items():
+            url = _resolve_url(name, value)
+            if url:
+                destinations[name] = Destination(name, url)
+            else:
+                logger.warning("Notification destination has no webhook URL - skipped", extra={'destination': name})
+
+        regions = config.get('regions') or {}
+
+        # event (or *) -> dealership id (or *) -> ordered destination names
+        table = {}
+        for index, rule in enumerate(config.get('routes') or []):
+            if not isinstance(rule, dict):
+                raise RoutingError(f'route {index} must be an object')
+            events = _as_list(rule.get('events', WILDCARD), f'route {index} events')
+            unknown_events = set(events) - set(EVENTS) - {WILDCARD}
+            if unknown_events:
+                raise RoutingError(f"route {index} has unknown event(s): {', '.join(sorted(unknown_events))}")
+
+            dealerships = list(_as_list(rule.get('dealerships'), f'route {index} dealerships'))
+            for region in _as_list(rule.get('regions'), f'route {index} regions'):
+                if region not in regions:
+                    raise RoutingError(f'route {index} refers to unknown region {region!r}')
+                dealerships.extend(regions[region])
+            if not dealerships:
+                dealerships = [WILDCARD]
+
+            names = _as_list(rule.get('destinations'), f'route {index} destinations')
+            if not names:
+                raise RoutingError(f'route {index} has no destinations')
+            for name in names:
+                if name not in (config.get('destinations') or {}):
+                    raise RoutingError(f'route {index} refers to unknown destination {name!r}')
+
+            for event in events:
+                by_dealership = table.setdefault(event, {})
+                for dealership in dealerships:
+                    targets = by_dealership.setdefault(dealership, [])
+                    targets.extend(name for name in names if name in destinations and name not in targets)
+
+        self._table = table
+        # Dealership ids named by some rule; any other id resolves like None
+        self._dealerships = {
+            dealership for by_dealership in table.values() for dealership in by_dealership if dealership != WILDCARD
+        }
+        self._destinations = destinations
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def destinations(self, event, dealership_id=None):
+        """Destinations for an event, most specific rules first; SLACK_WEBHOOK_URL when nothing matches"""
+        # Ids come from request bodies - only memoize ones the rules know about
+        if not isinstance(dealership_id, (str, int)) or dealership_id not in self._dealerships:
+            dealership_id = None
+        key = (event, dealership_id)
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            return resolved
+
+        names = []
+        for event_key in (event, WILDCARD):
+            by_dealership = self._table.get(event_key)
+            if not by_dealership:
+                continue
+            for dealership_key in (dealership_id, WILDCARD):
+                for name in by_dealership.get(dealership_key, ()):
+                    if name not in names:
+                        names.append(name)
+
+        resolved = tuple(self._destinations[name] for name in names) or self.default
+        with self._lock:
+            self._resolved[key] = resolved
+        return resolved
+
+
+def _load_config():
+    text = os.environ.get('NOTIFICATION_ROUTES')
+    path = os.environ.get('NOTIFICATION_ROUTES_PATH')
+    if not text and path:
+        with open(path, 'r', encoding='utf-8') as file:
+            text = file.read()
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise RoutingError(f'notification routes are not valid JSON: {e}')
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_router():
+    """The process-wide router, compiled from the environment on first use"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = Router(_load_config(), os.environ.get('SLACK_WEBHOOK_URL'))
+    return _router
+
+def set_router(router):
+    """Replace the process-wide router (None recompiles from the environment on next use)"""
+    global _router
+    _router = router
+
+def is_configured(event, dealership_id=None):
+    """Whether an event has anywhere to go"""
+    return bool(get_router().destinations(event, dealership_id))
+
+_fanout_executor = None
+_fanout_lock = threading.Lock()
+
+def _get_fanout_executor():
+    """Pool for posting inline destinations side by side, created on first use"""
+    global _fanout_executor
+    if _fanout_executor is None:
+        with _fanout_lock:
+            if _fanout_executor is None:
+                _fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_THREADS, thread_name_prefix='fanout')
+    return _fanout_executor
+
+def _send(destination, payload, kind, description, inline):
+    delivery_id = slack_delivery.enqueue(
+        destination.url,
+        payload,
+        kind=kind,
+        description=f"{description} -> {destination.name}" if description else destination.name
+    )
+    delivered = False
+    if inline and delivery_id is not None:
+        delivered = (slack_delivery.get_delivery(delivery_id) or {}).get('status') == 'delivered'
+    return {
+        'destination': destination.name,
+        'delivery_id': delivery_id,
+        'queued': delivery_id is not None,
+        'delivered': delivered
+    }
+
+def fan_out(event, message, dealership_id=None, kind=None, description=''):
+    """Queue one outbox message per destination of an event.
+
+    message is a Block Kit dict or a pre-serialized JSON string. Returns a
+    list of {'destination', 'delivery_id', 'queued', 'delivered'} in
+    destination order; empty when the event has no destinations. delivered
+    is only ever true when delivery is inline, since queued messages are
+    posted after this returns. Inline destinations are posted concurrently
+    and joined, so the call takes as long as the slowest webhook.
+    """
+    destinations = get_router().destinations(event, dealership_id)
+    if not destinations:
+        return []
+
+    payload = message if isinstance(message, str) else json.dumps(message)
+    inline = slack_delivery.delivers_inline()
+    if not inline or len(destinations) == 1:
+        return [_send(destination, payload, kind or event, description, inline) for destination in destinations]
+
+    executor = _get_fanout_executor()
+    futures = [
+        executor.submit(_send, destination, payload, kind or event, description, inline)
+        for destination in destinations
+    ]
+    return [future.result() for future in futures]
+
+def first_delivery_id(deliveries):
+    """Delivery id of the first queued destination (the single id older clients expect)"""
+    return next((delivery['delivery_id'] for delivery in deliveries if delivery['queued']), None)
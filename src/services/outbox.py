@@ -0,0 +1,223 @@
+import os
+import time
+
+from services import sqlite_db
+
+# Durable store for rendered Slack payloads awaiting delivery
+OUTBOX_DB_PATH = os.environ.get('OUTBOX_DB_PATH') or sqlite_db.default_path('activity_logger_outbox.sqlite3')
+
+# Messages stuck in 'sending' this long (e.g. the process died) are retried
+STALE_SENDING_SECONDS = 300
+# Delivered messages are kept this long for status polling
+DELIVERED_RETENTION_SECONDS = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    description TEXT,
+    webhook_url TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    description TEXT,
+    webhook_url TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    dead_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS digest_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    digest TEXT NOT NULL,
+    event TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_digest_events ON digest_events (digest, id);
+"""
+
+_COLUMNS = 'id, kind, description, webhook_url, payload, status, attempts, next_attempt_at, last_error, created_at, updated_at'
+_DEAD_COLUMNS = 'id, kind, description, webhook_url, payload, attempts, last_error, created_at, dead_at'
+
+def _db():
+    return sqlite_db.get_connection(OUTBOX_DB_PATH, _SCHEMA)
+
+def add(message_id, kind, description, webhook_url, payload):
+    """Persist a rendered payload before it is sent"""
+    now = time.time()
+    _db().execute(
+        f"INSERT INTO outbox ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, 'pending', 0, ?, NULL, ?, ?)",
+        (message_id, kind, description, webhook_url, payload, now, now, now)
+    )
+
+def claim(message_id):
+    """Mark a due message as being sent; returns the row, or None if it is not due or another worker owns it"""
+    now = time.time()
+    db = _db()
+    cursor = db.execute(
+        """UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated_at = ?
+           WHERE id = ? AND ((status IN ('pending', 'retrying') AND next_attempt_at <= ?)
+                             OR (status = 'sending' AND updated_at < ?))""",
+        (now, message_id, now, now - STALE_SENDING_SECONDS)
+    )
+    if cursor.rowcount != 1:
+        return None
+    return db.execute(f"SELECT {_COLUMNS} FROM outbox WHERE id = ?", (message_id,)).fetchone()
+
+def mark_delivered(message_id):
+    """Record a successful delivery"""
+    now = time.time()
+    _db().execute(
+        "UPDATE outbox SET status = 'delivered', last_error = NULL, updated_at = ? WHERE id = ?",
+        (now, message_id)
+    )
+
+def schedule_retry(message_id, error, delay):
+    """Put a failed message back in line after a backoff delay"""
+    now = time.time()
+    _db().execute(
+        "UPDATE outbox SET status = 'retrying', last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+        (error, now + delay, now, message_id)
+    )
+
+def move_to_dead_letter(message_id, error):
+    """Move a message that keeps failing out of the outbox"""
+    now = time.time()
+    db = _db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        db.execute(
+            f"""INSERT OR REPLACE INTO dead_letters ({_DEAD_COLUMNS})
+                SELECT id, kind, description, webhook_url, payload, attempts, ?, created_at, ?
+                FROM outbox WHERE id = ?""",
+            (error, now, message_id)
+        )
+        db.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+        db.execute('COMMIT')
+    except Exception:
+        db.execute('ROLLBACK')
+        raise
+
+def replay(message_id):
+    """Move a dead letter back into the outbox with a fresh attempt budget"""
+    now = time.time()
+    db = _db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        cursor = db.execute(
+            f"""INSERT INTO outbox ({_COLUMNS})
+                SELECT id, kind, description, webhook_url, payload, 'pending', 0, ?, last_error, created_at, ?
+                FROM dead_letters WHERE id = ?""",
+            (now, now, message_id)
+        )
+        db.execute("DELETE FROM dead_letters WHERE id = ?", (message_id,))
+        db.execute('COMMIT')
+    except Exception:
+        db.execute('ROLLBACK')
+        raise
+    return cursor.rowcount == 1
+
+def due(limit=100):
+    """Get ids of messages whose next attempt is due"""
+    now = time.time()
+    rows = _db().execute(
+        """SELECT id FROM outbox
+           WHERE (status IN ('pending', 'retrying') AND next_attempt_at <= ?)
+              OR (status = 'sending' AND updated_at < ?)
+           ORDER BY next_attempt_at LIMIT ?""",
+        (now, now - STALE_SENDING_SECONDS, limit)
+    ).fetchall()
+    return [row['id'] for row in rows]
+
+def get(message_id):
+    """Get a message from the outbox or the dead-letter table"""
+    db = _db()
+    row = db.execute(f"SELECT {_COLUMNS} FROM outbox WHERE id = ?", (message_id,)).fetchone()
+    if row:
+        return dict(row)
+    row = db.execute(f"SELECT {_DEAD_COLUMNS} FROM dead_letters WHERE id = ?", (message_id,)).fetchone()
+    if row:
+        return dict(row, status='dead')
+    return None
+
+def list_messages(status=None, limit=50):
+    """List outbox messages, newest first; status 'dead' lists the dead-letter table"""
+    db = _db()
+    if status == 'dead':
+        rows = db.execute(
+            f"SELECT {_DEAD_COLUMNS} FROM dead_letters ORDER BY dead_at DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [dict(row, status='dead') for row in rows]
+
+    if status:
+        rows = db.execute(
+            f"SELECT {_COLUMNS} FROM outbox WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+            (status, limit)
+        ).fetchall()
+    else:
+        rows = db.execute(
+            f"SELECT {_COLUMNS} FROM outbox ORDER BY created_at DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def counts():
+    """Count messages by status"""
+    db = _db()
+    result = {row['status']: row['total'] for row in db.execute(
+        "SELECT status, COUNT(*) AS total FROM outbox GROUP BY status"
+    )}
+    result['dead'] = db.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+    return result
+
+def prune_delivered():
+    """Drop delivered messages past the retention window"""
+    cutoff = time.time() - DELIVERED_RETENTION_SECONDS
+    _db().execute("DELETE FROM outbox WHERE status = 'delivered' AND updated_at < ?", (cutoff,))
+
+def add_digest_event(digest, event):
+    """Persist a serialized event waiting for its digest; returns (pending count, oldest created_at)"""
+    db = _db()
+    db.execute(
+        "INSERT INTO digest_events (digest, event, created_at) VALUES (?, ?, ?)",
+        (digest, event, time.time())
+    )
+    return digest_backlog(digest)
+
+def digest_backlog(digest):
+    """(pending count, oldest created_at or None) of a digest's buffered events"""
+    row = _db().execute(
+        "SELECT COUNT(*) AS total, MIN(created_at) AS oldest FROM digest_events WHERE digest = ?",
+        (digest,)
+    ).fetchone()
+    return row['total'], row['oldest']
+
+def take_digest_events(digest):
+    """Remove and return a digest's buffered events (serialized), oldest first"""
+    db = _db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        rows = db.execute(
+            "SELECT id, event FROM digest_events WHERE digest = ? ORDER BY id",
+            (digest,)
+        ).fetchall()
+        if rows:
+            db.execute("DELETE FROM digest_events WHERE digest = ? AND id <= ?", (digest, rows[-1]['id']))
+        db.execute('COMMIT')
+    except Exception:
+        db.execute('ROLLBACK')
+        raise
+    return [row['event'] for row in rows]
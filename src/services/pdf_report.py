@@ -0,0 +1,246 @@
+import zlib
+from functools import lru_cache
+
+from services import scoring
+
+# Minimal PDF 1.4 writer for the daily activity log.
+#
+# Everything that is the same for every report - fonts, the header and
+# summary labels, the table grid - is compiled once per process into form
+# XObjects. A request only renders the values for its own rows.
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 40
+ROWS_PER_PAGE = 16
+ROW_HEIGHT = 18
+HEADER_TOP = 662
+HEADER_BOTTOM = 640
+TABLE_BOTTOM = HEADER_BOTTOM - ROWS_PER_PAGE * ROW_HEIGHT
+
+# (heading lines, left x, right x) - the metric columns follow METRIC_KEYS order
+COLUMNS = (
+    (('Hour',), 40, 72),
+    (('Activity',), 72, 262),
+    (('Quote', 'Calls'), 262, 296),
+    (('Appts', 'Gen.'), 296, 330),
+    (('In-', 'Person'), 330, 364),
+    (('Phone', 'Appts'), 364, 398),
+    (('Cars', 'Sold'), 398, 432),
+    (('Cars', 'Deliv.'), 432, 466),
+    (('Ads', 'Posted'), 466, 500),
+    (('Score',), 500, 538),
+    (('Rating',), 538, 572)
+)
+CELL_PADDING = 4
+
+SUMMARY_LABELS = tuple(f"Total {key.replace('_', ' ').title()}" for key in scoring.METRIC_KEYS) + ('Total Score',)
+SUMMARY_TOP = TABLE_BOTTOM - 27
+SUMMARY_LINE = 15
+# (label x, value right edge) for the two summary columns
+SUMMARY_COLUMNS = ((40, 270), (320, 572))
+
+FONTS = (('F1', 'Helvetica'), ('F2', 'Helvetica-Bold'), ('F3', 'ZapfDingbats'))
+# ZapfDingbats code for a filled star
+STAR = b'H'
+
+# Helvetica advance widths (1/1000 em) for printable ASCII; anything else uses the default
+_HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584
+)
+_DEFAULT_WIDTH = 556
+_WIDTHS = {code: width for code, width in enumerate(_HELVETICA_WIDTHS, 32)}
+
+# Object numbers: static objects first, then the per-document ones
+_FONT_OBJECTS = {name: number for number, (name, _) in enumerate(FONTS, 3)}
+_FONT_RESOURCES = 6
+_PAGE_RESOURCES = 7
+_PAGE_TEMPLATE = 8
+_SUMMARY_TEMPLATE = 9
+_CATALOG = 1
+_PAGES = 2
+_INFO = 10
+_FIRST_PAGE = 11
+
+def text_width(text, size):
+    """Width in points of Helvetica text"""
+    return sum(_WIDTHS.get(ord(char), _DEFAULT_WIDTH) for char in text) * size / 1000
+
+def fit_text(text, size, width):
+    """Truncate text with '...' so it fits in width points"""
+    text = ' '.join(str(text).split())
+    if text_width(text, size) <= width:
+        return text
+    limit = width - text_width('...', size)
+    used = 0
+    for i, char in enumerate(text):
+        used += _WIDTHS.get(ord(char), _DEFAULT_WIDTH) * size / 1000
+        if used > limit:
+            return text[:i].rstrip() + '...'
+    return text
+
+def _pdf_string(text):
+    """Encode text as a PDF literal string (WinAnsi, unsupported characters become '?')"""
+    raw = text.encode('cp1252', errors='replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+def _text(font, size, x, y, text):
+    return b'BT /%s %d Tf %.2f %.2f Td %s Tj ET\n' % (font.encode(), size, x, y, _pdf_string(text))
+
+def _text_right(font, size, right, y, text):
+    return _text(font, size, right - text_width(text, size), y, text)
+
+def _stream_object(number, content, extra=b''):
+    # Page streams are a few KB, so a small window keeps zlib's working memory low
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 12, 4)
+    data = compressor.compress(content) + compressor.flush()
+    return (b'%d 0 obj\n<< %s/Length %d /Filter /FlateDecode >>\nstream\n' % (number, extra, len(data)) +
+            data + b'\nendstream\nendobj\n')
+
+def _object(number, body):
+    return b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+def _page_template():
+    """Title, header labels and the empty table grid"""
+    ops = [
+        _text('F2', 18, MARGIN, 748, 'Daily Activity Log'),
+        _text('F2', 10, MARGIN, 720, 'Name:'),
+        _text('F2', 10, MARGIN, 705, 'Date:'),
+        _text('F2', 10, MARGIN, 690, 'Location:'),
+        _text('F2', 10, MARGIN, 675, 'Check-in:'),
+        _text('F2', 10, 330, 720, 'Generated:'),
+        # Shaded heading row
+        b'0.9 g %d %d %d %d re f 0 g\n' % (MARGIN, HEADER_BOTTOM, COLUMNS[-1][2] - MARGIN, HEADER_TOP - HEADER_BOTTOM),
+        b'0.5 w\n'
+    ]
+    for lines, left, right in COLUMNS:
+        y = HEADER_BOTTOM + 13 if len(lines) == 1 else HEADER_BOTTOM + 16
+        for line in lines:
+            ops.append(_text('F2', 7, left + (right - left - text_width(line, 7)) / 2, y, line))
+            y -= 9
+
+    # Horizontal rules, then column separators
+    for y in [HEADER_TOP, HEADER_BOTTOM] + [HEADER_BOTTOM - ROW_HEIGHT * row for row in range(1, ROWS_PER_PAGE + 1)]:
+        ops.append(b'%d %d m %d %d l S\n' % (MARGIN, y, COLUMNS[-1][2], y))
+    for x in [left for _, left, _ in COLUMNS] + [COLUMNS[-1][2]]:
+        ops.append(b'%d %d m %d %d l S\n' % (x, HEADER_TOP, x, TABLE_BOTTOM))
+    return b''.join(ops)
+
+def _summary_template():
+    """Daily summary heading and labels, drawn on the last page only"""
+    ops = [_text('F2', 12, MARGIN, SUMMARY_TOP + 20, 'Daily Summary')]
+    per_column = (len(SUMMARY_LABELS) + 1) // 2
+    for i, label in enumerate(SUMMARY_LABELS):
+        (label_x, _), row = SUMMARY_COLUMNS[i // per_column], i % per_column
+        ops.append(_text('F2' if label == 'Total Score' else 'F1', 10, label_x, SUMMARY_TOP - row * SUMMARY_LINE, label + ':'))
+    return b''.join(ops)
+
+@lru_cache(maxsize=1)
+def _static_part():
+    """Header plus the static objects, compiled once; returns (bytes, {object number: offset})"""
+    parts = [b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n']
+    offsets = {}
+    position = [len(parts[0])]
+
+    def add(number, data):
+        offsets[number] = position[0]
+        position[0] += len(data)
+        parts.append(data)
+
+    for name, base_font in FONTS:
+        encoding = b'' if base_font == 'ZapfDingbats' else b' /Encoding /WinAnsiEncoding'
+        add(_FONT_OBJECTS[name], _object(_FONT_OBJECTS[name], b'<< /Type /Font /Subtype /Type1 /BaseFont /%s%s >>' % (base_font.encode(), encoding)))
+
+    fonts = b' '.join(b'/%s %d 0 R' % (name.encode(), number) for name, number in _FONT_OBJECTS.items())
+    add(_FONT_RESOURCES, _object(_FONT_RESOURCES, b'<< /Font << %s >> >>' % fonts))
+    add(_PAGE_RESOURCES, _object(_PAGE_RESOURCES, b'<< /Font << %s >> /XObject << /Tpl %d 0 R /Sum %d 0 R >> >>' % (fonts, _PAGE_TEMPLATE, _SUMMARY_TEMPLATE)))
+
+    form = b'/Type /XObject /Subtype /Form /BBox [0 0 %d %d] /Resources %d 0 R ' % (PAGE_WIDTH, PAGE_HEIGHT, _FONT_RESOURCES)
+    add(_PAGE_TEMPLATE, _stream_object(_PAGE_TEMPLATE, _page_template(), form))
+    add(_SUMMARY_TEMPLATE, _stream_object(_SUMMARY_TEMPLATE, _summary_template(), form))
+    return b''.join(parts), offsets
+
+def _row_ops(hour, activity, metrics, score, rating, y):
+    ops = [_text_right('F1', 9, COLUMNS[0][2] - CELL_PADDING, y, str(hour))]
+    _, left, right = COLUMNS[1]
+    ops.append(_text('F1', 9, left + CELL_PADDING, y, fit_text(activity.get('description', ''), 9, right - left - 2 * CELL_PADDING)))
+    for value, (_, _, right) in zip(metrics, COLUMNS[2:9]):
+        ops.append(_text_right('F1', 9, right - CELL_PADDING, y, str(value)))
+    ops.append(_text_right('F2', 9, COLUMNS[9][2] - CELL_PADDING, y, str(score)))
+    ops.append(b'BT /F3 7 Tf %.2f %.2f Td (%s) Tj ET\n' % (COLUMNS[10][1] + CELL_PADDING, y + 0.5, STAR * rating))
+    return ops
+
+def _page_content(page, page_count, header, rows, summary):
+    ops = [b'q /Tpl Do Q\n']
+    for (x, y), value in zip(((100, 720), (100, 705), (100, 690), (100, 675), (395, 720)), header):
+        ops.append(_text('F1', 10, x, y, fit_text(value, 10, (325 if x == 100 else COLUMNS[-1][2]) - x)))
+
+    y = HEADER_BOTTOM - ROW_HEIGHT + 6
+    for row in rows:
+        ops.extend(_row_ops(*row, y))
+        y -= ROW_HEIGHT
+
+    if summary is not None:
+        ops.append(b'q /Sum Do Q\n')
+        per_column = (len(summary) + 1) // 2
+        for i, value in enumerate(summary):
+            (_, value_right), line = SUMMARY_COLUMNS[i // per_column], i % per_column
+            ops.append(_text_right('F2' if i == len(summary) - 1 else 'F1', 10, value_right, SUMMARY_TOP - line * SUMMARY_LINE, str(value)))
+
+    ops.append(_text_right('F1', 8, COLUMNS[-1][2], 24, f'Page {page} of {page_count}'))
+    return b''.join(ops)
+
+def render_activity_pdf(name, activities, scores, dealership_name, checkin_time, local_time):
+    """Render a day's activity log as PDF bytes"""
+    static, static_offsets = _static_part()
+    parts = [static]
+    offsets = dict(static_offsets)
+    position = [len(static)]
+
+    def add(number, data):
+        offsets[number] = position[0]
+        position[0] += len(data)
+        parts.append(data)
+
+    matrix = scoring.activity_matrix(activities)
+    rows = [
+        (hour + 1, activity, matrix[hour], scores.hour_scores[hour], scores.ratings[hour])
+        for hour, activity in enumerate(activities)
+    ]
+    pages = [rows[i:i + ROWS_PER_PAGE] for i in range(0, len(rows), ROWS_PER_PAGE)] or [[]]
+    header = (
+        name,
+        local_time.strftime('%Y-%m-%d'),
+        dealership_name or 'Unknown Location',
+        f'{checkin_time} Eastern' if checkin_time else 'Not checked in',
+        local_time.strftime('%H:%M:%S') + ' Eastern'
+    )
+    summary = tuple(scores.totals) + (scores.total_score,)
+
+    page_numbers = []
+    for index, page_rows in enumerate(pages):
+        page_number = _FIRST_PAGE + index * 2
+        page_numbers.append(page_number)
+        add(page_number, _object(page_number, b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %d 0 R /Contents %d 0 R >>' % (
+            _PAGES, PAGE_WIDTH, PAGE_HEIGHT, _PAGE_RESOURCES, page_number + 1)))
+        content = _page_content(index + 1, len(pages), header, page_rows, summary if index == len(pages) - 1 else None)
+        add(page_number + 1, _stream_object(page_number + 1, content))
+
+    kids = b' '.join(b'%d 0 R' % number for number in page_numbers)
+    add(_PAGES, _object(_PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(pages))))
+    add(_CATALOG, _object(_CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % _PAGES))
+    add(_INFO, _object(_INFO, b'<< /Title %s /Producer (Activity Logger) /CreationDate (D:%s) >>' % (
+        _pdf_string(f'Daily Activity Log - {name}'), local_time.strftime('%Y%m%d%H%M%S').encode())))
+
+    size = max(offsets) + 1
+    xref_offset = position[0]
+    xref = [b'xref\n0 %d\n0000000000 65535 f \n' % size]
+    xref.extend(b'%010d 00000 n \n' % offsets[number] for number in range(1, size))
+    xref.append(b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, _CATALOG, _INFO, xref_offset))
+    parts.extend(xref)
+    return b''.join(parts)
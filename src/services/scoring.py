@@ -0,0 +1,139 @@
+import hashlib
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+from operator import mul
+
+# Metric order used for every score vector
+METRIC_KEYS = (
+    'quote_calls',
+    'appointments_generated',
+    'in_person_appointments',
+    'phone_appointments',
+    'cars_sold',
+    'cars_delivered',
+    'advertisements_posted'
+)
+
+# Weights: Cars Sold (10), Cars Delivered (8), In-Person Appointments (4),
+# Phone Appointments (3), Appointments Generated (2), Quote Calls (1), Advertisements Posted (1)
+WEIGHTS = (1, 2, 4, 3, 10, 8, 1)
+
+# Minimum score for each star rating, highest first; anything lower is 1 star
+RATING_THRESHOLDS = ((20, 5), (15, 4), (10, 3), (5, 2))
+MIN_RATING = 1
+
+# Metric counts sent as strings must be whole numbers; the browser tests the
+# same pattern, so both sides reject "1.5" or "abc" instead of reading 1 and 0
+METRIC_PATTERN = r'[ \t\r\n]*[+-]?[0-9]+[ \t\r\n]*'
+_METRIC_RE = re.compile(METRIC_PATTERN)
+
+# Everything the browser needs to score an hour exactly like the server does
+SCORING_DEFINITION = {
+    'metric_keys': list(METRIC_KEYS),
+    'weights': list(WEIGHTS),
+    'rating_thresholds': [list(pair) for pair in RATING_THRESHOLDS],
+    'min_rating': MIN_RATING,
+    'metric_pattern': METRIC_PATTERN
+}
+# Changes whenever the weights, thresholds or metric syntax change; submissions scored under
+# another version are rejected
+SCORING_VERSION = hashlib.sha256(json.dumps(SCORING_DEFINITION, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+# Distinct hourly metric vectors kept in the rating cache - small counts only
+# make a few thousand combinations in practice
+RATING_CACHE_SIZE = 8192
+
+# Scores for a day of activities - one entry per hour in hour_scores/ratings,
+# one entry per METRIC_KEYS metric in totals
+ScoreCard = namedtuple('ScoreCard', ['hour_scores', 'ratings', 'totals', 'total_score'])
+
+def parse_metric(value):
+    """Parse a metric count, treating missing/blank values as 0 and rejecting non-integer strings"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, str) and not _METRIC_RE.fullmatch(value):
+        raise ValueError(f'invalid metric value {value!r}')
+    return int(value)
+
+def activity_vector(activity):
+    """Convert one hour of activity into a metric vector in METRIC_KEYS order"""
+    return tuple(parse_metric(activity.get(key, 0)) for key in METRIC_KEYS)
+
+def activity_matrix(activities):
+    """Convert a day of activities into an hours x metrics matrix"""
+    return tuple(activity_vector(activity) for activity in activities)
+
+def score_vector(vector):
+    """Weighted score of one metric vector"""
+    return sum(map(mul, vector, WEIGHTS))
+
+def rating_for_score(score):
+    """Star rating (1-5) for an hourly score"""
+    for threshold, rating in RATING_THRESHOLDS:
+        if score >= threshold:
+            return rating
+    return MIN_RATING
+
+@lru_cache(maxsize=RATING_CACHE_SIZE)
+def rate_vector(vector):
+    """(score, star rating) for one hour's metric vector"""
+    score = score_vector(vector)
+    return score, rating_for_score(score)
+
+def score_matrix(matrix):
+    """Score every hour of a metrics matrix in one pass"""
+    hour_scores = tuple(score_vector(row) for row in matrix)
+    ratings = tuple(rating_for_score(score) for score in hour_scores)
+    if matrix:
+        totals = tuple(sum(column) for column in zip(*matrix))
+    else:
+        totals = (0,) * len(METRIC_KEYS)
+    return ScoreCard(hour_scores, ratings, totals, sum(hour_scores))
+
+def score_activities(activities):
+    """Score a day of activities"""
+    return score_matrix(activity_matrix(activities))
+
+def totals_dict(score_card):
+    """Daily metric totals keyed by metric name"""
+    return dict(zip(METRIC_KEYS, score_card.totals))
+
+def client_module():
+    """Browser script defining window.ActivityScoring from the weight table above"""
+    definition = json.dumps(dict(SCORING_DEFINITION, version=SCORING_VERSION), separators=(',', ':'))
+    return f"""// Generated from services/scoring.py - do not edit
+(function () {{
+    const definition = {definition};
+    const metricPattern = new RegExp('^(?:' + definition.metric_pattern + ')$');
+    function parseMetric(value) {{
+        if (value === undefined || value === null || value === '') return 0;
+        if (typeof value === 'number' ? !Number.isFinite(value) : !metricPattern.test(value)) {{
+            throw new RangeError('invalid metric value ' + JSON.stringify(value));
+        }}
+        return Math.trunc(typeof value === 'number' ? value : parseInt(value, 10));
+    }}
+    function vector(metrics) {{
+        return definition.metric_keys.map(key => parseMetric(metrics[key]));
+    }}
+    function scoreVector(values) {{
+        return values.reduce((total, value, i) => total + value * definition.weights[i], 0);
+    }}
+    function ratingForScore(score) {{
+        for (const [threshold, rating] of definition.rating_thresholds) {{
+            if (score >= threshold) return rating;
+        }}
+        return definition.min_rating;
+    }}
+    window.ActivityScoring = Object.freeze({{
+        version: definition.version,
+        metricKeys: definition.metric_keys,
+        parseMetric,
+        vector,
+        scoreVector,
+        ratingForScore,
+        rate: metrics => ratingForScore(scoreVector(vector(metrics)))
+    }});
+}})();
+"""
@@ -0,0 +1,271 @@
+import email.utils
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+
+from services import metrics, outbox, webhook_client
+
+logger = logging.getLogger(__name__)
+
+# Serverless instances are frozen once the response is sent, so background
+# threads never run and /tmp outboxes vanish with the instance
+SERVERLESS = bool(os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+# Delivery queue configuration (SLACK_QUEUE_WORKERS=0 delivers inline, the default when serverless)
+QUEUE_MAXSIZE = int(os.environ.get('SLACK_QUEUE_MAXSIZE', '1000'))
+WORKER_COUNT = int(os.environ.get('SLACK_QUEUE_WORKERS', '0' if SERVERLESS else '4'))
+
+# Retry policy - jittered exponential backoff, then dead-letter
+MAX_ATTEMPTS = int(os.environ.get('SLACK_MAX_ATTEMPTS', '6'))
+BACKOFF_BASE_SECONDS = float(os.environ.get('SLACK_BACKOFF_BASE_SECONDS', '2'))
+BACKOFF_MAX_SECONDS = float(os.environ.get('SLACK_BACKOFF_MAX_SECONDS', '300'))
+REPLAY_INTERVAL_SECONDS = float(os.environ.get('SLACK_REPLAY_INTERVAL_SECONDS', '5'))
+
+_queue = queue.Queue(maxsize=QUEUE_MAXSIZE)
+_lock = threading.Lock()
+_workers = []
+# Ids waiting in _queue, so the replay loop doesn't queue a message twice
+_queued = set()
+_stats = {
+    'enqueued': 0,
+    'delivered': 0,
+    'failed': 0,
+    'retried': 0,
+    'dead_lettered': 0,
+    'deferred': 0,
+    'high_water_mark': 0
+}
+
+def _parse_retry_after(value):
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def post_to_webhook(webhook_url, payload):
+    """POST a serialized Slack payload to a webhook URL.
+
+    Returns (status_code, message, retry_after); status_code is None when
+    the request never got a response.
+    """
+    try:
+        status_code, headers, body = webhook_client.post(webhook_url, payload.encode('utf-8'))
+    except Exception as e:
+        return None, f"Error sending to Slack: {str(e)}", None
+
+    if status_code == 200:
+        return 200, "Successfully sent to Slack", None
+
+    retry_after = _parse_retry_after(headers.get('Retry-After')) if status_code == 429 else None
+    detail = body.decode('utf-8', 'replace').strip()[:200]
+    return status_code, f"Slack API error: {status_code}" + (f" ({detail})" if detail else ""), retry_after
+
+def _is_retryable(status_code):
+    """Network errors, rate limits and server errors are worth retrying"""
+    return status_code is None or status_code == 429 or status_code >= 500
+
+def backoff_delay(attempts, retry_after=None):
+    """Get the delay before the next attempt (full jitter, floored at Retry-After)"""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+def _bump(counter, amount=1):
+    with _lock:
+        _stats[counter] += amount
+
+def _deliver(message_id, retry=True):
+    """Send one outbox message and record the outcome.
+
+    With retry=False (inline delivery) a failure is dead-lettered straight
+    away: the caller reports the error and the client resubmits, so a later
+    retry of this row would post the report twice.
+    """
+    row = outbox.claim(message_id)
+    if row is None:
+        # Already delivered, dead-lettered or being sent by another worker
+        return None
+
+    status_code, result, retry_after = post_to_webhook(row['webhook_url'], row['payload'])
+
+    if status_code == 200:
+        outbox.mark_delivered(message_id)
+        _bump('delivered')
+        return True
+
+    _bump('failed')
+    attempts = row['attempts']
+    if retry and _is_retryable(status_code) and attempts < MAX_ATTEMPTS:
+        delay = backoff_delay(attempts, retry_after)
+        outbox.schedule_retry(message_id, result, delay)
+        _bump('retried')
+        logger.warning("Slack delivery failed, retrying", extra={'delivery_id': message_id, 'attempt': attempts, 'max_attempts': MAX_ATTEMPTS, 'retry_in': round(delay, 1), 'error': result})
+    else:
+        outbox.move_to_dead_letter(message_id, result)
+        _bump('dead_lettered')
+        logger.error("Slack delivery moved to dead letters", extra={'delivery_id': message_id, 'attempts': attempts, 'error': result})
+    return False
+
+def _worker():
+    """Drain the delivery queue forever"""
+    while True:
+        message_id = _queue.get()
+        with _lock:
+            _queued.discard(message_id)
+        try:
+            _deliver(message_id)
+        except Exception as e:
+            logger.exception("Slack delivery worker error")
+        finally:
+            _queue.task_done()
+
+def _dispatch(message_id):
+    """Hand a message to the worker pool, or deliver inline when there is none"""
+    if WORKER_COUNT <= 0:
+        _deliver(message_id, retry=False)
+        return True
+
+    with _lock:
+        if message_id in _queued:
+            return True
+        _queued.add(message_id)
+    try:
+        _queue.put_nowait(message_id)
+    except queue.Full:
+        with _lock:
+            _queued.discard(message_id)
+        # Already persisted - the replay loop picks it up once the queue drains
+        _bump('deferred')
+        return False
+
+    with _lock:
+        _stats['high_water_mark'] = max(_stats['high_water_mark'], _queue.qsize())
+    return True
+
+def replay_due(limit=100):
+    """Dispatch every outbox message whose next attempt is due"""
+    dispatched = 0
+    for message_id in outbox.due(limit):
+        if not _dispatch(message_id):
+            break
+        dispatched += 1
+    return dispatched
+
+def _replay_loop():
+    """Periodically retry due messages, including ones left by a previous process"""
+    while True:
+        try:
+            replay_due()
+            outbox.prune_delivered()
+        except Exception as e:
+            logger.exception("Slack outbox replay error")
+        time.sleep(REPLAY_INTERVAL_SECONDS)
+
+def _ensure_workers():
+    """Start the worker pool and replay loop on first use (neither runs for inline delivery)"""
+    if _workers or WORKER_COUNT <= 0:
+        return
+    with _lock:
+        if _workers:
+            return
+        for i in range(WORKER_COUNT):
+            thread = threading.Thread(target=_worker, name=f"slack-delivery-{i}", daemon=True)
+            thread.start()
+            _workers.append(thread)
+        thread = threading.Thread(target=_replay_loop, name="slack-outbox-replay", daemon=True)
+        thread.start()
+        _workers.append(thread)
+
+def enqueue(webhook_url, message, kind='message', description=''):
+    """Persist a Slack message to the outbox and queue it for background delivery.
+
+    message is a Block Kit dict, or a str that is already serialized JSON
+    (see services.slack_templates). Returns the delivery id, or None if the
+    message could not be stored.
+    """
+    delivery_id = uuid.uuid4().hex
+    payload = message if isinstance(message, str) else json.dumps(message)
+    try:
+        outbox.add(delivery_id, kind, description, webhook_url, payload)
+    except Exception as e:
+        logger.exception("Unable to store Slack message in outbox")
+        return None
+
+    _bump('enqueued')
+    _ensure_workers()
+    if not _dispatch(delivery_id):
+        logger.warning("Slack delivery queue full - deferred to outbox replay", extra={'queue_maxsize': QUEUE_MAXSIZE, 'kind': kind, 'delivery_id': delivery_id})
+    return delivery_id
+
+def delivers_inline():
+    """Whether enqueue() posts the message before returning (no worker pool)"""
+    return WORKER_COUNT <= 0
+
+def replay(message_id):
+    """Move a dead-lettered message back into the outbox and dispatch it"""
+    if not outbox.replay(message_id):
+        return False
+    _ensure_workers()
+    _dispatch(message_id)
+    return True
+
+def get_delivery(delivery_id):
+    """Get the public status of a delivery"""
+    message = outbox.get(delivery_id)
+    if not message:
+        return None
+    return {
+        'id': message['id'],
+        'kind': message['kind'],
+        'description': message['description'],
+        'status': message['status'],
+        'attempts': message['attempts'],
+        'last_error': message['last_error'],
+        'created_at': message['created_at'],
+        'next_attempt_at': message.get('next_attempt_at')
+    }
+
+def get_stats():
+    """Get queue depth, backpressure and outbox counters"""
+    with _lock:
+        stats = dict(_stats)
+    stats.update({
+        'queue_depth': _queue.qsize(),
+        'queue_capacity': QUEUE_MAXSIZE,
+        'workers': WORKER_COUNT
+    })
+    try:
+        stats['outbox'] = outbox.counts()
+    except Exception as e:
+        stats['outbox'] = {'error': str(e)}
+    stats['webhook_hosts'] = webhook_client.get_stats()
+    return stats
+
+def _outbox_counts():
+    return {(status,): count for status, count in outbox.counts().items()}
+
+# Scraped from the counters above rather than recorded twice
+metrics.counter(
+    'slack_delivery_events_total',
+    'Slack delivery outcomes (delivered, failed attempts, retries, dead letters, deferrals)',
+    ('event',),
+    callback=lambda: {(event,): _stats[event] for event in ('enqueued', 'delivered', 'failed', 'retried', 'dead_lettered', 'deferred')}
+)
+metrics.gauge('slack_queue_depth', 'Messages waiting in the in-memory delivery queue', callback=lambda: {(): _queue.qsize()})
+metrics.gauge('slack_queue_high_water_mark', 'Deepest the delivery queue has been', callback=lambda: {(): _stats['high_water_mark']})
+metrics.gauge('slack_outbox_messages', 'Outbox messages by status', ('status',), callback=_outbox_counts)
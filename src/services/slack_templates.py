@@ -0,0 +1,127 @@
+import json
+
+# Pre-serialized Slack Block Kit messages.
+#
+# Each message type is written once as a skeleton dict with @@slot@@ markers,
+# serialized with the same json.dumps settings the outbox used, and split into
+# static chunks. Rendering escapes only the slot values and joins the chunks,
+# so the output is byte-for-byte what json.dumps would produce for the full
+# message dict.
+
+_MARKER = '@@{}@@'
+
+
+class Blocks:
+    """Marker for a slot holding zero or more extra blocks at the end of a list"""
+
+    def __init__(self, name):
+        self.name = name
+
+
+class MessageTemplate:
+    """A serialized message with text slots inside strings and optional trailing block lists"""
+
+    def __init__(self, skeleton):
+        self.block_slots = set()
+        text = json.dumps(self._mark(skeleton))
+        # Trailing block lists are written as one quoted marker after the
+        # list's last fixed item; swallow the separator so an empty list leaves no comma
+        for name in self.block_slots:
+            text = text.replace(', "' + _MARKER.format(name) + '"', _MARKER.format(name))
+
+        self.chunks = []
+        self.slots = []
+        parts = text.split('@@')
+        for index, part in enumerate(parts):
+            if index % 2:
+                self.slots.append(part)
+            else:
+                self.chunks.append(part)
+
+    def _mark(self, value):
+        if isinstance(value, Blocks):
+            self.block_slots.add(value.name)
+            return _MARKER.format(value.name)
+        if isinstance(value, dict):
+            return {key: self._mark(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._mark(item) for item in value]
+        return value
+
+    def render(self, **values):
+        """JSON text with every slot filled; block slots take a list of block dicts"""
+        out = [self.chunks[0]]
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            value = values[slot]
+            if slot in self.block_slots:
+                out.append(''.join(', ' + json.dumps(block) for block in value))
+            else:
+                # Escaped exactly as json.dumps escapes string contents
+                out.append(json.dumps(str(value))[1:-1])
+            out.append(chunk)
+        return ''.join(out)
+
+
+def _field(text):
+    return {"type": "mrkdwn", "text": text}
+
+REPORT = MessageTemplate({
+    "text": "📊 Daily Activity Report - @@name@@",
+    "blocks": [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": "📊 Daily Activity Report - @@name@@"
+            }
+        },
+        {
+            "type": "context",
+            "elements": [_field("@@context@@")]
+        },
+        {
+            "type": "section",
+            "text": _field("*📈 Daily Summary:*")
+        },
+        {
+            "type": "section",
+            "fields": [
+                _field("*🚗 Cars Sold:* @@cars_sold@@"),
+                _field("*🚚 Cars Delivered:* @@cars_delivered@@"),
+                _field("*📞 Quote Calls:* @@quote_calls@@"),
+                _field("*📅 Appointments Generated:* @@appointments_generated@@"),
+                _field("*🤝 In-Person Appointments:* @@in_person_appointments@@"),
+                _field("*☎️ Phone Appointments:* @@phone_appointments@@")
+            ]
+        },
+        Blocks("extra_blocks")
+    ]
+})
+
+CHECKIN = MessageTemplate({
+    "blocks": [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": "🏢 Dealership Check-In"
+            }
+        },
+        {
+            "type": "section",
+            "fields": [
+                _field("*Name:*\n@@user_name@@"),
+                _field("*Location:*\n@@dealership_name@@"),
+                _field("*Time:*\n@@checkin_time@@ Eastern"),
+                _field("*Device:*\n@@device@@"),
+                _field("*Accuracy:*\n@@accuracy@@")
+            ]
+        },
+        {
+            "type": "context",
+            "elements": [
+                _field("👤 @@user_name@@ • 📍 Location verified • ✅ Check-in successful • 🕐 @@checkin_time@@")
+            ]
+        }
+    ]
+})
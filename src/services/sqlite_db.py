@@ -0,0 +1,34 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+_local = threading.local()
+
+def default_path(filename):
+    """Get a writable database path (Vercel only allows writes under /tmp)"""
+    return os.path.join(tempfile.gettempdir(), filename)
+
+def get_connection(path, schema=None):
+    """Get this thread's connection to a SQLite database, creating the schema on first use"""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if schema:
+            conn.executescript(schema)
+        connections[path] = conn
+    return conn
+
+def close_connections():
+    """Close this thread's database connections"""
+    connections = getattr(_local, 'connections', None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
@@ -0,0 +1,189 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from services import metrics
+
+# JSON-lines logging that never blocks a request on stdout.
+#
+# Request threads only hand records to an in-memory queue; one listener thread
+# formats them and writes to stdout. DEBUG records can be sampled before they
+# are queued, and GPS coordinates are redacted on the request thread so they
+# never reach the queue.
+
+# Root level and per-logger overrides, e.g. "routes.checkin=DEBUG,services.webhook_client=WARNING"
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+# Fraction of DEBUG records kept (1 keeps all, 0.01 keeps about one in a hundred)
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0.1'))
+# Decimal places GPS coordinates are rounded to in logs; unset replaces them outright
+LOG_GPS_DECIMALS = os.environ.get('LOG_GPS_DECIMALS')
+# Records held in memory before new ones are dropped
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+REDACTED = '[redacted]'
+# Structured field names that carry coordinates
+GPS_FIELDS = frozenset({
+    'lat', 'lng', 'lon', 'latitude', 'longitude',
+    'user_lat', 'user_lng', 'user_latitude', 'user_longitude',
+    'checkin_latitude', 'checkin_longitude'
+})
+# "43.8557957, -79.3061335" style pairs in free-text messages and exception strings
+_COORDINATE_PAIR = re.compile(r'-?\d{1,3}\.\d{3,}\s*,\s*-?\d{1,3}\.\d{3,}')
+# "user_lat=43.8557957" / "latitude: 43.85" style key/value pairs
+_COORDINATE_FIELD = re.compile(
+    r'\b((?:user_|checkin_)?(?:lat|lng|lon|latitude|longitude))(\s*[=:]\s*)(-?\d+(?:\.\d+)?)',
+    re.IGNORECASE
+)
+
+# Standard LogRecord attributes - everything else passed via extra= is a field
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+def _redact_coordinate(value):
+    if LOG_GPS_DECIMALS is None:
+        return REDACTED
+    try:
+        return round(float(value), int(LOG_GPS_DECIMALS))
+    except (TypeError, ValueError):
+        return REDACTED
+
+def redact_text(text):
+    """Mask coordinate pairs and lat/lng key-value pairs in free text"""
+    text = _COORDINATE_PAIR.sub(REDACTED, text)
+    return _COORDINATE_FIELD.sub(lambda m: f'{m.group(1)}{m.group(2)}{_redact_coordinate(m.group(3))}', text)
+
+
+class RedactionFilter(logging.Filter):
+    """Replace GPS coordinates in structured fields and the message text"""
+
+    def filter(self, record):
+        for name in GPS_FIELDS.intersection(vars(record)):
+            value = getattr(record, name)
+            if value is not None:
+                setattr(record, name, _redact_coordinate(value))
+        message = record.getMessage()
+        redacted = redact_text(message)
+        if redacted != message:
+            record.msg = redacted
+            record.args = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; INFO and above always pass"""
+
+    def __init__(self, rate=LOG_DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, then any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRS and not name.startswith('_'):
+                entry[name] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of waiting"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now; JSON encoding happens on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = redact_text(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            type(self).dropped += 1
+
+
+metrics.counter(
+    'log_records_dropped_total',
+    'Log records dropped because the logging queue was full',
+    callback=lambda: {(): _NonBlockingQueueHandler.dropped}
+)
+
+def parse_levels(spec):
+    """"a.b=DEBUG,c=WARNING" -> {'a.b': 10, 'c': 30}, skipping malformed entries"""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        level = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+_listener = None
+_configure_lock = threading.Lock()
+
+def configure(level=None, levels=None, stream=None):
+    """Install the queue handler on the root logger once per process"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return _listener
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JsonFormatter())
+
+        records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = _NonBlockingQueueHandler(records)
+        handler.addFilter(SamplingFilter())
+        handler.addFilter(RedactionFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level or LOG_LEVEL)
+        for name, module_level in parse_levels(LOG_LEVELS if levels is None else levels).items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown)
+        return _listener
+
+def shutdown():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
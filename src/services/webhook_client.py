@@ -0,0 +1,175 @@
+import bisect
+import http.client
+import os
+import queue
+import ssl
+import threading
+import time
+import urllib.parse
+
+from services import metrics
+
+# Timeouts in seconds - connect covers TCP + TLS setup, read covers each socket read
+CONNECT_TIMEOUT = float(os.environ.get('WEBHOOK_CONNECT_TIMEOUT', '3'))
+READ_TIMEOUT = float(os.environ.get('WEBHOOK_READ_TIMEOUT', '10'))
+# Idle keep-alive connections kept per host
+MAX_IDLE_PER_HOST = int(os.environ.get('WEBHOOK_MAX_IDLE_PER_HOST', '8'))
+
+# Request latency histogram bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+webhook_duration = metrics.histogram(
+    'webhook_request_duration_seconds',
+    'Outbound webhook (Slack) call latency, including connection setup',
+    ('host', 'result')
+)
+
+_ssl_context = ssl.create_default_context()
+_pools = {}
+_stats = {}
+_lock = threading.Lock()
+
+# Errors that mean a pooled connection was closed by the server while idle
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError
+)
+
+def _host_key(parsed):
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    return parsed.scheme, parsed.hostname, port
+
+def _host_state(key):
+    """Get the idle pool and stats for a host, creating them on first use"""
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = queue.LifoQueue(maxsize=MAX_IDLE_PER_HOST)
+            _stats[key] = {
+                'requests': 0,
+                'errors': 0,
+                'connections_opened': 0,
+                'connections_reused': 0,
+                'latency_buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                'latency_sum_ms': 0.0
+            }
+        return pool, _stats[key]
+
+def _open_connection(key):
+    scheme, host, port = key
+    if scheme == 'https':
+        conn = http.client.HTTPSConnection(host, port, timeout=CONNECT_TIMEOUT, context=_ssl_context)
+    else:
+        conn = http.client.HTTPConnection(host, port, timeout=CONNECT_TIMEOUT)
+    conn.connect()
+    conn.sock.settimeout(READ_TIMEOUT)
+    return conn
+
+def _checkout(key, pool, stats):
+    """Take an idle connection from the pool, or open a new one"""
+    try:
+        conn = pool.get_nowait()
+        with _lock:
+            stats['connections_reused'] += 1
+        return conn, True
+    except queue.Empty:
+        conn = _open_connection(key)
+        with _lock:
+            stats['connections_opened'] += 1
+        return conn, False
+
+def _checkin(pool, conn):
+    """Return a connection to the pool, closing it if the pool is full"""
+    try:
+        pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+def _record(key, stats, started, failed):
+    elapsed = time.perf_counter() - started
+    webhook_duration.observe(elapsed, (key[1], 'error' if failed else 'ok'))
+    elapsed_ms = elapsed * 1000
+    with _lock:
+        stats['requests'] += 1
+        if failed:
+            stats['errors'] += 1
+        stats['latency_buckets'][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        stats['latency_sum_ms'] += elapsed_ms
+
+def post(url, body, content_type='application/json'):
+    """POST a body over a pooled keep-alive connection.
+
+    Returns (status_code, headers, response_body). Raises on network errors.
+    """
+    parsed = urllib.parse.urlsplit(url)
+    key = _host_key(parsed)
+    path = parsed.path or '/'
+    if parsed.query:
+        path += '?' + parsed.query
+    headers = {
+        'Content-Type': content_type,
+        'Content-Length': str(len(body)),
+        'Connection': 'keep-alive'
+    }
+
+    pool, stats = _host_state(key)
+    started = time.perf_counter()
+    conn = None
+    try:
+        conn, reused = _checkout(key, pool, stats)
+        sent = False
+        try:
+            conn.request('POST', path, body=body, headers=headers)
+            sent = True
+            response = conn.getresponse()
+        except _STALE_CONNECTION_ERRORS as e:
+            # A POST isn't safe to repeat, so only resend when the server can't have
+            # processed it: the idle connection was dropped before the request was
+            # fully written, or it closed without sending back a single response byte
+            # (RemoteDisconnected). A reset after the request went out may mean it was
+            # handled, so that is raised like any other error.
+            if not reused or (sent and not isinstance(e, http.client.RemoteDisconnected)):
+                raise
+            conn.close()
+            conn = _open_connection(key)
+            with _lock:
+                stats['connections_opened'] += 1
+            conn.request('POST', path, body=body, headers=headers)
+            response = conn.getresponse()
+
+        response_body = response.read()
+        if response.will_close:
+            conn.close()
+        else:
+            _checkin(pool, conn)
+    except Exception:
+        # Timeouts and half-read responses leave the connection unusable
+        if conn is not None:
+            conn.close()
+        _record(key, stats, started, failed=True)
+        raise
+
+    _record(key, stats, started, failed=False)
+    return response.status, response.headers, response_body
+
+def get_stats():
+    """Get per-host request counts, connection reuse and latency histograms"""
+    with _lock:
+        snapshot = {}
+        for (scheme, host, port), stats in _stats.items():
+            pool = _pools[(scheme, host, port)]
+            snapshot[f"{scheme}://{host}:{port}"] = {
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'connections_opened': stats['connections_opened'],
+                'connections_reused': stats['connections_reused'],
+                'idle_connections': pool.qsize(),
+                'latency_sum_ms': round(stats['latency_sum_ms'], 3),
+                'latency_histogram_ms': {
+                    **{str(bound): count for bound, count in zip(LATENCY_BUCKETS_MS, stats['latency_buckets'])},
+                    '+Inf': stats['latency_buckets'][-1]
+                }
+            }
+        return snapshot
@@ -55,6 +55,7 @@ async function loadDealerships() {
         if (response.ok) {
             dealerships = await response.json();
             populateDealershipSelect();
+            preselectNearestDealership();
         } else {
             showNotification('Failed to load dealerships', 'error');
         }
@@ -73,6 +74,39 @@ function populateDealershipSelect() {
     });
 }
 
+async function preselectNearestDealership() {
+    // Only use a location we already have permission for - never prompt on page load
+    try {
+        if (!navigator.geolocation || !navigator.permissions) return;
+        const permission = await navigator.permissions.query({ name: 'geolocation' });
+        if (permission.state !== 'granted') return;
+        
+        const position = await new Promise((resolve, reject) => {
+            navigator.geolocation.getCurrentPosition(resolve, reject, {
+                enableHighAccuracy: false,
+                timeout: 10000,
+                maximumAge: 300000
+            });
+        });
+        
+        const params = new URLSearchParams({
+            lat: position.coords.latitude,
+            lng: position.coords.longitude,
+            k: 1
+        });
+        const response = await fetch(`/api/nearest-dealerships?${params}`);
+        if (!response.ok) return;
+        
+        const nearest = await response.json();
+        if (nearest.length && !dealershipSelect.value) {
+            dealershipSelect.value = nearest[0].id;
+            checkFormCompletion();
+        }
+    } catch (error) {
+        console.log('Nearest dealership lookup skipped:', error);
+    }
+}
+
 function attachEventListeners() {
     userNameInput.addEventListener('input', checkFormCompletion);
     dealershipSelect.addEventListener('change', handleDealershipSelection);
@@ -314,6 +348,10 @@ async function handleCheckin() {
         const result = await response.json();
         
         if (result.success) {
+            // Signed copy of the check-in, sent back with reports in case the session cookie is lost
+            if (result.checkin_token) {
+                sessionStorage.setItem('checkinToken', result.checkin_token);
+            }
             showNotification(`Check-in successful for ${userName}! Redirecting to activity logging...`, 'success');
             setTimeout(() => {
                 window.location.href = '/static/index.html';
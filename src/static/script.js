@@ -406,13 +406,58 @@ function showAutoSaveIndicator() {
 function clearSavedDataAfterSubmission() {
     // Clear localStorage after successful submission
     localStorage.removeItem('activityLoggerData');
+    // Submitting checks out, so the check-in token is spent
+    sessionStorage.removeItem('checkinToken');
+    sessionStorage.removeItem('submissionKey');
+    sessionStorage.removeItem('submissionBody');
     
     // Remove any recovery banners
     hideRecoveryBanner();
 }
 
+// JSON request headers, plus the signed check-in token when we have one
+function apiHeaders() {
+    const headers = { 'Content-Type': 'application/json' };
+    const token = sessionStorage.getItem('checkinToken');
+    if (token) {
+        headers['X-Checkin-Token'] = token;
+    }
+    return headers;
+}
+
+// One Idempotency-Key per version of the report, kept until it is submitted,
+// so double taps and retries (on either submit button) reach Slack only once;
+// editing the report after a lost response gets a fresh key
+function submissionKey(body) {
+    let key = sessionStorage.getItem('submissionKey');
+    if (!key || sessionStorage.getItem('submissionBody') !== body) {
+        key = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        sessionStorage.setItem('submissionKey', key);
+        sessionStorage.setItem('submissionBody', body);
+    }
+    return key;
+}
+
+// Scoring version sent with reports so the server can reject stale weights
+function withScoringVersion(requestData) {
+    if (window.ActivityScoring) {
+        requestData.scoring_version = window.ActivityScoring.version;
+    }
+    return requestData;
+}
+
+// The server's scoring rules changed since /api/scoring.js was loaded - the
+// form is auto-saved, so reloading keeps the entered data
+function handleScoringConflict() {
+    showNotification('Scoring rules were updated - reloading the page, your entries are saved. Please submit again.', 'info');
+    saveDataToLocalStorage();
+    setTimeout(() => window.location.reload(), 2500);
+}
+
 // ORIGINAL FUNCTIONALITY (PRESERVED)
-async function calculateAndUpdateRating(hourIndex) {
+function readHourMetrics(hourIndex) {
     const metrics = {};
     
     METRICS.forEach(metric => {
@@ -420,21 +465,55 @@ async function calculateAndUpdateRating(hourIndex) {
         metrics[metric.id] = parseInt(input?.value) || 0;
     });
     
+    return metrics;
+}
+
+function calculateAndUpdateRating(hourIndex) {
+    // Stars are computed locally from /api/scoring.js; the server is only
+    // asked if that script failed to load
+    if (window.ActivityScoring) {
+        updateStarsDisplay(hourIndex, window.ActivityScoring.rate(readHourMetrics(hourIndex)));
+        return;
+    }
+    queueServerRating(hourIndex);
+}
+
+// Server fallback: hours edited within one debounce window are rated in a
+// single /api/activities/calculate-ratings call instead of one per keystroke
+const RATING_DEBOUNCE_MS = 300;
+const pendingRatingHours = new Set();
+let ratingTimer = null;
+
+function queueServerRating(hourIndex) {
+    pendingRatingHours.add(String(hourIndex));
+    clearTimeout(ratingTimer);
+    ratingTimer = setTimeout(flushServerRatings, RATING_DEBOUNCE_MS);
+}
+
+async function flushServerRatings() {
+    const hours = {};
+    pendingRatingHours.forEach(hourIndex => {
+        hours[hourIndex] = readHourMetrics(hourIndex);
+    });
+    pendingRatingHours.clear();
+    
     try {
-        const response = await fetch('/api/activities/calculate-rating', {
+        const response = await fetch('/api/activities/calculate-ratings', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify(metrics)
+            body: JSON.stringify({ hours })
         });
         
         if (response.ok) {
             const data = await response.json();
-            updateStarsDisplay(hourIndex, data.rating);
+            Object.entries(data.ratings).forEach(([hourIndex, rating]) => {
+                updateStarsDisplay(hourIndex, rating);
+            });
         }
     } catch (error) {
-        console.error('Error calculating rating:', error);
+        console.error('Error calculating ratings:', error);
     }
 }
 
@@ -481,23 +560,22 @@ async function handlePDFExport(e) {
         // Show loading message
         showNotification('Generating activity log and sending to Slack...', 'info');
         
-        const requestData = {
+        const requestData = withScoringVersion({
             name: userName,
             activities: activities
-        };
+        });
         
+        const body = JSON.stringify(requestData);
         const response = await fetch("/api/activities/pdf", {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(requestData)
+            headers: { ...apiHeaders(), 'Idempotency-Key': submissionKey(body) },
+            body: body
         });
         
         if (response.ok) {
             // Get the filename from the response headers
             const contentDisposition = response.headers.get('Content-Disposition');
-            let filename = 'Daily_Activity_Log.txt';
+            let filename = 'Daily_Activity_Log.pdf';
             if (contentDisposition) {
                 const filenameMatch = contentDisposition.match(/filename="(.+)"/);
                 if (filenameMatch) {
@@ -522,10 +600,12 @@ async function handlePDFExport(e) {
             const slackMessage = response.headers.get('X-Slack-Message');
             
             let message = "Activity log downloaded successfully!";
-            if (slackStatus === 'success') {
+            if (slackStatus === 'success' || slackStatus === 'queued') {
                 message += " Also sent to team Slack channel.";
             } else if (slackStatus === 'error') {
-                message += ` Slack error: ${slackMessage}`;
+                // Not sent and the server kept the check-in - keep the form so it can be resubmitted
+                showNotification(`${message} Slack error: ${slackMessage}`, 'error');
+                return;
             }
             
             showNotification(message, "success");
@@ -539,7 +619,11 @@ async function handlePDFExport(e) {
             }, 2000); // Wait 2 seconds to show the success message
         } else {
             const errorData = await response.json();
-            showNotification(`Error: ${errorData.error}`, 'error');
+            if (response.status === 409 && errorData.scoring_version) {
+                handleScoringConflict();
+            } else {
+                showNotification(`Error: ${errorData.message}`, 'error');
+            }
         }
     } catch (error) {
         console.error('Error generating activity log:', error);
@@ -593,22 +677,26 @@ async function handleSlackOnly(e) {
     try {
         showNotification('Sending to Slack...', 'info');
         
-        const requestData = {
+        const requestData = withScoringVersion({
             name: userName,
             activities: activities
-        };
+        });
         
+        const body = JSON.stringify(requestData);
         const response = await fetch("/api/send-to-slack", {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(requestData)
+            headers: { ...apiHeaders(), 'Idempotency-Key': submissionKey(body) },
+            body: body
         });
         
         if (response.ok) {
             const result = await response.json();
-            showNotification('Successfully sent to Slack!', 'success');
+            if (!result.success) {
+                // Not sent and the server kept the check-in - keep the form so it can be resubmitted
+                showNotification(`Error sending to Slack: ${result.message}`, 'error');
+                return;
+            }
+            showNotification(result.message || 'Successfully sent to Slack!', 'success');
             
             // Clear saved data after successful submission
             clearSavedDataAfterSubmission();
@@ -619,7 +707,11 @@ async function handleSlackOnly(e) {
             }, 2000);
         } else {
             const errorData = await response.json();
-            showNotification(`Error sending to Slack: ${errorData.error}`, 'error');
+            if (response.status === 409 && errorData.scoring_version) {
+                handleScoringConflict();
+            } else {
+                showNotification(`Error sending to Slack: ${errorData.message}`, 'error');
+            }
         }
     } catch (error) {
         console.error('Error sending to Slack:', error);
@@ -629,7 +721,7 @@ async function handleSlackOnly(e) {
 
 async function loadCheckinStatus() {
     try {
-        const response = await fetch('/api/checkin-status');
+        const response = await fetch('/api/checkin-status', { headers: apiHeaders() });
         if (response.ok) {
             const status = await response.json();
             
@@ -653,12 +745,11 @@ async function handleCheckout() {
     try {
         const response = await fetch('/api/checkout', {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            }
+            headers: apiHeaders()
         });
         
         if (response.ok) {
+            sessionStorage.removeItem('checkinToken');
             showNotification('Successfully checked out!', 'success');
             setTimeout(() => {
                 window.location.href = '/static/checkin.html';
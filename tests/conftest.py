@@ -0,0 +1,14 @@
+"""Test settings shared by every module; set before any service is imported"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+_workdir = tempfile.mkdtemp(prefix='activity-logger-test-')
+os.environ['OUTBOX_DB_PATH'] = os.path.join(_workdir, 'outbox.sqlite3')
+os.environ['SLACK_QUEUE_WORKERS'] = '2'
+os.environ['SLACK_REPLAY_INTERVAL_SECONDS'] = '0.05'
+os.environ['SLACK_BACKOFF_BASE_SECONDS'] = '0.2'
@@ -0,0 +1,54 @@
+"""Snapshot and address-file fallbacks in services/dealership_registry.py"""
+import json
+
+import pytest
+
+from services import dealership_registry
+
+
+@pytest.fixture
+def registry_files(tmp_path, monkeypatch):
+    content = dealership_registry.read_source()
+    addresses = tmp_path / 'dealership_addresses.txt'
+    snapshot = tmp_path / 'dealerships.json'
+    addresses.write_text(content, encoding='utf-8')
+    snapshot.write_text(json.dumps(dealership_registry.compile_snapshot(content)), encoding='utf-8')
+    monkeypatch.setattr(dealership_registry, 'ADDRESSES_PATH', str(addresses))
+    monkeypatch.setattr(dealership_registry, 'SNAPSHOT_PATH', str(snapshot))
+    monkeypatch.setattr(dealership_registry, 'USE_SNAPSHOT', True)
+    return addresses, snapshot
+
+
+def test_current_snapshot_is_used(registry_files):
+    assert dealership_registry.load_registry()[3] == 'snapshot'
+
+
+@pytest.mark.parametrize('text', ['{"format": 1, "vers', '[]', '{"format": 1, "version": "%s"}'])
+def test_corrupt_snapshot_falls_back_to_the_address_file(registry_files, text):
+    addresses, snapshot = registry_files
+    # The last case is a current snapshot with its records missing
+    snapshot.write_text(text.replace('%s', dealership_registry.source_version(addresses.read_text(encoding='utf-8'))),
+                        encoding='utf-8')
+
+    dealerships, index, version, source = dealership_registry.load_registry()
+    assert source == 'text'
+    assert len(dealerships) == len(index) > 0
+
+
+def test_missing_address_file_uses_the_snapshot(registry_files):
+    addresses, snapshot = registry_files
+    addresses.unlink()
+
+    dealerships, index, version, source = dealership_registry.load_registry()
+    assert source == 'snapshot'
+    assert version == json.loads(snapshot.read_text(encoding='utf-8'))['version']
+    assert len(dealerships) == len(index) > 0
+
+
+def test_missing_address_file_and_snapshot_fails(registry_files):
+    addresses, snapshot = registry_files
+    addresses.unlink()
+    snapshot.unlink()
+
+    with pytest.raises(FileNotFoundError):
+        dealership_registry.load_registry()
@@ -0,0 +1,40 @@
+"""Routing fan-out against scripts/stub_slack_server.py"""
+import threading
+import time
+
+from services import notification_router, slack_delivery
+from services.notification_router import Router
+from stub_slack_server import start_stub_server
+
+
+def test_slow_inline_destination_does_not_hold_back_the_others(monkeypatch):
+    monkeypatch.setattr(slack_delivery, 'WORKER_COUNT', 0)
+    slow = start_stub_server(latency_ms=1500)
+    fast = start_stub_server()
+    notification_router.set_router(Router({
+        'destinations': {'slow': slow.url, 'fast': fast.url},
+        'routes': [{'events': ['report'], 'destinations': ['slow', 'fast']}]
+    }))
+    try:
+        results = []
+        worker = threading.Thread(target=lambda: results.extend(
+            notification_router.fan_out('report', {'text': 'report'}, kind='test')
+        ))
+        started = time.monotonic()
+        worker.start()
+
+        # The fast webhook is posted while the slow one (listed first) is still pending
+        deadline = started + 1
+        while fast.stats['accepted'] < 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert fast.stats['accepted'] == 1
+        assert slow.stats['accepted'] == 0
+
+        worker.join(10)
+        assert [result['destination'] for result in results] == ['slow', 'fast']
+        assert all(result['delivered'] for result in results)
+        assert time.monotonic() - started < 2.5
+    finally:
+        notification_router.set_router(None)
+        slow.shutdown()
+        fast.shutdown()
@@ -0,0 +1,46 @@
+"""The server's metric parser and the generated browser module must agree"""
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from services import scoring
+
+SAMPLES = ['1.5', ' 2', 'abc', '7', '', None, 3]
+
+NODE_SCRIPT = """
+const window = globalThis.window = {};
+eval(process.argv[1]);
+const results = JSON.parse(process.argv[2]).map(value => {
+    try {
+        return window.ActivityScoring.parseMetric(value);
+    } catch (e) {
+        return 'error';
+    }
+});
+console.log(JSON.stringify(results));
+"""
+
+
+def python_results(samples):
+    results = []
+    for value in samples:
+        try:
+            results.append(scoring.parse_metric(value))
+        except ValueError:
+            results.append('error')
+    return results
+
+
+def test_parse_metric_rejects_non_integer_strings():
+    assert python_results(SAMPLES) == ['error', 2, 'error', 7, 0, 0, 3]
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+def test_browser_parser_agrees_with_the_server():
+    output = subprocess.run(
+        ['node', '-e', NODE_SCRIPT, scoring.client_module(), json.dumps(SAMPLES)],
+        capture_output=True, text=True, check=True, timeout=30
+    ).stdout
+    assert json.loads(output) == python_results(SAMPLES)
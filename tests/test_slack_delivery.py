@@ -0,0 +1,83 @@
+"""Outbox retry state machine against scripts/stub_slack_server.py"""
+import time
+
+import pytest
+
+from services import outbox, slack_delivery
+from stub_slack_server import start_stub_server
+
+
+@pytest.fixture
+def stub():
+    server = start_stub_server()
+    yield server
+    server.shutdown()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_claim_waits_for_next_attempt():
+    outbox.add('claim-1', 'test', '', 'http://127.0.0.1:9/hook', '{}')
+    assert outbox.claim('claim-1') is not None
+    outbox.schedule_retry('claim-1', 'Slack API error: 429', 30)
+
+    assert outbox.claim('claim-1') is None
+    assert 'claim-1' not in outbox.due()
+    assert outbox.get('claim-1')['attempts'] == 1
+
+
+def test_rate_limited_messages_are_posted_once_until_retry_after(stub):
+    stub.rate_limit_rate = 1.0
+    stub.retry_after = 30
+    stub.latency_ms = 20
+
+    ids = [slack_delivery.enqueue(stub.url, {'text': f'message {i}'}, kind='test') for i in range(20)]
+    # Re-dispatch while most ids are still waiting in the in-memory queue
+    slack_delivery.replay_due()
+
+    assert wait_for(lambda: all(outbox.get(i)['status'] == 'retrying' for i in ids))
+    # Give the replay loop a few passes to re-dispatch anything it shouldn't
+    time.sleep(0.5)
+
+    assert stub.stats['received'] == 20
+    for message_id in ids:
+        message = outbox.get(message_id)
+        assert message['status'] == 'retrying'
+        assert message['attempts'] == 1
+        assert message['next_attempt_at'] >= time.time() + 25
+
+
+def test_retried_message_is_delivered_once_due(stub):
+    stub.rate_limit_rate = 1.0
+    stub.retry_after = 1
+    delivery_id = slack_delivery.enqueue(stub.url, {'text': 'limited once'}, kind='test')
+    assert wait_for(lambda: stub.stats['rate_limited'] >= 1)
+    stub.rate_limit_rate = 0.0
+
+    assert wait_for(lambda: outbox.get(delivery_id)['status'] == 'delivered')
+    assert outbox.get(delivery_id)['attempts'] == 2
+    assert stub.stats['received'] == 2
+
+
+def test_failed_inline_delivery_is_not_retried_behind_the_resubmission(stub, monkeypatch):
+    monkeypatch.setattr(slack_delivery, 'WORKER_COUNT', 0)
+    stub.error_rate = 1.0
+    failed = slack_delivery.enqueue(stub.url, {'text': 'report'}, kind='test')
+    assert outbox.get(failed)['status'] == 'dead'
+
+    # The client is told the send failed and resubmits
+    stub.error_rate = 0.0
+    resent = slack_delivery.enqueue(stub.url, {'text': 'report'}, kind='test')
+    assert outbox.get(resent)['status'] == 'delivered'
+
+    # Let the replay loop (started by the earlier tests) run a few passes
+    time.sleep(0.5)
+    assert stub.stats['received'] == 2
+    assert stub.stats['accepted'] == 1
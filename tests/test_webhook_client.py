@@ -0,0 +1,73 @@
+"""Pooled connection reuse and retries in services/webhook_client.py"""
+import socket
+import struct
+import threading
+
+import pytest
+
+from services import webhook_client
+
+
+def start_server(handle):
+    """One-connection-at-a-time raw HTTP server; handle(conn, request_number) answers each request"""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    requests = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            with conn, conn.makefile('rb') as reader:
+                while True:
+                    headers = []
+                    line = reader.readline()
+                    while line not in (b'\r\n', b''):
+                        headers.append(line)
+                        line = reader.readline()
+                    if not headers:
+                        break
+                    length = next(int(h.split(b':')[1]) for h in headers if h.lower().startswith(b'content-length'))
+                    requests.append(reader.read(length))
+                    if not handle(conn, len(requests)):
+                        break
+
+    threading.Thread(target=serve, daemon=True).start()
+    return f'http://127.0.0.1:{listener.getsockname()[1]}/hook', requests, listener
+
+
+def test_reset_after_a_reused_request_is_sent_is_not_retried():
+    def handle(conn, number):
+        if number == 1:
+            conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+            return True
+        # Read the request, then reset the connection without answering
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        return False
+
+    url, requests, listener = start_server(handle)
+    try:
+        assert webhook_client.post(url, b'{"n": 1}')[0] == 200
+        with pytest.raises(ConnectionResetError):
+            webhook_client.post(url, b'{"n": 2}')
+        assert requests == [b'{"n": 1}', b'{"n": 2}']
+    finally:
+        listener.close()
+
+
+def test_idle_connection_closed_by_the_server_is_retried():
+    def handle(conn, number):
+        conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+        # Close the keep-alive connection as if its idle timeout had passed
+        return False
+
+    url, requests, listener = start_server(handle)
+    try:
+        assert webhook_client.post(url, b'{"n": 1}')[0] == 200
+        assert webhook_client.post(url, b'{"n": 2}')[0] == 200
+        assert requests == [b'{"n": 1}', b'{"n": 2}']
+    finally:
+        listener.close()